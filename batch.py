@@ -0,0 +1,35 @@
+import argparse
+import asyncio
+import logging
+
+from src.batch import load_queries, run_batch
+from src.config.config import BATCH_CONCURRENCY
+from src.telemetry import write_prometheus_file
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def parse_mode_limits(values):
+    limits = {}
+    for value in values or []:
+        mode, limit = value.split("=", 1)
+        limits[mode] = int(limit)
+    return limits
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a file of RAY queries headlessly and write results as JSONL")
+    parser.add_argument("queries", help="JSONL file with one {\"id\", \"query\", \"mode\", \"config\"} object per line")
+    parser.add_argument("output", help="JSONL results file; query IDs already present are skipped")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Maximum queries in flight overall")
+    parser.add_argument("--mode-concurrency", nargs="*", metavar="MODE=N", help="Per-mode caps, e.g. global=2 local=8")
+    parser.add_argument("--default-mode", default="global", help="Mode for lines that do not set one: global, local, vanilla or auto")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries, args.default_mode)
+    records = asyncio.run(run_batch(queries, args.output, args.concurrency, parse_mode_limits(args.mode_concurrency)))
+    failed = sum(1 for record in records if record.get("error"))
+    logger.info(f"Batch finished: {len(records)} queries run, {failed} failed")
+    write_prometheus_file()
+
+if __name__ == "__main__":
+    main()
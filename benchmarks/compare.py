@@ -0,0 +1,46 @@
+import argparse
+import json
+import sys
+
+# Metrics where a larger value is an improvement; everything else is a duration
+HIGHER_IS_BETTER = ("throughput_qps",)
+
+
+def flatten(value, prefix=""):
+    if isinstance(value, dict):
+        for key, child in value.items():
+            yield from flatten(child, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, value
+
+
+def compare(baseline, candidate, threshold):
+    base = dict(flatten(baseline["scales"]))
+    new = dict(flatten(candidate["scales"]))
+    regressions = []
+    for key in sorted(base.keys() & new.keys()):
+        if not (key.endswith("_seconds") or key.endswith(HIGHER_IS_BETTER)) or not base[key]:
+            continue
+        change = (new[key] - base[key]) / base[key]
+        worse = -change if key.endswith(HIGHER_IS_BETTER) else change
+        flag = "REGRESSION" if worse > threshold else ""
+        print(f"{key:<70} {base[key]:>10.4f} {new[key]:>10.4f} {change:>+8.1%} {flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two pipeline_benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown that counts as a regression")
+    args = parser.parse_args()
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+    print(f"baseline {baseline.get('commit')} vs candidate {candidate.get('commit')}")
+    regressions = compare(baseline, candidate, args.threshold)
+    print(f"{len(regressions)} regressions over {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,115 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from src.config.config import DEFAULT_SEARCH_CONFIG
+from src.data.data_loader import load_prepared_context, load_token_counts
+from src.engines.embedding_cache import CachedTextEmbedding, EmbeddingCache
+from src.engines.engine_setup import setup_engines
+from src.engines.search_engines import setup_search_engines
+from .fakes import FakeChatOpenAI, FakeEmbedding, synthetic_bpe_encoding
+from .synthetic_artifacts import generate_artifacts
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - start
+
+
+def load_encoder(name):
+    if name == "synthetic":
+        return synthetic_bpe_encoding()
+    import tiktoken
+
+    return tiktoken.get_encoding(name)
+
+
+def _context_batches(context):
+    # Global search returns one context text per map batch, local search a single text
+    return context if isinstance(context, list) else [context]
+
+
+def time_builds(build, runs):
+    timings, texts = [], []
+    for run in range(runs):
+        (context, _), seconds = _timed(lambda: build(run))
+        timings.append(seconds)
+        texts.extend(_context_batches(context))
+    return timings, texts
+
+
+def run(n_entities, args):
+    token_encoder = load_encoder(args.encoder)
+    with tempfile.TemporaryDirectory() as tmp:
+        artifacts_dir = os.path.join(tmp, "output", "benchmark", "artifacts")
+        generate_artifacts(artifacts_dir, n_entities, args.embedding_dim, args.levels)
+        config = {**DEFAULT_SEARCH_CONFIG, "api_key": "benchmark", "artifacts_dir": artifacts_dir, "community_level": args.community_level}
+        load_prepared_context.clear()
+        load_token_counts.clear()
+        llm, token_encoder, env_vars, reports, entities, relationships, covariates, text_units = setup_engines(config, llm=FakeChatOpenAI(0), token_encoder=token_encoder)
+        embedder = FakeEmbedding(args.embedding_dim, 0.0, token_encoder)
+        text_embedder = CachedTextEmbedding(embedder, embedder.model, EmbeddingCache(disk_path=None))
+        # Engine setup counts every text once and stores the counts next to the snapshot
+        (global_engine, local_engine, _, _), setup_seconds = _timed(
+            lambda: setup_search_engines(llm, token_encoder, reports, entities, relationships, covariates, text_units, env_vars, config, text_embedder=text_embedder)
+        )
+
+        rng = np.random.default_rng(0)
+        queries = [f"How is ENTITY_{a} related to ENTITY_{b}?" for a, b in rng.integers(0, n_entities, (args.runs, 2))]
+        builds = {
+            "global": (global_engine, lambda builder, run: builder.build_context(conversation_history=None, **global_engine.context_builder_params)),
+            "local": (local_engine, lambda builder, run: builder.build_context(query=queries[run], conversation_history=None, **local_engine.context_builder_params)),
+        }
+        # Embed the queries up front so both variants time context packing only
+        text_embedder.prefetch(queries)
+
+        results = {"engine_setup_seconds": setup_seconds}
+        for mode, (engine, build) in builds.items():
+            builder = engine.context_builder
+            precounted = builder.token_encoder
+            max_tokens = engine.context_builder_params["max_tokens"]
+            # One untimed build: the first global build computes community weights
+            build(builder, 0)
+            builder.token_encoder = token_encoder
+            exact_timings, exact_texts = time_builds(lambda run: build(builder, run), args.runs)
+            builder.token_encoder = precounted
+            precounted_timings, texts = time_builds(lambda run: build(builder, run), args.runs)
+            # Exact tokens of what the stored counts packed, against the builder's budget
+            packed = [len(token_encoder.encode(text, disallowed_special=())) for text in texts]
+            exact_packed = [len(token_encoder.encode(text, disallowed_special=())) for text in exact_texts]
+            results[mode] = {
+                "exact_p50_seconds": float(np.percentile(exact_timings, 50)),
+                "precounted_p50_seconds": float(np.percentile(precounted_timings, 50)),
+                "speedup": float(np.percentile(exact_timings, 50) / max(np.percentile(precounted_timings, 50), 1e-9)),
+                "max_packed_tokens": max(packed),
+                "max_exact_packed_tokens": max(exact_packed),
+                "max_tokens": max_tokens,
+            }
+
+    print(f"{n_entities} entities, encoder {args.encoder}")
+    print(f"  engine setup (incl. token counting): {results['engine_setup_seconds']:.3f}s")
+    for mode in ("global", "local"):
+        stats = results[mode]
+        print(f"  {mode:<6} context build p50: exact {stats['exact_p50_seconds'] * 1000:.1f}ms, "
+              f"precounted {stats['precounted_p50_seconds'] * 1000:.1f}ms ({stats['speedup']:.1f}x); "
+              f"largest context {stats['max_packed_tokens']} tokens, {stats['max_exact_packed_tokens']} when re-encoding (budget {stats['max_tokens']})")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time global and local context building with re-encoded rows against stored token counts")
+    parser.add_argument("--entities", type=lambda value: [int(v) for v in value.split(",")], default=[10_000, 100_000])
+    parser.add_argument("--encoder", default="cl100k_base", help="tiktoken encoding name, or 'synthetic' to run offline")
+    parser.add_argument("--embedding-dim", type=int, default=64)
+    parser.add_argument("--levels", type=int, default=3)
+    parser.add_argument("--community-level", type=int, default=2)
+    parser.add_argument("--runs", type=int, default=10, help="Context builds per mode and variant")
+    args = parser.parse_args()
+    for name in ("GRAPHRAG_API_KEY", "GRAPHRAG_LLM_MODEL", "GRAPHRAG_EMBEDDING_MODEL"):
+        os.environ.setdefault(name, "benchmark")
+    for n_entities in args.entities:
+        run(n_entities, args)
@@ -0,0 +1,129 @@
+import argparse
+import os
+import tempfile
+import time
+from unittest import mock
+
+import numpy as np
+
+from src.config.config import DEFAULT_SEARCH_CONFIG
+from src.data.data_loader import load_prepared_context, load_token_counts
+from src.engines.conversation import Conversation
+from src.engines.embedding_cache import CachedTextEmbedding, EmbeddingCache
+from src.engines.engine_setup import setup_engines
+from src.engines.query import format_search_query
+from src.engines.query_context import QueryContext, activate_query_context
+from src.engines.search_engines import setup_search_engines
+from .context_benchmark import load_encoder
+from .fakes import FakeChatOpenAI, FakeEmbedding
+from .synthetic_artifacts import generate_artifacts
+
+
+class RecordingEmbedder:
+    """Counts the tokens each variant sends to the embedding model."""
+
+    def __init__(self, text_embedder, token_encoder):
+        self.text_embedder = text_embedder
+        self.token_encoder = token_encoder
+        self.tokens = 0
+
+    def embed(self, text, **kwargs):
+        self.tokens += len(self.token_encoder.encode(text))
+        return self.text_embedder.embed(text, **kwargs)
+
+
+def conversation_questions(n_entities, turns, rng):
+    # One topic: later turns ask about neighbours of the entities the first turn named
+    first, second = rng.integers(0, n_entities, 2)
+    questions = [f"How is ENTITY_{first} related to ENTITY_{second}?"]
+    for turn in range(1, turns):
+        questions.append(f"What else connects ENTITY_{first} with ENTITY_{(first + turn) % n_entities}?")
+    return questions
+
+
+def run_conversation(builder, params, questions, text_embedder, token_encoder, use_session):
+    if not use_session:
+        # graphrag counts the history section with cl100k whatever the engine's encoder; count with the same one
+        with mock.patch("graphrag.query.context_builder.conversation_history.num_tokens",
+                        lambda text, _=None: len(token_encoder.encode(text))):
+            return _run_conversation(builder, params, questions, text_embedder, token_encoder, use_session)
+    return _run_conversation(builder, params, questions, text_embedder, token_encoder, use_session)
+
+
+def _run_conversation(builder, params, questions, text_embedder, token_encoder, use_session):
+    recorder = RecordingEmbedder(text_embedder, token_encoder)
+    builder.text_embedder = recorder
+    # The same bounded turns either way; only the session variant reuses retrieval state
+    conversation = Conversation()
+    timings, embedded = [], []
+    for question in questions:
+        history = conversation.history(question)
+        query_context = QueryContext(mode="local", conversation=conversation if use_session else None)
+        before = recorder.tokens
+        with activate_query_context(query_context):
+            start = time.perf_counter()
+            builder.build_context(query=format_search_query(question), conversation_history=history, **params)
+            timings.append(time.perf_counter() - start)
+        embedded.append(recorder.tokens - before)
+        conversation.add_turn(question, f"An answer about {question}")
+    builder.text_embedder = text_embedder
+    return timings, embedded
+
+
+def run(n_entities, args):
+    token_encoder = load_encoder(args.encoder)
+    with tempfile.TemporaryDirectory() as tmp:
+        artifacts_dir = os.path.join(tmp, "output", "benchmark", "artifacts")
+        generate_artifacts(artifacts_dir, n_entities, args.embedding_dim, args.levels)
+        config = {**DEFAULT_SEARCH_CONFIG, "api_key": "benchmark", "artifacts_dir": artifacts_dir, "community_level": args.community_level}
+        load_prepared_context.clear()
+        load_token_counts.clear()
+        llm, token_encoder, env_vars, reports, entities, relationships, covariates, text_units = setup_engines(config, llm=FakeChatOpenAI(0), token_encoder=token_encoder)
+        embedder = FakeEmbedding(args.embedding_dim, 0.0, token_encoder)
+        text_embedder = CachedTextEmbedding(embedder, embedder.model, EmbeddingCache(disk_path=None))
+        _, local_engine, _, _ = setup_search_engines(llm, token_encoder, reports, entities, relationships, covariates, text_units, env_vars, config, text_embedder=text_embedder)
+
+        builder = local_engine.context_builder
+        params = local_engine.context_builder_params
+        rng = np.random.default_rng(0)
+        conversations = [conversation_questions(n_entities, args.turns, rng) for _ in range(args.conversations)]
+        # One untimed conversation per variant warms caches that are not about conversations
+        for use_session in (False, True):
+            run_conversation(builder, params, conversations[0], text_embedder, token_encoder, use_session)
+
+        results = {}
+        for name, use_session in (("graphrag", False), ("session", True)):
+            per_turn_timings, per_turn_tokens = [[] for _ in range(args.turns)], [[] for _ in range(args.turns)]
+            for questions in conversations[1:] or conversations:
+                timings, embedded = run_conversation(builder, params, questions, text_embedder, token_encoder, use_session)
+                for turn in range(args.turns):
+                    per_turn_timings[turn].append(timings[turn])
+                    per_turn_tokens[turn].append(embedded[turn])
+            results[name] = {
+                "context_build_p50_seconds": [float(np.percentile(values, 50)) for values in per_turn_timings],
+                "embedded_tokens_mean": [float(np.mean(values)) for values in per_turn_tokens],
+            }
+
+    print(f"{n_entities} entities, {args.turns}-turn conversations")
+    for turn in range(args.turns):
+        graphrag, session = results["graphrag"], results["session"]
+        print(f"  turn {turn + 1}: context build p50 graphrag {graphrag['context_build_p50_seconds'][turn] * 1000:.1f}ms, "
+              f"session {session['context_build_p50_seconds'][turn] * 1000:.1f}ms; embedded tokens "
+              f"{graphrag['embedded_tokens_mean'][turn]:.0f} vs {session['embedded_tokens_mean'][turn]:.0f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-turn local context building with and without conversation state")
+    parser.add_argument("--entities", type=lambda value: [int(v) for v in value.split(",")], default=[10_000, 100_000])
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--conversations", type=int, default=5)
+    parser.add_argument("--embedding-dim", type=int, default=64)
+    parser.add_argument("--levels", type=int, default=3)
+    parser.add_argument("--community-level", type=int, default=2)
+    parser.add_argument("--encoder", default="cl100k_base", help="tiktoken encoding name, or 'synthetic' to run offline")
+    args = parser.parse_args()
+    for name in ("GRAPHRAG_API_KEY", "GRAPHRAG_LLM_MODEL", "GRAPHRAG_EMBEDDING_MODEL"):
+        os.environ.setdefault(name, "benchmark")
+    for n_entities in args.entities:
+        run(n_entities, args)
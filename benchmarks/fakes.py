@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import json
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from graphrag.query.llm.base import BaseLLM, BaseTextEmbedding
+
+from .synthetic_artifacts import WORDS
+
+
+def _digest(value):
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(value.encode("utf-8")).digest()
+
+
+class WhitespaceEncoder:
+    """Deterministic stand-in for tiktoken: one token per whitespace-separated word."""
+
+    def __init__(self):
+        self._ids = {}
+        self._words = []
+
+    def encode(self, text, **kwargs):
+        tokens = []
+        for word in text.split():
+            token = self._ids.get(word)
+            if token is None:
+                token = self._ids[word] = len(self._words)
+                self._words.append(word)
+            tokens.append(token)
+        return tokens
+
+    def decode(self, tokens):
+        return " ".join(self._words[token] for token in tokens)
+
+
+# cl100k_base's pre-tokenizer regex
+CL100K_PATTERN = r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+| ?[^\s\p{L}\p{N}]++[\r\n]*+|\s++$|\s*[\r\n]|\s+(?!\S)|\s"""
+
+
+def synthetic_bpe_encoding():
+    """tiktoken Encoding for offline runs: cl100k_base's pre-tokenizer with byte-level BPE merges that
+    build each synthetic word (with and without a leading space) one byte at a time.
+
+    Unlike WhitespaceEncoder it does the same kind of work per text as cl100k_base, so it can
+    stand in when measuring tokenization cost.
+    """
+    import tiktoken
+
+    ranks = {bytes([i]): i for i in range(256)}
+    for word in WORDS:
+        for text in (word, f" {word}"):
+            for end in range(2, len(text) + 1):
+                ranks.setdefault(text[:end].encode("utf-8"), len(ranks))
+    return tiktoken.Encoding(name="synthetic_bpe", pat_str=CL100K_PATTERN, mergeable_ranks=ranks, special_tokens={})
+
+
+class FakeChatOpenAI(BaseLLM):
+    """ChatOpenAI stand-in with fixed latency and outputs derived from the prompt.
+
+    Requests with a json_object response format (the global map step) get valid map-point JSON.
+    """
+
+    def __init__(self, latency=0.05, token_latency=0.0, response_tokens=150):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.response_tokens = response_tokens
+        self.calls = 0
+
+    def _respond(self, messages, kwargs):
+        self.calls += 1
+        digest = _digest(messages)
+        if (kwargs.get("response_format") or {}).get("type") == "json_object":
+            return json.dumps({"points": [
+                {"description": f"Synthetic finding {i} [Data: Reports ({digest[i]})]", "score": digest[i] % 100}
+                for i in range(3)
+            ]})
+        words = [WORDS[digest[i % len(digest)] % len(WORDS)] for i in range(self.response_tokens)]
+        return " ".join(words)
+
+    def _tokens(self, text):
+        return [f"{word} " for word in text.split()]
+
+    def generate(self, messages, streaming=True, callbacks=None, **kwargs):
+        time.sleep(self.latency)
+        response = self._respond(messages, kwargs)
+        if streaming:
+            for token in self._tokens(response):
+                time.sleep(self.token_latency)
+                for callback in callbacks or []:
+                    callback.on_llm_new_token(token)
+        return response
+
+    def stream_generate(self, messages, callbacks=None, **kwargs):
+        time.sleep(self.latency)
+        for token in self._tokens(self._respond(messages, kwargs)):
+            time.sleep(self.token_latency)
+            for callback in callbacks or []:
+                callback.on_llm_new_token(token)
+            yield token
+
+    async def agenerate(self, messages, streaming=True, callbacks=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        response = self._respond(messages, kwargs)
+        if streaming:
+            for token in self._tokens(response):
+                await asyncio.sleep(self.token_latency)
+                for callback in callbacks or []:
+                    callback.on_llm_new_token(token)
+        return response
+
+    async def astream_generate(self, messages, callbacks=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        for token in self._tokens(self._respond(messages, kwargs)):
+            await asyncio.sleep(self.token_latency)
+            for callback in callbacks or []:
+                callback.on_llm_new_token(token)
+            yield token
+
+
+def fake_vector(text, dim):
+    rng = np.random.default_rng(int.from_bytes(_digest(text)[:8], "little"))
+    vector = rng.standard_normal(dim)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class _FakeEmbeddingsResource:
+    def __init__(self, embedder):
+        self.embedder = embedder
+
+    def create(self, input, model, **kwargs):
+        time.sleep(self.embedder.latency)
+        self.embedder.requests += 1
+        texts = [input] if isinstance(input, str) else input
+        return SimpleNamespace(data=[
+            SimpleNamespace(index=i, embedding=fake_vector(text, self.embedder.dim)) for i, text in enumerate(texts)
+        ])
+
+
+class FakeEmbedding(BaseTextEmbedding):
+    """OpenAIEmbedding stand-in: deterministic unit vectors, fixed latency per request, batched client included."""
+
+    def __init__(self, dim=1536, latency=0.02, token_encoder=None, max_tokens=8191):
+        self.dim = dim
+        self.latency = latency
+        self.token_encoder = token_encoder
+        self.max_tokens = max_tokens
+        self.max_retries = 1
+        self.retry_error_types = ()
+        self.model = "fake-embedding"
+        self.requests = 0
+        self.sync_client = SimpleNamespace(embeddings=_FakeEmbeddingsResource(self))
+
+    def embed(self, text, **kwargs):
+        time.sleep(self.latency)
+        self.requests += 1
+        return fake_vector(text, self.dim)
+
+    async def aembed(self, text, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.requests += 1
+        return fake_vector(text, self.dim)
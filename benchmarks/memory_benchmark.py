@@ -0,0 +1,86 @@
+import argparse
+import multiprocessing
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from src.data.data_loader import read_indexer_context
+from src.data.snapshot import TABLE_NAMES, read_artifact_tables, read_snapshot, write_snapshot
+from src.telemetry.memory import process_memory
+from .synthetic_artifacts import generate_artifacts
+
+MB = 2 ** 20
+
+
+def load_parquet(artifacts_dir, community_level):
+    # What each worker did before: load_data's full parquet decode, then prepare_context's adapters
+    frames = {name: pd.read_parquet(f"{artifacts_dir}/{filename}.parquet") for name, filename in TABLE_NAMES.items()}
+    return read_indexer_context(frames, community_level)
+
+
+def load_snapshot(artifacts_dir, community_level):
+    return read_snapshot(artifacts_dir, community_level)
+
+
+LOADERS = {"parquet": load_parquet, "snapshot": load_snapshot}
+
+
+def touch(prepared):
+    # Read every text and vector once, as building contexts over time would
+    reports, entities, relationships, covariates, text_units = prepared
+    total = sum(len(report.full_content or "") + len(report.summary or "") for report in reports)
+    total += sum(len(entity.description or "") + float(np.sum(entity.description_embedding)) for entity in entities)
+    total += sum(len(relationship.description or "") for relationship in relationships)
+    total += sum(len(text_unit.text or "") for text_unit in text_units)
+    return total
+
+
+def worker(loader, artifacts_dir, community_level, barrier, results):
+    before = process_memory()
+    prepared = LOADERS[loader](artifacts_dir, community_level)
+    touch(prepared)
+    # Measure while every worker is alive, so shared pages are split across all of them
+    barrier.wait()
+    after = process_memory()
+    results.put({key: after[key] - before.get(key, 0) for key in after})
+    barrier.wait()
+
+
+def run_workers(loader, artifacts_dir, community_level, workers):
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(loader, artifacts_dir, community_level, barrier, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    measurements = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return {key: float(np.mean([m[key] for m in measurements])) for key in measurements[0]}
+
+
+def run(n_entities, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        artifacts_dir = generate_artifacts(os.path.join(tmp, "artifacts"), n_entities, args.embedding_dim)
+        # Published once per run; workers only attach to it
+        write_snapshot(artifacts_dir, args.community_level, read_indexer_context(read_artifact_tables(artifacts_dir), args.community_level))
+        results = {loader: run_workers(loader, artifacts_dir, args.community_level, args.workers) for loader in LOADERS}
+
+    print(f"{n_entities} entities, {args.workers} workers, growth per worker after loading the prepared context")
+    for loader, stats in results.items():
+        line = ", ".join(f"{key.removesuffix('_bytes')} {value / MB:.0f} MB" for key, value in stats.items())
+        print(f"  {loader:<8} {line}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-worker memory of loading artifacts per process against attaching to the shared snapshot")
+    parser.add_argument("--entities", type=lambda value: [int(v) for v in value.split(",")], default=[10_000, 100_000])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--embedding-dim", type=int, default=1536)
+    parser.add_argument("--community-level", type=int, default=2)
+    args = parser.parse_args()
+    for n_entities in args.entities:
+        run(n_entities, args)
@@ -0,0 +1,163 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from src.config.config import DEFAULT_SEARCH_CONFIG
+from src.data.data_loader import load_data, prepare_context, load_prepared_context
+from src.engines.embedding_cache import CachedTextEmbedding, EmbeddingCache
+from src.engines.engine_setup import setup_engines
+from src.engines.query_context import QueryContext, activate_query_context
+from src.engines.search_engines import setup_search_engines
+from src.telemetry import get_metrics_registry
+from .fakes import FakeChatOpenAI, FakeEmbedding, WhitespaceEncoder
+from .synthetic_artifacts import generate_artifacts
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - start
+
+
+def _percentiles(values, prefix):
+    return {f"{prefix}_p{q}_seconds": float(np.percentile(values, q)) for q in (50, 95, 99)}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_engines(config, args):
+    # setup_engines with stand-ins, so the real snapshot, vector index and engine wiring are measured
+    llm = FakeChatOpenAI(args.llm_latency, args.token_latency)
+    token_encoder = WhitespaceEncoder()
+    llm, token_encoder, env_vars, reports, entities, relationships, covariates, text_units = setup_engines(config, llm=llm, token_encoder=token_encoder)
+    embedder = FakeEmbedding(args.embedding_dim, args.embedding_latency, token_encoder)
+    text_embedder = CachedTextEmbedding(embedder, embedder.model, EmbeddingCache(disk_path=None))
+    return setup_search_engines(llm, token_encoder, reports, entities, relationships, covariates, text_units, env_vars, config, text_embedder=text_embedder)
+
+
+async def run_queries(engine, mode, queries, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def run_one(index, query):
+        async with semaphore:
+            query_context = QueryContext(mode=mode, query_id=f"bench-{mode}-{index}", session_id=f"bench-{index % concurrency}")
+            with activate_query_context(query_context):
+                await engine.asearch(query)
+            latencies.append(query_context.latency)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[run_one(index, query) for index, query in enumerate(queries)])
+    wall = time.perf_counter() - started
+    return {
+        "queries": len(queries),
+        "wall_seconds": wall,
+        "throughput_qps": len(queries) / wall,
+        **_percentiles(latencies, "latency"),
+    }
+
+
+def run_scale(n_entities, args):
+    registry = get_metrics_registry()
+    registry.reset()
+    with tempfile.TemporaryDirectory() as tmp:
+        artifacts_dir = os.path.join(tmp, "output", "benchmark", "artifacts")
+        results = {}
+        _, results["generate_seconds"] = _timed(lambda: generate_artifacts(artifacts_dir, n_entities, args.embedding_dim, args.levels))
+
+        load_data.clear()
+        frames, results["load_data_seconds"] = _timed(lambda: load_data(artifacts_dir))
+        prepare_context.clear()
+        _, results["prepare_context_seconds"] = _timed(lambda: prepare_context(frames, args.community_level))
+        del frames
+
+        config = {**DEFAULT_SEARCH_CONFIG, "api_key": "benchmark", "artifacts_dir": artifacts_dir, "community_level": args.community_level}
+        load_prepared_context.clear()
+        _, results["engine_setup_cold_seconds"] = _timed(lambda: build_engines(config, args))
+        # Second build reuses the snapshot and entity index written by the first
+        load_prepared_context.clear()
+        (global_engine, local_engine, _, query_router), results["engine_setup_warm_seconds"] = _timed(lambda: build_engines(config, args))
+
+        rng = np.random.default_rng(0)
+        # The first route builds the entity title index and report token counts
+        route_queries = [f"How is ENTITY_{a} related to ENTITY_{b}?" for a, b in np.random.default_rng(1).integers(0, n_entities, (args.queries, 2))]
+        _, results["route_cold_seconds"] = _timed(lambda: query_router.route(route_queries[0]))
+        _, route_seconds = _timed(lambda: [query_router.route(query) for query in route_queries])
+        results["route_per_query_seconds"] = route_seconds / len(route_queries)
+        results["queries"] = {}
+        for mode, engine in (("local", local_engine), ("global", global_engine)):
+            results["queries"][mode] = {}
+            for concurrency in args.concurrency:
+                queries = [
+                    f"How is ENTITY_{a} related to ENTITY_{b}? (run {concurrency})"
+                    for a, b in rng.integers(0, n_entities, (args.queries, 2))
+                ]
+                results["queries"][mode][str(concurrency)] = asyncio.run(run_queries(engine, mode, queries, concurrency))
+
+    results["spans"] = {
+        f"{name}/{mode}": {
+            "count": data["count"],
+            "tokens": data["tokens"],
+            **{f"p{int(q * 100)}_seconds": value for q, value in data["quantiles"].items()},
+        }
+        for (name, mode), data in sorted(registry.snapshot().items())
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RAY's loading, engine setup and query paths with local LLM/embedding stand-ins")
+    parser.add_argument("--scales", type=lambda value: [int(v) for v in value.split(",")], default=[1_000, 10_000],
+                        help="Comma-separated entity counts, e.g. 1000,10000,100000,1000000")
+    parser.add_argument("--embedding-dim", type=int, default=1536, help="Lower this for 1M entities (1536 floats is ~6 GB there)")
+    parser.add_argument("--levels", type=int, default=3)
+    parser.add_argument("--community-level", type=int, default=2)
+    parser.add_argument("--concurrency", type=lambda value: [int(v) for v in value.split(",")], default=[1, 4, 16])
+    parser.add_argument("--queries", type=int, default=32, help="Queries per mode and concurrency level")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per fake LLM request")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds per streamed fake token")
+    parser.add_argument("--embedding-latency", type=float, default=0.02, help="Seconds per fake embedding request")
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args()
+
+    for name in ("GRAPHRAG_API_KEY", "GRAPHRAG_LLM_MODEL", "GRAPHRAG_EMBEDDING_MODEL"):
+        os.environ.setdefault(name, "benchmark")
+
+    report = {
+        "commit": _git_commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": vars(args),
+        "scales": {},
+    }
+    for n_entities in args.scales:
+        results = report["scales"][str(n_entities)] = run_scale(n_entities, args)
+        print(f"{n_entities} entities")
+        for name in ("load_data_seconds", "prepare_context_seconds", "engine_setup_cold_seconds", "engine_setup_warm_seconds",
+                     "route_cold_seconds", "route_per_query_seconds"):
+            print(f"  {name:<28} {results[name]:.3f}")
+        for mode, by_concurrency in results["queries"].items():
+            for concurrency, stats in by_concurrency.items():
+                print(f"  {mode:<6} c={concurrency:<3} p50 {stats['latency_p50_seconds']:.3f}s  p95 {stats['latency_p95_seconds']:.3f}s  {stats['throughput_qps']:.1f} q/s")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
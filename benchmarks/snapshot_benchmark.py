@@ -0,0 +1,53 @@
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from src.data.data_loader import read_indexer_context
+from src.data.snapshot import TABLE_NAMES, read_artifact_tables, read_snapshot, write_snapshot
+from .synthetic_artifacts import generate_artifacts
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - start
+
+
+def run(n_entities, community_level, other_level):
+    with tempfile.TemporaryDirectory() as tmp:
+        artifacts_dir = generate_artifacts(os.path.join(tmp, "artifacts"), n_entities)
+        timings = {}
+
+        # Current path: full parquet decode followed by the read_indexer_* adapters
+        frames, timings["parquet_full_read"] = _timed(
+            lambda: {name: pd.read_parquet(f"{artifacts_dir}/{filename}.parquet") for name, filename in TABLE_NAMES.items()}
+        )
+        _, timings["adapter_pass"] = _timed(lambda: read_indexer_context(frames, community_level))
+
+        # One-off snapshot builds for both levels
+        def build(level):
+            write_snapshot(artifacts_dir, level, read_indexer_context(read_artifact_tables(artifacts_dir), level))
+        _, timings["snapshot_build"] = _timed(lambda: build(community_level))
+        _, timings["snapshot_build_other_level"] = _timed(lambda: build(other_level))
+
+        _, timings["snapshot_load"] = _timed(lambda: read_snapshot(artifacts_dir, community_level))
+        _, timings["snapshot_level_switch"] = _timed(lambda: read_snapshot(artifacts_dir, other_level))
+
+    print(f"{n_entities} entities, community level {community_level} (switch to {other_level})")
+    print(f"  current path (parquet + adapters): {timings['parquet_full_read'] + timings['adapter_pass']:.3f}s")
+    print(f"  snapshot load:                     {timings['snapshot_load']:.3f}s")
+    for name, seconds in timings.items():
+        print(f"    {name:<28} {seconds:.3f}s")
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare load_data + prepare_context against the prepared-context snapshot")
+    parser.add_argument("--entities", type=int, default=100_000)
+    parser.add_argument("--community-level", type=int, default=2)
+    parser.add_argument("--other-level", type=int, default=1)
+    args = parser.parse_args()
+    run(args.entities, args.community_level, args.other_level)
@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Modules the first page does not need; any of them loaded by `import main` is a cold-start regression
+HEAVY_MODULES = ("graphrag", "openai", "tiktoken", "pandas", "pyarrow", "langchain", "lancedb", "chromadb")
+
+IMPORT_SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+import main
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [name for name in {HEAVY_MODULES!r} if name in sys.modules]}}))
+"""
+
+
+def _git_commit(root):
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_importtime(stderr):
+    """(depth, module, cumulative seconds) for every line of `python -X importtime` output."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append((depth, name.strip(), int(cumulative) / 1e6))
+    return modules
+
+
+def profile_once(root):
+    # A fresh interpreter each time, so nothing is already imported or cached in memory
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT], cwd=root, capture_output=True, text=True, check=True)
+    wall_seconds = time.perf_counter() - start
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    return wall_seconds, result, parse_importtime(completed.stderr)
+
+
+def run(args):
+    root = os.path.abspath(args.root)
+    wall, imports, loaded, profiles = [], [], set(), []
+    for _ in range(args.runs):
+        wall_seconds, result, modules = profile_once(root)
+        wall.append(wall_seconds)
+        imports.append(result["seconds"])
+        loaded.update(result["loaded"])
+        profiles.append(modules)
+
+    # What `main` itself imports, by cumulative time of the median run
+    median_run = profiles[int(np.argsort(imports)[len(imports) // 2])]
+    top = sorted(((name, seconds) for depth, name, seconds in median_run if depth == 1), key=lambda item: item[1], reverse=True)
+    results = {
+        "process_p50_seconds": float(np.percentile(wall, 50)),
+        "import_main_p50_seconds": float(np.percentile(imports, 50)),
+        "import_main_max_seconds": float(max(imports)),
+        "heavy_modules_loaded": sorted(loaded),
+        "slowest_imports": {name: seconds for name, seconds in top[:args.top]},
+    }
+
+    print(f"{root} ({args.runs} cold starts)")
+    print(f"  interpreter start + import main p50 {results['process_p50_seconds']:.3f}s")
+    print(f"  import main p50 {results['import_main_p50_seconds']:.3f}s, max {results['import_main_max_seconds']:.3f}s")
+    print(f"  heavy modules loaded before the first page: {', '.join(results['heavy_modules_loaded']) or 'none'}")
+    for name, seconds in top[:args.top]:
+        print(f"    {name:<40} {seconds:.3f}s")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile the imports RAY's app runs before it can draw its first page")
+    parser.add_argument("--root", default=".", help="Checkout to profile, e.g. a git worktree of an older commit")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start")
+    parser.add_argument("--top", type=int, default=10, help="Slowest direct imports of main.py to list")
+    parser.add_argument("--output", default=None, help="Write results in the format benchmarks.compare reads")
+    args = parser.parse_args()
+    results = run(args)
+    if args.output:
+        report = {
+            "commit": _git_commit(args.root),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": vars(args),
+            "scales": {"startup": results},
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
@@ -0,0 +1,129 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+WORDS = (
+    "graph community entity relation report summary market product policy research team "
+    "revenue risk customer supplier region strategy model data system network finance"
+).split()
+
+
+def _sentences(rng, count, length):
+    words = np.array(WORDS)
+    return [" ".join(words[rng.integers(0, len(words), length)]) for _ in range(count)]
+
+
+def generate_artifacts(artifacts_dir, n_entities=10_000, embedding_dim=1536, levels=3, branching=8, seed=0):
+    rng = np.random.default_rng(seed)
+    os.makedirs(artifacts_dir, exist_ok=True)
+    titles = [f"ENTITY_{i}" for i in range(n_entities)]
+    n_text_units = max(1, n_entities // 4)
+    n_relationships = n_entities * 2
+    text_unit_ids = [f"tu-{i}" for i in range(n_text_units)]
+
+    # Nested communities: level L splits the entity range into branching**(L + 1) contiguous blocks
+    node_rows = []
+    reports = []
+    offset = 0
+    for level in range(levels):
+        n_communities = min(n_entities, branching ** (level + 1))
+        block = -(-n_entities // n_communities)
+        communities = np.arange(n_entities) // block + offset
+        node_rows.append(pd.DataFrame({
+            "id": titles,
+            "level": level,
+            "title": titles,
+            "type": "ORGANIZATION",
+            "description": "",
+            "community": communities.astype(str),
+            "degree": rng.integers(1, 50, n_entities),
+            "human_readable_id": np.arange(n_entities),
+        }))
+        unique = np.unique(communities)
+        reports.append(pd.DataFrame({
+            "community": unique.astype(str),
+            "level": level,
+            "title": [f"Community {c}" for c in unique],
+            "summary": _sentences(rng, len(unique), 60),
+            "full_content": _sentences(rng, len(unique), 400),
+            "rank": rng.uniform(1, 10, len(unique)),
+            "rank_explanation": "synthetic",
+            "id": unique.astype(str),
+        }))
+        offset += len(unique)
+
+    embeddings = rng.standard_normal((n_entities, embedding_dim), dtype=np.float32)
+    entity_text_units = rng.integers(0, n_text_units, (n_entities, 2))
+    entities = pd.DataFrame({
+        "id": [f"e-{i}" for i in range(n_entities)],
+        "name": titles,
+        "type": "ORGANIZATION",
+        "description": _sentences(rng, n_entities, 30),
+        "human_readable_id": np.arange(n_entities),
+        "text_unit_ids": [[text_unit_ids[a], text_unit_ids[b]] for a, b in entity_text_units],
+        "description_embedding": list(embeddings),
+    })
+
+    sources = rng.integers(0, n_entities, n_relationships)
+    targets = rng.integers(0, n_entities, n_relationships)
+    relationships = pd.DataFrame({
+        "id": [f"r-{i}" for i in range(n_relationships)],
+        "human_readable_id": [str(i) for i in range(n_relationships)],
+        "source": [titles[i] for i in sources],
+        "target": [titles[i] for i in targets],
+        "description": _sentences(rng, n_relationships, 20),
+        "weight": rng.uniform(0, 10, n_relationships),
+        "text_unit_ids": [[text_unit_ids[i % n_text_units]] for i in range(n_relationships)],
+        "rank": rng.integers(1, 100, n_relationships),
+    })
+
+    n_covariates = max(1, n_entities // 10)
+    covariates = pd.DataFrame({
+        "id": [f"c-{i}" for i in range(n_covariates)],
+        "human_readable_id": [str(i) for i in range(n_covariates)],
+        "covariate_type": "claim",
+        "type": "FACT",
+        "description": _sentences(rng, n_covariates, 20),
+        "subject_id": [titles[i] for i in rng.integers(0, n_entities, n_covariates)],
+        "subject_type": "entity",
+        "object_id": "NONE",
+        "status": "TRUE",
+        "start_date": "NONE",
+        "end_date": "NONE",
+        "source_text": "",
+        "text_unit_id": [text_unit_ids[i % n_text_units] for i in range(n_covariates)],
+    })
+
+    entity_ids = entities["id"].to_numpy()
+    text_units = pd.DataFrame({
+        "id": text_unit_ids,
+        "text": _sentences(rng, n_text_units, 250),
+        "n_tokens": 300,
+        "document_ids": [["doc-0"]] * n_text_units,
+        "entity_ids": [list(entity_ids[i * 4:(i + 1) * 4]) for i in range(n_text_units)],
+        "relationship_ids": [[f"r-{i}", f"r-{i + n_text_units}"] for i in range(n_text_units)],
+    })
+
+    tables = {
+        "create_final_nodes": pd.concat(node_rows, ignore_index=True),
+        "create_final_community_reports": pd.concat(reports, ignore_index=True),
+        "create_final_entities": entities,
+        "create_final_relationships": relationships,
+        "create_final_covariates": covariates,
+        "create_final_text_units": text_units,
+    }
+    for name, df in tables.items():
+        df.to_parquet(os.path.join(artifacts_dir, f"{name}.parquet"), index=False)
+    return artifacts_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic create_final_* artifacts")
+    parser.add_argument("artifacts_dir")
+    parser.add_argument("--entities", type=int, default=10_000)
+    parser.add_argument("--embedding-dim", type=int, default=1536)
+    parser.add_argument("--levels", type=int, default=3)
+    args = parser.parse_args()
+    generate_artifacts(args.artifacts_dir, args.entities, args.embedding_dim, args.levels)
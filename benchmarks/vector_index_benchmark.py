@@ -0,0 +1,76 @@
+import argparse
+import tempfile
+import time
+
+import numpy as np
+from graphrag.vector_stores.base import VectorStoreDocument
+
+from src.engines.numpy_vector_store import NumpyVectorStore
+
+
+def _recall(found_ids, expected_ids):
+    return np.mean([len(set(f) & set(e)) / len(e) for f, e in zip(found_ids, expected_ids)])
+
+
+def _time_queries(search, queries):
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append([r.document.id for r in search(query)])
+        latencies.append(time.perf_counter() - start)
+    return results, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 95) * 1000
+
+
+def run(n_entities, dim, n_queries, k, with_lancedb):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n_entities, dim)).astype(np.float32)
+    ids = [f"e-{i}" for i in range(n_entities)]
+    # Queries near existing entities, like a question that names one of them
+    queries = vectors[rng.integers(0, n_entities, n_queries)] + 0.5 * rng.standard_normal((n_queries, dim)).astype(np.float32)
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    exact = np.argsort(-(queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ normalized.T, axis=1)[:, :k]
+    expected = [[ids[i] for i in row] for row in exact]
+    documents = [VectorStoreDocument(id=i, text=None, vector=v) for i, v in zip(ids, vectors.tolist())]
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for dtype in ("float32", "float16"):
+            store = NumpyVectorStore(dtype=dtype)
+            start = time.perf_counter()
+            store.connect(db_uri=f"{tmp}/numpy_{dtype}")
+            store.load_documents(documents)
+            build = time.perf_counter() - start
+            found, p50, p95 = _time_queries(lambda q: store.similarity_search_by_vector(q, k), queries)
+            start = time.perf_counter()
+            store.similarity_search_batch(queries, k)
+            batch = (time.perf_counter() - start) * 1000 / n_queries
+            rows.append((f"numpy {dtype}", build, p50, p95, batch, _recall(found, expected)))
+
+        if with_lancedb:
+            from graphrag.vector_stores.lancedb import LanceDBVectorStore
+            store = LanceDBVectorStore(collection_name="entity_description_embeddings")
+            start = time.perf_counter()
+            store.connect(db_uri=f"{tmp}/lancedb")
+            store.load_documents(documents)
+            build = time.perf_counter() - start
+            found, p50, p95 = _time_queries(lambda q: store.similarity_search_by_vector(q.tolist(), k), queries)
+            rows.append(("lancedb", build, p50, p95, float("nan"), _recall(found, expected)))
+
+    print(f"{n_entities} entities x {dim} dims, {n_queries} queries, top-{k}")
+    print(f"  {'store':<16}{'build s':>9}{'p50 ms':>9}{'p95 ms':>9}{'batch ms/q':>12}{'recall':>8}")
+    for name, build, p50, p95, batch, recall in rows:
+        print(f"  {name:<16}{build:>9.2f}{p50:>9.2f}{p95:>9.2f}{batch:>12.2f}{recall:>8.3f}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall and latency of the NumPy entity index against LanceDB")
+    parser.add_argument("--entities", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--skip-lancedb", action="store_true")
+    args = parser.parse_args()
+    run(args.entities, args.dim, args.queries, args.k, not args.skip_lancedb)
@@ -1,35 +1,111 @@
 import asyncio
 import streamlit as st
-from src.config.config import INPUT_DIR, PROMPTS_DIR, BASE_DIR
-from src.engines import setup_engines, setup_search_engines
-from src.ui.ui import setup_page_config, apply_custom_css, setup_sidebar, display_result
-from src.indexing.indexing import check_indexing_status, perform_indexing
-from src.utils.utils import initialize_directories, save_results_to_csv
+from src.config.config import INPUT_DIR
+from src.engines import get_engine_registry, get_active_index, get_conversation_store
+from src.ui.ui import setup_page_config, apply_custom_css, setup_sidebar, display_route, display_result, display_query_history, ResultView
+from src.engines.query import execute_query, is_cached
+from src.engines.query_context import QueryContext
+from src.indexing.indexing import check_indexing_status, perform_indexing, add_uploaded_file
+from src.indexing.ingestion import SUPPORTED_EXTENSIONS
+from src.utils.utils import initialize_directories
+from src.history import get_query_history
+from src.telemetry import start_metrics_exporter
 import os
+import uuid
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', filename='ray.log')
 logger = logging.getLogger(__name__)
 
-async def process_query(query, search_engine, mode):
+def get_session_id():
+    return st.session_state.setdefault("ray_session_id", uuid.uuid4().hex)
+
+def new_conversation():
+    get_conversation_store().reset(get_session_id())
+    st.session_state["user_input"] = ""
+    st.session_state.pop("recorded_query", None)
+
+async def process_query(query, search_engine, mode, config, view=None):
     logger.info(f"Processing query: {query} in {mode} mode")
+    session_id = get_session_id()
+    query_context = QueryContext(
+        mode=mode,
+        on_token=view.on_token if view else None,
+        on_map_progress=view.on_map_progress if view else None,
+        session_id=session_id,
+        token_budget=config.get("token_budget"),
+        # Follow-ups see the earlier turns of this browser session
+        conversation=get_conversation_store().get(session_id),
+    )
     with st.spinner("RAY is processing your query..."):
-        search_query = f"{query} Please format your answer in markdown."
-        response = await search_engine.asearch(search_query)
+        return await execute_query(query, search_engine, mode, config, query_context)
+
+def chat(mode, config):
+    st.title("Chat with RAY")
     
-    logger.info(f"Query processed. Tokens: {response.prompt_tokens}, LLM Calls: {response.llm_calls}")
-    return {
-        "Response": response.response,
-        "Tokens": response.prompt_tokens,
-        "LLM Calls": response.llm_calls
-    }
+    # Display user message input in the main area
+    user_message = st.text_input("Your message:", key="user_input")
+    if len(get_conversation_store().get(get_session_id())):
+        st.button("New Conversation", on_click=new_conversation)
+
+    if not user_message:
+        # The page is already drawn; the engines for the selected settings are built while the user types
+        get_engine_registry().prewarm(config)
+        display_query_history()
+        return
+
+    try:
+        logger.info("Setting up engines")
+        global_search_engine, local_search_engine, vanilla_search_engine, query_router = get_engine_registry().get(config)
+    except Exception as e:
+        logger.error(f"Error setting up search engines: {str(e)}", exc_info=True)
+        st.error(f"Error setting up search engines: {str(e)}")
+        st.error("This might be due to missing or corrupted index files. Please try to integrate the knowledge into RAY's brain.")
+        if st.button("Integrate the knowledge into RAY's Brain"):
+            logger.info("Performing indexing after setup error")
+            perform_indexing()
+        return
+
+    search_engines = {"global": global_search_engine, "local": local_search_engine, "vanilla": vanilla_search_engine}
+    conversation = get_conversation_store().get(get_session_id())
+    # Costs are estimated before anything is sent to the LLM; an answer already in the response cache costs nothing
+    decision = query_router.route(
+        user_message, mode, budget=config["token_budget"], use_embeddings=config["router_embeddings"],
+        is_cached=lambda name: is_cached(user_message, search_engines[name], name, config, conversation),
+    )
+    display_route(decision)
+    mode = decision["mode"]
+
+    if decision["within_budget"]:
+        # Tokens stream into the view while the engine is still running
+        view = ResultView(mode.capitalize())
+        logger.info(f"Processing {mode} query: {user_message}")
+        result = asyncio.run(process_query(user_message, search_engines[mode], mode, config, view))
+        
+        result = query_router.record_outcome(decision, result)
+
+        # Display the latest result
+        display_result(mode.capitalize(), result, view)
+        
+        # Other widgets rerun the script with the question still in the input; record each submission once
+        submission = (user_message, mode, repr(sorted(config.items())))
+        if st.session_state.get("recorded_query") != submission:
+            # Written by a background thread, off the request path
+            get_query_history().record(user_message, mode, config, result)
+            st.session_state["recorded_query"] = submission
+
+    display_query_history()
 
 def main():
     logger.info("Starting RAY application")
     setup_page_config()
     apply_custom_css()
     
-    initialize_directories(INPUT_DIR, PROMPTS_DIR, BASE_DIR)
+    initialize_directories(INPUT_DIR)
+    start_metrics_exporter()
+    active_index = get_active_index()
+    # Picks up runs published by indexing in any session or process and warms them in the background
+    active_index.refresh()
     
     mode, config = setup_sidebar()
     
@@ -38,11 +114,8 @@ def main():
     
     if not files_exist:
         st.warning("No files in RAY's knowledge base. Please add files.")
-        uploaded_file = st.file_uploader("Upload New File", type=["txt"])
-        if uploaded_file is not None:
-            logger.info(f"File uploaded: {uploaded_file.name}")
-            with open(os.path.join(INPUT_DIR, uploaded_file.name), "wb") as f:
-                f.write(uploaded_file.getbuffer())
+        uploaded_file = st.file_uploader("Upload New File", type=list(SUPPORTED_EXTENSIONS))
+        if uploaded_file is not None and add_uploaded_file(uploaded_file):
             st.success(f"File {uploaded_file.name} has been uploaded. You can now perform indexing.")
             files_exist = True
             st.experimental_rerun()
@@ -56,37 +129,9 @@ def main():
 
     logger.info(f"User selected mode: {mode}")
 
-    try:
-        logger.info("Setting up engines")
-        llm, token_encoder, env_vars, reports, entities, relationships, covariates, text_units = setup_engines(config)
-        global_search_engine, local_search_engine = setup_search_engines(llm, token_encoder, reports, entities, relationships, covariates, text_units, env_vars, config)
-    except Exception as e:
-        logger.error(f"Error setting up search engines: {str(e)}", exc_info=True)
-        st.error(f"Error setting up search engines: {str(e)}")
-        st.error("This might be due to missing or corrupted index files. Please try to integrate the knowledge into RAY's brain.")
-        if st.button("Integrate the knowledge into RAY's Brain"):
-            logger.info("Performing indexing after setup error")
-            perform_indexing()
-        return
-
-    st.title("Chat with RAY")
-    
-    # Display user message input in the main area
-    user_message = st.text_input("Your message:", key="user_input")
-
-    if user_message:
-        if mode == "global":
-            logger.info(f"Processing global query: {user_message}")
-            result = asyncio.run(process_query(user_message, global_search_engine, mode))
-        else:
-            logger.info(f"Processing local query: {user_message}")
-            result = asyncio.run(process_query(user_message, local_search_engine, mode))
-        
-        # Display the latest result
-        display_result(mode.capitalize(), result)
-        
-        # Save results to CSV
-        save_results_to_csv(result, user_message, mode)
+    # Queries finish on the index run they started on, even if a newer one is swapped in meanwhile
+    with active_index.reading(config) as config:
+        chat(mode, config)
 
     logger.info("RAY application finished processing")
 
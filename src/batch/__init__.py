@@ -0,0 +1 @@
+from .batch_runner import load_queries, load_completed_ids, run_batch
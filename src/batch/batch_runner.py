@@ -0,0 +1,159 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+from ..config.config import API_KEY, OUTPUT_DIR, DEFAULT_SEARCH_CONFIG
+from ..engines import get_engine_registry
+from ..engines.registry import engine_key
+from ..engines.query import execute_query, format_search_query, is_cached
+from ..engines.query_context import QueryContext
+from ..engines.router import QueryRouter
+from ..utils.utils import get_latest_artifacts_dir
+
+logger = logging.getLogger(__name__)
+
+def load_queries(queries_path, default_mode="global"):
+    queries = []
+    artifacts_dir = get_latest_artifacts_dir(OUTPUT_DIR)
+    with open(queries_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            queries.append({
+                "id": str(entry.get("id", f"line-{line_number}")),
+                "query": entry["query"],
+                "mode": entry.get("mode", default_mode),
+                "config": {
+                    **DEFAULT_SEARCH_CONFIG,
+                    "api_key": API_KEY,
+                    "artifacts_dir": artifacts_dir,
+                    **entry.get("config", {}),
+                },
+            })
+    return queries
+
+
+def load_completed_ids(output_path):
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a truncated last line; that query simply runs again
+                continue
+            if not record.get("error"):
+                completed.add(record["id"])
+    return completed
+
+
+def build_engines(queries):
+    # Hold our own references so pool eviction cannot drop engines mid-batch
+    registry = get_engine_registry()
+    engines = {}
+    for entry in queries:
+        key = engine_key(entry["config"])
+        if key not in engines:
+            global_search_engine, local_search_engine, vanilla_search_engine, query_router = registry.get(entry["config"])
+            engines[key] = {"global": global_search_engine, "local": local_search_engine, "vanilla": vanilla_search_engine, "router": query_router}
+    return engines
+
+
+def route_queries(pending, engines):
+    # Routing needs no LLM call, so every entry knows its engine before anything runs
+    for entry in pending:
+        entry_engines = engines[engine_key(entry["config"])]
+        entry["route"] = entry_engines["router"].route(
+            entry["query"],
+            entry["mode"] if entry["mode"] in ("auto", "global", "vanilla") else "local",
+            budget=entry["config"].get("token_budget"),
+            use_embeddings=entry["config"].get("router_embeddings", False),
+            is_cached=lambda name, entry=entry: is_cached(entry["query"], entry_engines[name], name, entry["config"]),
+        )
+
+
+def prefetch_query_embeddings(pending, engines):
+    # Local search embeds each query synchronously, so concurrent batch queries
+    # never overlap there; embed them all in batched requests before starting
+    texts_by_engine = {}
+    for entry in pending:
+        if entry["route"]["mode"] == "local":
+            engine = engines[engine_key(entry["config"])]["local"]
+            texts_by_engine.setdefault(id(engine), (engine, []))[1].append(format_search_query(entry["query"]))
+    for engine, texts in texts_by_engine.values():
+        text_embedder = engine.context_builder.text_embedder
+        if hasattr(text_embedder, "prefetch"):
+            try:
+                fetched = text_embedder.prefetch(texts)
+                logger.info(f"Prefetched {fetched} query embeddings")
+            except Exception as e:
+                logger.warning(f"Query embedding prefetch failed, embedding per query instead: {str(e)}")
+
+
+async def _run_one(entry, engines, global_limit, mode_limits, output):
+    route = entry["route"]
+    mode = route["mode"]
+    engine = engines[engine_key(entry["config"])][mode]
+    async with global_limit, mode_limits[mode]:
+        started = time.perf_counter()
+        record = {
+            "id": entry["id"],
+            "query": entry["query"],
+            "mode": mode,
+            "requested_mode": route["requested_mode"],
+            "route_reason": route["reason"],
+            "estimated_tokens": route["estimate"]["prompt_tokens"],
+            "estimated_llm_calls": route["estimate"]["llm_calls"],
+        }
+        try:
+            if not route["within_budget"]:
+                raise ValueError(f"Estimated {route['estimate']['prompt_tokens']} tokens exceeds the budget of {route['budget']}")
+            result = await execute_query(entry["query"], engine, mode, entry["config"], QueryContext(mode=mode, query_id=entry["id"], session_id="batch", token_budget=entry["config"].get("token_budget")))
+            QueryRouter.record_outcome(route, result)
+            record.update({
+                "response": result["Response"],
+                "tokens": result["Tokens"],
+                "llm_calls": result["LLM Calls"],
+                "cached": bool(result.get("Cached")),
+            })
+        except Exception as e:
+            logger.error(f"Query {entry['id']} failed: {str(e)}", exc_info=True)
+            record["error"] = str(e)
+        record["wall_time"] = round(time.perf_counter() - started, 3)
+    # Single event loop, so whole lines are written without interleaving
+    output.write(json.dumps(record) + "\n")
+    output.flush()
+    return record
+
+
+async def run_batch(queries, output_path, concurrency, mode_concurrency=None):
+    completed = load_completed_ids(output_path)
+    pending = [entry for entry in queries if entry["id"] not in completed]
+    logger.info(f"{len(completed)} queries already completed, {len(pending)} to run")
+    if not pending:
+        return []
+
+    engines = build_engines(pending)
+    route_queries(pending, engines)
+    prefetch_query_embeddings(pending, engines)
+    mode_concurrency = mode_concurrency or {}
+    global_limit = asyncio.Semaphore(concurrency)
+    mode_limits = {
+        mode: asyncio.Semaphore(mode_concurrency.get(mode, concurrency))
+        for mode in {entry["route"]["mode"] for entry in pending}
+    }
+    with open(output_path, "a+", encoding="utf-8") as output:
+        # Terminate a line truncated by an earlier crash before appending
+        if output.tell() > 0:
+            output.seek(output.tell() - 1)
+            if output.read(1) != "\n":
+                output.write("\n")
+        return await asyncio.gather(*[
+            _run_one(entry, engines, global_limit, mode_limits, output) for entry in pending
+        ])
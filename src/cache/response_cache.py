@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import streamlit as st
+
+from ..config.config import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_PATH
+from ..telemetry import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+CACHE_CONFIG_KEYS = (
+    "community_level",
+    "allow_general_knowledge",
+    "use_community_summary",
+    "include_community_rank",
+    "report_filter",
+    "report_top_n",
+    "report_min_score",
+    "tiered_global",
+    # Set by execute_query to the model the engine's LLM calls, not the sidebar setting
+    "llm_model",
+    # Set by execute_query for tiered global search only, which stops early when it spends the budget
+    "tiered_token_budget",
+    # Digest of the earlier turns when the query is a follow-up
+    "conversation",
+)
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+class ResponseCache:
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds=RESPONSE_CACHE_TTL_SECONDS, disk_path=RESPONSE_CACHE_PATH):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if disk_path:
+            os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, fingerprint TEXT, created REAL, value TEXT)"
+            )
+            self._db.commit()
+
+    def make_key(self, query, mode, config, artifacts_fingerprint):
+        payload = {
+            "query": normalize_query(query),
+            "mode": mode,
+            "config": {name: config.get(name) for name in CACHE_CONFIG_KEYS},
+            "artifacts": artifacts_fingerprint,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _expired(self, created):
+        return self.ttl_seconds is not None and time.time() - created > self.ttl_seconds
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None and self._db is not None:
+            row = self._db.execute(
+                "SELECT fingerprint, created, value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                entry = (row[0], row[1], json.loads(row[2]))
+                self._remember(key, entry)
+        if entry is not None and self._expired(entry[1]):
+            self._forget(key)
+            entry = None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def __contains__(self, key):
+        # A probe, e.g. by the budget gate; only get counts towards the hit rate
+        with self._lock:
+            return self._lookup(key) is not None
+
+    def set(self, key, value, artifacts_fingerprint):
+        entry = (artifacts_fingerprint, time.time(), value)
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, fingerprint, created, value) VALUES (?, ?, ?, ?)",
+                    (key, entry[0], entry[1], json.dumps(value)),
+                )
+                self._db.commit()
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _forget(self, key):
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db.commit()
+
+    def invalidate(self, current_fingerprint=None):
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry[0] != current_fingerprint]
+            for key in stale:
+                del self._entries[key]
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses WHERE fingerprint IS NOT ?", (current_fingerprint,))
+                self._db.commit()
+        logger.info(f"Response cache invalidated, {len(stale)} in-memory entries dropped")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+@st.cache_resource
+def get_response_cache():
+    cache = ResponseCache()
+    get_metrics_registry().register_gauges("response_cache", cache.stats)
+    return cache
@@ -16,6 +16,60 @@ from .config import (
     RETRIEVER_TYPES,
     VECTORSTORE_DIR,
     COLLECTION_NAME,
-    ARTIFACTS_DIR,
+    DEFAULT_SEARCH_CONFIG,
+    BATCH_CONCURRENCY,
+    ENGINE_POOL_SIZE,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_TTL_SECONDS,
+    RESPONSE_CACHE_PATH,
+    INDEX_MANIFEST_PATH,
+    SNAPSHOT_DIRNAME,
+    ENTITY_VECTOR_STORE,
+    ENTITY_VECTOR_DTYPE,
+    ENTITY_INDEX_DIRNAME,
+    EMBEDDING_CACHE_MAX_ENTRIES,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_BATCH_WINDOW_SECONDS,
+    EMBEDDING_MAX_BATCH_SIZE,
+    REPORT_FILTER_LEXICAL_WEIGHT,
+    LLM_MAX_RETRIES,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_TARGET_LATENCY_SECONDS,
+    EMBEDDING_REQUESTS_PER_MINUTE,
+    EMBEDDING_TOKENS_PER_MINUTE,
+    EMBEDDING_TARGET_LATENCY_SECONDS,
+    RATE_LIMIT_BACKOFF_SECONDS,
+    HISTORY_DB_PATH,
+    HISTORY_BATCH_SIZE,
+    HISTORY_FLUSH_INTERVAL_SECONDS,
+    HISTORY_PAGE_SIZE,
+    LEGACY_RESULTS_CSV,
+    TRACING_ENABLED,
+    METRICS_EXPORT_PATH,
+    METRICS_EXPORT_INTERVAL_SECONDS,
+    METRICS_PORT,
+    RAW_INPUT_DIR,
+    EXTRACTION_CACHE_DIR,
+    INGEST_MANIFEST_PATH,
+    INGEST_WORKERS,
+    UPLOAD_CHUNK_BYTES,
+    VANILLA_MANIFEST_PATH,
+    VANILLA_TOP_K,
+    VANILLA_CANDIDATES,
+    ROUTER_GLOBAL_THRESHOLD,
+    ROUTER_SEMANTIC_WEIGHT,
+    ROUTER_MAX_ENTITY_NGRAM,
+    INDEX_RUNS_TO_KEEP,
+    TOKEN_COUNT_MIN_CHARS,
+    TOKEN_COUNT_MEMO_SIZE,
+    TIERED_POINT_MIN_SCORE,
+    TIERED_TARGET_POINTS,
+    TIERED_DRILL_MIN_SCORE,
+    CONVERSATION_MAX_TURNS,
+    CONVERSATION_MAX_ANSWER_CHARS,
+    CONVERSATION_CARRIED_ENTITIES,
+    CONVERSATION_MAX_SESSIONS,
+    CONVERSATION_IDLE_SECONDS,
 )
 
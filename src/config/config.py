@@ -1,8 +1,6 @@
 import os
 from dotenv import load_dotenv
 
-from src.utils.utils import get_latest_artifacts_dir
-
 load_dotenv()
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..', 'brain'))
 INPUT_DIR = f"{BASE_DIR}/input"
@@ -20,4 +18,71 @@ CONCURRENT_COROUTINES = 32
 RETRIEVER_TYPES = ('*.pdf', '*.pptx', '*.docx', '*.csv', '*.txt')
 VECTORSTORE_DIR = './chromadb'
 COLLECTION_NAME = 'knowledge_base_docs'
-ARTIFACTS_DIR = get_latest_artifacts_dir(OUTPUT_DIR)
+DEFAULT_SEARCH_CONFIG = {
+    "openai_model": "gpt-4o-mini",
+    "temperature": 0.0,
+    "allow_general_knowledge": False,
+    "use_community_summary": False,
+    "include_community_rank": True,
+    "community_level": 2,
+    "report_filter": False,
+    "report_top_n": 30,
+    "report_min_score": 0.0,
+    "token_budget": 0,
+    "tiered_global": False,
+    "router_embeddings": False,
+}
+BATCH_CONCURRENCY = 8
+ENGINE_POOL_SIZE = 4
+RESPONSE_CACHE_MAX_ENTRIES = 256
+RESPONSE_CACHE_TTL_SECONDS = 24 * 60 * 60
+RESPONSE_CACHE_PATH = f"{BASE_DIR}/ray_cache/responses.sqlite"
+INDEX_MANIFEST_PATH = f"{BASE_DIR}/ray_cache/input_manifest.json"
+SNAPSHOT_DIRNAME = "ray_snapshots"
+ENTITY_VECTOR_STORE = "numpy"  # "numpy" or "lancedb"
+ENTITY_VECTOR_DTYPE = "float32"  # "float16" halves memory at some scoring speed
+ENTITY_INDEX_DIRNAME = "ray_entity_index"
+EMBEDDING_CACHE_MAX_ENTRIES = 2048
+EMBEDDING_CACHE_PATH = f"{BASE_DIR}/ray_cache/embeddings.sqlite"
+EMBEDDING_BATCH_WINDOW_SECONDS = 0.01
+EMBEDDING_MAX_BATCH_SIZE = 64
+REPORT_FILTER_LEXICAL_WEIGHT = 0.3
+LLM_MAX_RETRIES = 6
+LLM_REQUESTS_PER_MINUTE = 5_000
+LLM_TOKENS_PER_MINUTE = 2_000_000
+LLM_TARGET_LATENCY_SECONDS = 30.0
+EMBEDDING_REQUESTS_PER_MINUTE = 3_000
+EMBEDDING_TOKENS_PER_MINUTE = 1_000_000
+EMBEDDING_TARGET_LATENCY_SECONDS = 5.0
+RATE_LIMIT_BACKOFF_SECONDS = 5.0
+HISTORY_DB_PATH = f"{BASE_DIR}/ray_cache/query_history.sqlite"
+HISTORY_BATCH_SIZE = 50
+HISTORY_FLUSH_INTERVAL_SECONDS = 1.0
+HISTORY_PAGE_SIZE = 20
+LEGACY_RESULTS_CSV = "search_results.csv"
+TRACING_ENABLED = os.getenv("RAY_TRACING", "1") != "0"
+METRICS_EXPORT_PATH = f"{BASE_DIR}/ray_cache/metrics.prom"
+METRICS_EXPORT_INTERVAL_SECONDS = 15
+METRICS_PORT = int(os.getenv("RAY_METRICS_PORT", "0")) or None
+RAW_INPUT_DIR = f"{BASE_DIR}/raw"
+EXTRACTION_CACHE_DIR = f"{BASE_DIR}/ray_cache/extracted"
+INGEST_MANIFEST_PATH = f"{BASE_DIR}/ray_cache/ingest_manifest.json"
+INGEST_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+UPLOAD_CHUNK_BYTES = 1 << 20
+VANILLA_MANIFEST_PATH = f"{BASE_DIR}/ray_cache/vanilla_manifest.json"
+VANILLA_TOP_K = 8
+VANILLA_CANDIDATES = 30
+ROUTER_GLOBAL_THRESHOLD = 1.0
+ROUTER_SEMANTIC_WEIGHT = 4.0
+ROUTER_MAX_ENTITY_NGRAM = 4
+INDEX_RUNS_TO_KEEP = 3
+TOKEN_COUNT_MIN_CHARS = 32
+TOKEN_COUNT_MEMO_SIZE = 100_000
+TIERED_POINT_MIN_SCORE = 50  # map points scoring at least this count towards the target
+TIERED_TARGET_POINTS = 15
+TIERED_DRILL_MIN_SCORE = 30  # communities whose best point scores lower are not expanded
+CONVERSATION_MAX_TURNS = 5  # matches the local search's conversation_history_max_turns
+CONVERSATION_MAX_ANSWER_CHARS = 2_000
+CONVERSATION_CARRIED_ENTITIES = 10  # entities of earlier turns a follow-up keeps in its context
+CONVERSATION_MAX_SESSIONS = 256
+CONVERSATION_IDLE_SECONDS = 60 * 60
@@ -1,25 +1,75 @@
+import functools
+import inspect
+import threading
+
 import pandas as pd
 import streamlit as st
 from graphrag.query.indexer_adapters import (
     read_indexer_entities, read_indexer_reports, read_indexer_relationships,
     read_indexer_covariates, read_indexer_text_units
 )
+from graphrag.query.input.loaders.dfs import read_community_reports
 import os
+
+from .snapshot import (
+    TABLE_NAMES, TOKEN_COUNT_FIELDS, read_artifact_tables, snapshot_exists, write_snapshot, read_snapshot, read_token_counts,
+    hierarchy_snapshot_exists, write_hierarchy_snapshot, read_hierarchy_snapshot, snapshot_lock,
+)
+from ..config.config import TOKEN_COUNT_MIN_CHARS
+from ..telemetry import span
+
+class RunCache:
+    """Process-wide cache of a loader's results, like st.cache_resource but evictable one index run at a time.
+
+    Arguments named with a leading underscore are left out of the key, as with Streamlit's caches.
+    Concurrent callers with the same key wait for a single load.
+    """
+
+    def __init__(self, loader):
+        functools.update_wrapper(self, loader)
+        self.loader = loader
+        self.signature = inspect.signature(loader)
+        self._results = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def _key(self, args, kwargs):
+        bound = self.signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return tuple((name, value) for name, value in bound.arguments.items() if not name.startswith("_"))
+
+    def __call__(self, *args, **kwargs):
+        key = self._key(args, kwargs)
+        with self._lock:
+            if key in self._results:
+                return self._results[key]
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._results:
+                    return self._results[key]
+            result = self.loader(*args, **kwargs)
+            with self._lock:
+                self._results[key] = result
+                self._loading.pop(key, None)
+            return result
+
+    def evict(self, artifacts_dir):
+        with self._lock:
+            for key in [key for key in self._results if dict(key).get("artifacts_dir") == artifacts_dir]:
+                del self._results[key]
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+
 @st.cache_data
 def load_data(artifacts_dir):
-    table_names = {
-        "community_report": "create_final_community_reports",
-        "entity": "create_final_nodes",
-        "entity_embedding": "create_final_entities",
-        "relationship": "create_final_relationships",
-        "covariate": "create_final_covariates",
-        "text_unit": "create_final_text_units"
-    }
-    
-    return {name: pd.read_parquet(f"{artifacts_dir}/{filename}.parquet") for name, filename in table_names.items()}
+    with span("load_data"):
+        return {name: pd.read_parquet(f"{artifacts_dir}/{filename}.parquet") for name, filename in TABLE_NAMES.items()}
 
-@st.cache_data
-def prepare_context(data_frames, community_level):
+def read_indexer_context(data_frames, community_level):
     reports = read_indexer_reports(data_frames['community_report'], data_frames['entity'], community_level)
     entities = read_indexer_entities(data_frames['entity'], data_frames['entity_embedding'], community_level)
     relationships = read_indexer_relationships(data_frames['relationship'])
@@ -27,3 +77,97 @@ def prepare_context(data_frames, community_level):
     covariates = {"claims": claims}
     text_units = read_indexer_text_units(data_frames['text_unit'])
     return reports, entities, relationships, covariates, text_units
+
+def read_community_hierarchy(data_frames):
+    """Reports of every level, each community's level and its parent one level up.
+
+    A community's parent is the community at the level above that most of its entities belong
+    to. Occurrence weights are computed per level here, since the entities read for one level
+    only point at that level's communities.
+    """
+    membership = data_frames["entity"][["title", "level", "community"]].dropna(subset=["community"])
+    membership = membership.assign(community=membership["community"].astype(int).astype(str))
+    upper = membership.assign(level=membership["level"] + 1).rename(columns={"community": "parent"})
+    pairs = membership.merge(upper, on=["title", "level"])
+    votes = pairs.groupby(["community", "parent"]).size().reset_index(name="entities")
+    parents = votes.sort_values("entities").drop_duplicates("community", keep="last")
+    parents = dict(zip(parents["community"], parents["parent"]))
+
+    text_units = data_frames["entity_embedding"][["name", "text_unit_ids"]].explode("text_unit_ids")
+    occurrences = membership.merge(text_units, left_on="title", right_on="name").groupby("community")["text_unit_ids"].nunique()
+
+    report_df = data_frames["community_report"].copy()
+    report_df["community"] = report_df["community"].astype(int).astype(str)
+    report_df["weight"] = report_df["community"].map(occurrences).fillna(0)
+    level_max = report_df.groupby("level")["weight"].transform("max").replace(0, 1)
+    report_df["weight"] = report_df["weight"] / level_max
+    reports = read_community_reports(
+        df=report_df,
+        id_col="community",
+        short_id_col="community",
+        summary_embedding_col=None,
+        content_embedding_col=None,
+    )
+    for report, weight in zip(reports, report_df["weight"].tolist()):
+        report.attributes = {"occurrence weight": weight}
+    levels = dict(zip(report_df["community"], report_df["level"].astype(int)))
+    return reports, levels, {community: parent for community, parent in parents.items() if community in levels}
+
+@st.cache_data
+def prepare_context(data_frames, community_level):
+    with span("prepare_context", community_level=community_level):
+        return read_indexer_context(data_frames, community_level)
+
+@RunCache
+def load_prepared_context(artifacts_dir, community_level):
+    # The adapter pass runs once per (artifacts run, level) across all app processes; every
+    # process then maps the same snapshot files instead of holding its own copy
+    if not snapshot_exists(artifacts_dir, community_level):
+        with snapshot_lock(artifacts_dir):
+            if not snapshot_exists(artifacts_dir, community_level):
+                with span("load_data"):
+                    data_frames = read_artifact_tables(artifacts_dir)
+                with span("prepare_context", community_level=community_level):
+                    write_snapshot(artifacts_dir, community_level, read_indexer_context(data_frames, community_level))
+    with span("load_snapshot", community_level=community_level):
+        return read_snapshot(artifacts_dir, community_level)
+
+@RunCache
+def load_token_counts(artifacts_dir, community_level, encoder_name, _prepared, _token_encoder):
+    """Stored token counts keyed by the hash of each text, for the context builders' token encoder.
+
+    Hashes rather than the texts themselves, so the texts stay in the shared snapshot; short texts
+    are left to the encoder.
+    """
+    with span("load_token_counts", community_level=community_level):
+        with snapshot_lock(artifacts_dir):
+            counts = read_token_counts(artifacts_dir, community_level, _prepared, _token_encoder)
+        reports, entities, relationships, covariates, text_units = _prepared
+        objects_by_table = {"reports": reports, "entities": entities, "relationships": relationships, "text_units": text_units}
+        texts = {}
+        for name, fields in TOKEN_COUNT_FIELDS.items():
+            for field in fields:
+                for obj, count in zip(objects_by_table[name], counts[name][field].tolist()):
+                    text = getattr(obj, field)
+                    if text and len(text) >= TOKEN_COUNT_MIN_CHARS:
+                        texts[hash(text)] = count
+        return texts
+
+@RunCache
+def load_community_hierarchy(artifacts_dir):
+    # Read from the artifacts once per run, then from its snapshot
+    if not hierarchy_snapshot_exists(artifacts_dir):
+        with snapshot_lock(artifacts_dir):
+            if not hierarchy_snapshot_exists(artifacts_dir):
+                with span("load_data"):
+                    data_frames = read_artifact_tables(artifacts_dir)
+                with span("prepare_hierarchy"):
+                    write_hierarchy_snapshot(artifacts_dir, *read_community_hierarchy(data_frames))
+    with span("load_hierarchy"):
+        return read_hierarchy_snapshot(artifacts_dir)
+
+
+def evict_run(artifacts_dir):
+    """Drop what was loaded for one index run; the caches of every other run stay warm."""
+    for loader in (load_prepared_context, load_token_counts, load_community_hierarchy):
+        loader.evict(artifacts_dir)
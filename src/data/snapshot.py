@@ -0,0 +1,345 @@
+import dataclasses
+import json
+import logging
+import os
+import shutil
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds are not coordinated across processes
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from graphrag.model import CommunityReport, Covariate, Entity, Relationship, TextUnit
+
+from ..config.config import SNAPSHOT_DIRNAME
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAMES = {
+    "community_report": "create_final_community_reports",
+    "entity": "create_final_nodes",
+    "entity_embedding": "create_final_entities",
+    "relationship": "create_final_relationships",
+    "covariate": "create_final_covariates",
+    "text_unit": "create_final_text_units",
+}
+
+# Parquet columns read by the graphrag read_indexer_* adapters
+ARTIFACT_COLUMNS = {
+    "community_report": ["community", "level", "title", "summary", "full_content", "rank"],
+    "entity": ["title", "degree", "community", "level"],
+    "entity_embedding": ["id", "name", "type", "description", "human_readable_id", "description_embedding", "text_unit_ids"],
+    "relationship": ["id", "human_readable_id", "source", "target", "description", "weight", "text_unit_ids", "rank"],
+    "covariate": [
+        "id", "human_readable_id", "subject_id", "subject_type", "covariate_type", "text_unit_ids",
+        "document_ids", "object_id", "status", "start_date", "end_date", "description",
+    ],
+    "text_unit": ["id", "text", "n_tokens", "document_ids", "entity_ids", "relationship_ids"],
+}
+
+MODEL_TYPES = {
+    "reports": CommunityReport,
+    "entities": Entity,
+    "relationships": Relationship,
+    "claims": Covariate,
+    "text_units": TextUnit,
+}
+
+# Model fields the local and global context builders read; everything else keeps its dataclass default
+MODEL_FIELDS = {
+    "reports": ["id", "short_id", "title", "community_id", "summary", "full_content", "rank", "attributes"],
+    "entities": ["id", "short_id", "title", "type", "description", "description_embedding", "community_ids", "text_unit_ids", "rank", "attributes"],
+    "relationships": ["id", "short_id", "source", "target", "weight", "description", "text_unit_ids", "attributes"],
+    "claims": ["id", "short_id", "subject_id", "subject_type", "covariate_type", "text_unit_ids", "attributes"],
+    "text_units": ["id", "short_id", "text", "entity_ids", "relationship_ids", "covariate_ids", "n_tokens", "document_ids", "attributes"],
+}
+
+LEVEL_TABLES = ("reports", "entities")
+# Text fields whose token counts are stored next to each snapshot table
+TOKEN_COUNT_FIELDS = {
+    "reports": ["summary", "full_content"],
+    "entities": ["description"],
+    "relationships": ["description"],
+    "text_units": ["text"],
+}
+# Long text fields served straight from the snapshot's string buffers
+MAPPED_TEXT_FIELDS = {
+    "reports": ("summary", "full_content"),
+    "entities": ("description",),
+    "relationships": ("description",),
+    "text_units": ("text",),
+}
+COMPLETE_MARKER = "_COMPLETE"
+LOCK_FILENAME = ".lock"
+HIERARCHY_DIRNAME = "hierarchy"
+
+
+def get_snapshot_dir(artifacts_dir, community_level=None):
+    root = os.path.join(artifacts_dir, SNAPSHOT_DIRNAME)
+    if community_level is None:
+        return os.path.join(root, "common")
+    return os.path.join(root, f"level_{community_level}")
+
+
+class MappedStrings:
+    """Zero-copy view of an Arrow string column: its offsets and UTF-8 bytes stay in the mapped file."""
+
+    def __init__(self, column):
+        self.offsets = np.frombuffer(column.buffers()[1], dtype=np.int64 if pa.types.is_large_string(column.type) else np.int32)[column.offset:]
+        self.data = memoryview(column.buffers()[2] or b"")
+        self.nulls = column.is_null().to_numpy(zero_copy_only=False) if column.null_count else None
+
+    def __getitem__(self, row):
+        if self.nulls is not None and self.nulls[row]:
+            return None
+        return str(self.data[self.offsets[row]:self.offsets[row + 1]], "utf-8")
+
+
+class MappedText:
+    """Model attribute decoded from the snapshot on each read, so workers share one copy of the text.
+
+    Assigning a value stores it on the instance instead, as graphrag's models expect.
+    """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        if self.name in obj.__dict__:
+            return obj.__dict__[self.name]
+        return obj._text_columns[self.name][obj._row]
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.name] = value
+
+
+def _mapped_model(model_type, text_fields):
+    return type(f"Mapped{model_type.__name__}", (model_type,), {name: MappedText() for name in text_fields})
+
+
+MAPPED_MODEL_TYPES = {name: _mapped_model(MODEL_TYPES[name], fields) for name, fields in MAPPED_TEXT_FIELDS.items()}
+
+
+def get_hierarchy_dir(artifacts_dir):
+    return os.path.join(artifacts_dir, SNAPSHOT_DIRNAME, HIERARCHY_DIRNAME)
+
+
+def snapshot_exists(artifacts_dir, community_level):
+    return all(
+        os.path.exists(os.path.join(snapshot_dir, COMPLETE_MARKER))
+        for snapshot_dir in (get_snapshot_dir(artifacts_dir), get_snapshot_dir(artifacts_dir, community_level))
+    )
+
+
+def read_artifact_tables(artifacts_dir):
+    data_frames = {}
+    for name, filename in TABLE_NAMES.items():
+        path = f"{artifacts_dir}/{filename}.parquet"
+        available = set(pq.read_schema(path).names)
+        data_frames[name] = pd.read_parquet(path, columns=[c for c in ARTIFACT_COLUMNS[name] if c in available])
+    return data_frames
+
+
+def _json_default(value):
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def _to_arrow_column(values):
+    if any(isinstance(v, dict) for v in values):
+        try:
+            return pa.array(values), "plain"
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return pa.array([None if v is None else json.dumps(v, default=_json_default) for v in values]), "json"
+    vectors = [v for v in values if v is not None]
+    if vectors and len(vectors) == len(values) and isinstance(vectors[0], (list, np.ndarray)) \
+            and vectors[0] and isinstance(vectors[0][0], (float, np.floating)) and len({len(v) for v in vectors}) == 1:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        return pa.FixedSizeListArray.from_arrays(pa.array(matrix.ravel()), matrix.shape[1]), "vector"
+    return pa.array(values), "plain"
+
+
+def _models_to_table(objects, model_type):
+    columns, kinds = {}, {}
+    for field in dataclasses.fields(model_type):
+        columns[field.name], kinds[field.name] = _to_arrow_column([getattr(o, field.name) for o in objects])
+    return pa.table(columns, metadata={"ray_kinds": json.dumps(kinds)})
+
+
+def read_mapped_table(path, columns=None):
+    """Arrow table whose buffers point into the memory-mapped file, shared by every process mapping it.
+
+    feather.read_table copies the columns it is asked to select, so the file is opened directly.
+    """
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    return table.select([c for c in columns if c in table.column_names]) if columns is not None else table
+
+
+def _column(table, field):
+    chunked = table.column(field)
+    return chunked.chunk(0) if chunked.num_chunks == 1 else chunked.combine_chunks()
+
+
+def _is_text(column):
+    return pa.types.is_string(column.type) or pa.types.is_large_string(column.type)
+
+
+def _table_to_models(table, model_type, fields, mapped_type=None):
+    kinds = json.loads(table.schema.metadata[b"ray_kinds"])
+    fields = [f for f in fields if f in table.column_names]
+    text_columns = {}
+    if mapped_type is not None:
+        text_columns = {
+            field: MappedStrings(_column(table, field)) for field in fields
+            if isinstance(getattr(mapped_type, field, None), MappedText) and kinds[field] == "plain" and _is_text(_column(table, field))
+        }
+    eager_fields = [f for f in fields if f not in text_columns]
+    columns = []
+    for field in eager_fields:
+        column = _column(table, field)
+        if kinds[field] == "vector":
+            # Rows stay views into the memory-mapped buffer instead of Python float lists
+            matrix = column.flatten().to_numpy(zero_copy_only=False).reshape(len(column), -1)
+            columns.append(list(matrix))
+        elif kinds[field] == "json":
+            columns.append([None if v is None else json.loads(v) for v in column.to_pylist()])
+        else:
+            columns.append(column.to_pylist())
+    if not text_columns:
+        return [model_type(**dict(zip(fields, row))) for row in zip(*columns)]
+
+    defaults = [field for field in dataclasses.fields(model_type) if field.name not in fields]
+    models = []
+    for row, values in enumerate(zip(*columns) if columns else ((),) * table.num_rows):
+        # Built without __init__, which would need the text values; they are read from text_columns instead
+        obj = object.__new__(mapped_type)
+        for field in defaults:
+            if field.default is not dataclasses.MISSING:
+                obj.__dict__[field.name] = field.default
+            else:
+                obj.__dict__[field.name] = None if field.default_factory is dataclasses.MISSING else field.default_factory()
+        obj.__dict__.update(zip(eager_fields, values))
+        obj._text_columns = text_columns
+        obj._row = row
+        models.append(obj)
+    return models
+
+
+@contextmanager
+def snapshot_lock(artifacts_dir):
+    """Held while a snapshot is built, so of several app processes only the first one writes it."""
+    root = os.path.join(artifacts_dir, SNAPSHOT_DIRNAME)
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, LOCK_FILENAME), "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _write_snapshot_dir(snapshot_dir, tables, extra_tables=None):
+    tmp_dir = f"{snapshot_dir}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    arrow_tables = {name: _models_to_table(objects, MODEL_TYPES[name]) for name, objects in tables.items()}
+    for name, table in {**arrow_tables, **(extra_tables or {})}.items():
+        # Uncompressed Arrow IPC so readers can memory-map the columns instead of decoding them
+        feather.write_feather(table, os.path.join(tmp_dir, f"{name}.arrow"), compression="uncompressed")
+    open(os.path.join(tmp_dir, COMPLETE_MARKER), "w").close()
+    shutil.rmtree(snapshot_dir, ignore_errors=True)
+    os.replace(tmp_dir, snapshot_dir)
+
+
+def write_snapshot(artifacts_dir, community_level, prepared):
+    reports, entities, relationships, covariates, text_units = prepared
+    logger.info(f"Writing prepared-context snapshot for {artifacts_dir} at level {community_level}")
+    common_dir = get_snapshot_dir(artifacts_dir)
+    if not os.path.exists(os.path.join(common_dir, COMPLETE_MARKER)):
+        _write_snapshot_dir(common_dir, {"relationships": relationships, "claims": covariates["claims"], "text_units": text_units})
+    _write_snapshot_dir(get_snapshot_dir(artifacts_dir, community_level), {"reports": reports, "entities": entities})
+
+
+def read_snapshot(artifacts_dir, community_level, fields=None):
+    fields = {**MODEL_FIELDS, **(fields or {})}
+    loaded = {}
+    for name, model_type in MODEL_TYPES.items():
+        snapshot_dir = get_snapshot_dir(artifacts_dir, community_level if name in LEVEL_TABLES else None)
+        path = os.path.join(snapshot_dir, f"{name}.arrow")
+        table = read_mapped_table(path, fields[name])
+        loaded[name] = _table_to_models(table, model_type, fields[name], MAPPED_MODEL_TYPES.get(name))
+    covariates = {"claims": loaded["claims"]}
+    return loaded["reports"], loaded["entities"], loaded["relationships"], covariates, loaded["text_units"]
+
+
+def hierarchy_snapshot_exists(artifacts_dir):
+    return os.path.exists(os.path.join(get_hierarchy_dir(artifacts_dir), COMPLETE_MARKER))
+
+
+def write_hierarchy_snapshot(artifacts_dir, reports, levels, parents):
+    """Reports of every level plus each community's level and parent, for tiered global search."""
+    logger.info(f"Writing community hierarchy snapshot for {artifacts_dir}")
+    links = pa.table({
+        "community": pa.array([report.id for report in reports], type=pa.string()),
+        "level": pa.array([levels[report.id] for report in reports], type=pa.int32()),
+        "parent": pa.array([parents.get(report.id) for report in reports], type=pa.string()),
+    })
+    _write_snapshot_dir(get_hierarchy_dir(artifacts_dir), {"reports": reports}, {"links": links})
+
+
+def read_hierarchy_snapshot(artifacts_dir):
+    hierarchy_dir = get_hierarchy_dir(artifacts_dir)
+    table = read_mapped_table(os.path.join(hierarchy_dir, "reports.arrow"), MODEL_FIELDS["reports"])
+    reports = _table_to_models(table, CommunityReport, MODEL_FIELDS["reports"], MAPPED_MODEL_TYPES["reports"])
+    links = feather.read_table(os.path.join(hierarchy_dir, "links.arrow")).to_pydict()
+    levels = dict(zip(links["community"], links["level"]))
+    parents = {community: parent for community, parent in zip(links["community"], links["parent"]) if parent is not None}
+    return reports, levels, parents
+
+
+def encoder_name(token_encoder):
+    return getattr(token_encoder, "name", None) or type(token_encoder).__name__
+
+
+def count_tokens(texts, token_encoder):
+    texts = [text or "" for text in texts]
+    if hasattr(token_encoder, "encode_ordinary_batch"):
+        # tiktoken releases the GIL, so one batch call tokenizes on every core
+        return [len(tokens) for tokens in token_encoder.encode_ordinary_batch(texts, num_threads=os.cpu_count() or 1)]
+    return [len(token_encoder.encode(text)) for text in texts]
+
+
+def read_token_counts(artifacts_dir, community_level, prepared, token_encoder):
+    """Token counts of the TOKEN_COUNT_FIELDS, row-aligned with the snapshot tables.
+
+    Computed in one batch per table the first time an encoder is used with a snapshot, then
+    memory-mapped; a rewritten snapshot directory drops them along with its tables.
+    """
+    reports, entities, relationships, covariates, text_units = prepared
+    objects_by_table = {"reports": reports, "entities": entities, "relationships": relationships, "text_units": text_units}
+    counts = {}
+    for name, fields in TOKEN_COUNT_FIELDS.items():
+        objects = objects_by_table[name]
+        snapshot_dir = get_snapshot_dir(artifacts_dir, community_level if name in LEVEL_TABLES else None)
+        path = os.path.join(snapshot_dir, f"{name}.tokens.{encoder_name(token_encoder)}.arrow")
+        table = read_mapped_table(path) if os.path.exists(path) else None
+        if table is None or table.num_rows != len(objects):
+            logger.info(f"Counting tokens of {len(objects)} {name} for {snapshot_dir}")
+            table = pa.table({
+                f"{field}_tokens": pa.array(count_tokens([getattr(o, field) for o in objects], token_encoder), type=pa.int32())
+                for field in fields
+            })
+            os.makedirs(snapshot_dir, exist_ok=True)
+            feather.write_feather(table, f"{path}.tmp{os.getpid()}", compression="uncompressed")
+            os.replace(f"{path}.tmp{os.getpid()}", path)
+        counts[name] = {field: table.column(f"{field}_tokens").to_numpy() for field in fields}
+    return counts
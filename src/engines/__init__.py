@@ -1,4 +1,30 @@
 # This file is intentionally left empty to mark the directory as a Python package.
-from .engine_setup import setup_engines
-from .search_engines import setup_search_engines
+import importlib
 
+# Resolved on first access: setting up engines imports graphrag, openai, tiktoken and pandas,
+# which the UI does not need to draw its first page
+_EXPORTS = {
+    "setup_engines": ".engine_setup",
+    "setup_search_engines": ".search_engines",
+    "EngineRegistry": ".registry",
+    "get_engine_registry": ".registry",
+    "CachedTextEmbedding": ".embedding_cache",
+    "EmbeddingCache": ".embedding_cache",
+    "get_embedding_cache": ".embedding_cache",
+    "QueryRouter": ".router",
+    "ActiveIndex": ".active_index",
+    "get_active_index": ".active_index",
+    "Conversation": ".conversation",
+    "ConversationStore": ".conversation",
+    "get_conversation_store": ".conversation",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
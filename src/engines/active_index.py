@@ -0,0 +1,171 @@
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import streamlit as st
+
+from .registry import ENGINE_CONFIG_KEYS, engine_key, get_engine_registry
+from ..config.config import OUTPUT_DIR, DEFAULT_SEARCH_CONFIG, ENGINE_POOL_SIZE, INDEX_RUNS_TO_KEEP
+from ..indexing.runs import prune_runs, hold_run, release_run
+from ..telemetry import get_metrics_registry, span
+from ..utils.utils import get_latest_artifacts_dir
+
+logger = logging.getLogger(__name__)
+
+ARTIFACTS_KEY_INDEX = ENGINE_CONFIG_KEYS.index("artifacts_dir")
+
+
+class ActiveIndex:
+    """The published index run served to new queries.
+
+    A newly published run is warmed up in the background (prepared context loaded, engines built
+    for the configurations recently served) and then swapped in. Queries pin the run they started
+    on with `reading`, and a replaced run is released once its last reader finishes.
+    """
+
+    def __init__(self, output_dir=OUTPUT_DIR, keep_runs=INDEX_RUNS_TO_KEEP, registry=None):
+        self.output_dir = output_dir
+        self.keep_runs = keep_runs
+        self.registry = registry or get_engine_registry()
+        self.swaps = 0
+        self.retired = 0
+        self.last_error = None
+        self._current = get_latest_artifacts_dir(output_dir)
+        self._warming = None
+        self._readers = {}
+        self._retiring = set()
+        self._configs = OrderedDict()
+        self._held = {}
+        self._lock = threading.Lock()
+        self._hold_lock = threading.Lock()
+        self._sync_holds()
+
+    def current(self):
+        return self._current
+
+    def warming(self):
+        return self._warming
+
+    def refresh(self):
+        """Start warming the published run if it is not the one being served; a file read when nothing changed."""
+        published = get_latest_artifacts_dir(self.output_dir)
+        with self._lock:
+            if not published or published in (self._current, self._warming):
+                return False
+            # Nothing is being served yet, so there is nothing to keep up while warming
+            serve_now = self._current is None
+            if serve_now:
+                self._current = published
+            else:
+                self._warming = published
+                configs = list(self._configs.values())
+        self._sync_holds()
+        if serve_now:
+            return True
+        logger.info(f"Warming up index run {published}")
+        threading.Thread(target=self._warm, args=(published, configs), name="index-warmup", daemon=True).start()
+        return True
+
+    def _warm(self, artifacts_dir, configs):
+        # The loaders import pandas and graphrag; the app can draw its first page without them
+        from ..data.data_loader import load_prepared_context
+
+        try:
+            with span("index_warmup"):
+                for community_level in sorted({config["community_level"] for config in configs} or {DEFAULT_SEARCH_CONFIG["community_level"]}):
+                    load_prepared_context(artifacts_dir, community_level)
+                for config in configs:
+                    try:
+                        self.registry.get({**config, "artifacts_dir": artifacts_dir})
+                    except Exception as e:
+                        # The data is fine; this configuration builds on first use instead
+                        logger.warning(f"Could not pre-build engines for {artifacts_dir}: {str(e)}")
+        except Exception as e:
+            logger.error(f"Warm-up of index run {artifacts_dir} failed, still serving {self._current}: {str(e)}", exc_info=True)
+            with self._lock:
+                self._warming = None
+                self.last_error = str(e)
+            self._sync_holds()
+            return
+        with self._lock:
+            previous, self._current = self._current, artifacts_dir
+            self._warming = None
+            self.last_error = None
+            self.swaps += 1
+            if previous and previous != artifacts_dir:
+                self._retiring.add(previous)
+        logger.info(f"Now serving index run {artifacts_dir} (was {previous})")
+        self._retire_idle()
+
+    @contextmanager
+    def reading(self, config):
+        """Pin the run a query reads for its whole duration; yields the config with artifacts_dir filled in."""
+        config = {**config, "artifacts_dir": config.get("artifacts_dir") or self._current}
+        artifacts_dir = config["artifacts_dir"]
+        with self._lock:
+            self._readers[artifacts_dir] = self._readers.get(artifacts_dir, 0) + 1
+            # Remembered so the next run is warmed for the configurations people actually use
+            key = engine_key(config)
+            key = key[:ARTIFACTS_KEY_INDEX] + key[ARTIFACTS_KEY_INDEX + 1:]
+            self._configs[key] = {name: value for name, value in config.items() if name != "artifacts_dir"}
+            self._configs.move_to_end(key)
+            while len(self._configs) > ENGINE_POOL_SIZE:
+                self._configs.popitem(last=False)
+        self._sync_holds()
+        try:
+            yield config
+        finally:
+            with self._lock:
+                self._readers[artifacts_dir] -= 1
+                if not self._readers[artifacts_dir]:
+                    del self._readers[artifacts_dir]
+            self._retire_idle()
+
+    def _in_use(self):
+        return set(self._readers) | {self._current, self._warming} - {None}
+
+    def _sync_holds(self):
+        # Every run this process may read is share-locked, so no other process's prune_runs deletes it
+        with self._lock:
+            in_use = self._in_use()
+        with self._hold_lock:
+            for artifacts_dir in in_use - set(self._held):
+                self._held[artifacts_dir] = hold_run(artifacts_dir)
+            for artifacts_dir in set(self._held) - in_use:
+                release_run(self._held.pop(artifacts_dir))
+
+    def _retire_idle(self):
+        with self._lock:
+            idle = {artifacts_dir for artifacts_dir in self._retiring if artifacts_dir not in self._readers}
+            self._retiring -= idle
+            in_use = self._in_use()
+        self._sync_holds()
+        if not idle:
+            return
+        from ..data.data_loader import evict_run
+
+        for artifacts_dir in idle:
+            self.registry.retire(artifacts_dir)
+            # Only the retired run's loaded data; the run just swapped in stays cached
+            evict_run(artifacts_dir)
+            self.retired += 1
+            logger.info(f"Retired index run {artifacts_dir}")
+        prune_runs(self.output_dir, self.keep_runs, in_use)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "readers": sum(self._readers.values()),
+                "retiring": len(self._retiring),
+                "warming": int(self._warming is not None),
+                "swaps": self.swaps,
+                "retired": self.retired,
+            }
+
+
+@st.cache_resource
+def get_active_index():
+    active_index = ActiveIndex()
+    get_metrics_registry().register_gauges("active_index", active_index.stats)
+    return active_index
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+import streamlit as st
+
+from ..config import (
+    CONVERSATION_MAX_TURNS,
+    CONVERSATION_MAX_ANSWER_CHARS,
+    CONVERSATION_CARRIED_ENTITIES,
+    CONVERSATION_MAX_SESSIONS,
+    CONVERSATION_IDLE_SECONDS,
+)
+from ..telemetry import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+
+class Conversation:
+    """One session's recent turns and what the last local search turn retrieved.
+
+    Turns are capped at `max_turns` and answers at `max_answer_chars`. The retrieval state
+    (entities mapped per question, the entities, text units and reports the last context used,
+    and the relationships of each carried entity) covers at most `carried_entities` entities,
+    so a follow-up extends it rather than mapping earlier questions again.
+    """
+
+    def __init__(self, max_turns=CONVERSATION_MAX_TURNS, max_answer_chars=CONVERSATION_MAX_ANSWER_CHARS,
+                 carried_entities=CONVERSATION_CARRIED_ENTITIES):
+        self.turns = deque(maxlen=max_turns)
+        self.max_answer_chars = max_answer_chars
+        self.carried_entities = carried_entities
+        self.mapped = OrderedDict()
+        self.entity_ids = []
+        self.relationship_ids = {}
+        self.text_unit_ids = set()
+        self.report_ids = set()
+        self.first_build_seconds = None
+        self.last_used = time.time()
+
+    def __len__(self):
+        return len(self.turns)
+
+    def _previous_turns(self, question):
+        # A page rerun submits the last question again; it must not become its own follow-up
+        turns = list(self.turns)
+        return turns[:-1] if turns and turns[-1][0] == question else turns
+
+    def history(self, question):
+        """graphrag ConversationHistory of the turns before `question`, or None on the first turn."""
+        turns = self._previous_turns(question)
+        if not turns:
+            return None
+        from graphrag.query.context_builder.conversation_history import ConversationHistory
+
+        return ConversationHistory.from_list([
+            {"role": role, "content": content}
+            for asked, answer in turns
+            for role, content in (("user", asked), ("assistant", answer))
+        ])
+
+    def digest(self, question):
+        """Identifies the turns before `question`, so cached answers are only reused in the same conversation."""
+        turns = self._previous_turns(question)
+        return hashlib.sha256(json.dumps(turns).encode("utf-8")).hexdigest() if turns else None
+
+    def add_turn(self, question, answer):
+        answer = (answer if isinstance(answer, str) else str(answer))[:self.max_answer_chars]
+        if self.turns and self.turns[-1][0] == question:
+            self.turns[-1] = (question, answer)
+        else:
+            self.turns.append((question, answer))
+        self.last_used = time.time()
+
+    def remember_mapping(self, question, entity_ids):
+        self.mapped[question] = entity_ids
+        self.mapped.move_to_end(question)
+        while len(self.mapped) > self.turns.maxlen:
+            self.mapped.popitem(last=False)
+
+    def carry(self, entity_ids, relationship_ids, text_unit_ids, report_ids, build_seconds):
+        """Keep what this turn's context used for the next turn."""
+        self.entity_ids = entity_ids[:self.carried_entities]
+        self.relationship_ids = {entity_id: relationship_ids[entity_id] for entity_id in self.entity_ids if entity_id in relationship_ids}
+        self.text_unit_ids = text_unit_ids
+        self.report_ids = report_ids
+        if self.first_build_seconds is None:
+            self.first_build_seconds = build_seconds
+
+
+class ConversationStore:
+    """Conversations of live sessions: LRU-bounded, and dropped once idle for `idle_seconds`."""
+
+    def __init__(self, max_sessions=CONVERSATION_MAX_SESSIONS, idle_seconds=CONVERSATION_IDLE_SECONDS):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.expired = 0
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        now = time.time()
+        with self._lock:
+            idle = [key for key, conversation in self._conversations.items() if now - conversation.last_used > self.idle_seconds]
+            for key in idle:
+                del self._conversations[key]
+            self.expired += len(idle)
+            conversation = self._conversations.get(session_id)
+            if conversation is None:
+                conversation = self._conversations[session_id] = Conversation()
+            self._conversations.move_to_end(session_id)
+            while len(self._conversations) > self.max_sessions:
+                self._conversations.popitem(last=False)
+                self.expired += 1
+            conversation.last_used = now
+            return conversation
+
+    def reset(self, session_id):
+        with self._lock:
+            self._conversations.pop(session_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._conversations),
+                "turns": sum(len(conversation) for conversation in self._conversations.values()),
+                "expired": self.expired,
+            }
+
+
+@st.cache_resource
+def get_conversation_store():
+    store = ConversationStore()
+    get_metrics_registry().register_gauges("conversations", store.stats)
+    return store
@@ -0,0 +1,252 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import nullcontext
+
+import numpy as np
+import streamlit as st
+from graphrag.query.llm.base import BaseTextEmbedding
+from tenacity import Retrying, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+
+from .query_context import get_query_context
+from ..telemetry import span, get_metrics_registry
+from ..config import (
+    EMBEDDING_CACHE_MAX_ENTRIES,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_BATCH_WINDOW_SECONDS,
+    EMBEDDING_MAX_BATCH_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _record(stat, amount=1):
+    query_context = get_query_context()
+    if query_context is not None:
+        query_context.stats[stat] = query_context.stats.get(stat, 0) + amount
+
+
+class EmbeddingCache:
+    """Process-wide store of embeddings keyed by (model, text hash): bounded LRU in front of SQLite."""
+
+    def __init__(self, max_entries=EMBEDDING_CACHE_MAX_ENTRIES, disk_path=EMBEDDING_CACHE_PATH):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Requests made for query-time misses, and for corpus, prefetch and document batches
+        self.query_api_calls = 0
+        self.batch_api_calls = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if disk_path:
+            os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model, text):
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def peek(self, key):
+        """Look up a vector without counting towards the hit rate."""
+        with self._lock:
+            return self._lookup(key)
+
+    def get(self, key):
+        with self._lock:
+            vector = self._lookup(key)
+            if vector is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return vector
+
+    def _lookup(self, key):
+        vector = self._entries.get(key)
+        if vector is None and self._db is not None:
+            row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                vector = np.frombuffer(row[0], dtype=np.float64).tolist()
+        if vector is not None:
+            self._remember(key, vector)
+        return vector
+
+    def set(self, key, vector):
+        with self._lock:
+            self._remember(key, vector)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    (key, np.asarray(vector, dtype=np.float64).tobytes()),
+                )
+                self._db.commit()
+
+    def record_api_calls(self, count, query_path=False):
+        with self._lock:
+            if query_path:
+                self.query_api_calls += count
+            else:
+                self.batch_api_calls += count
+
+    def _remember(self, key, vector):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "api_calls": self.query_api_calls + self.batch_api_calls,
+                "query_api_calls": self.query_api_calls,
+                "batch_api_calls": self.batch_api_calls,
+                # Every query lookup would be a request without the cache; bulk batches are not lookups
+                "calls_saved": max(lookups - self.query_api_calls, 0),
+            }
+
+
+class CachedTextEmbedding(BaseTextEmbedding):
+    """Wraps a text embedder with the shared EmbeddingCache and coalesces concurrent misses into one request."""
+
+    def __init__(self, embedder, model, cache, rate_limiter=None, batch_window=EMBEDDING_BATCH_WINDOW_SECONDS, max_batch_size=EMBEDDING_MAX_BATCH_SIZE):
+        self.embedder = embedder
+        self.model = model
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def embed(self, text, **kwargs):
+        key = self.cache.make_key(self.model, text)
+        vector = self.cache.get(key)
+        _record("embedding_lookups")
+        if vector is not None:
+            _record("embedding_cache_hits")
+            return vector
+        vector = self._submit(text).result()
+        self.cache.set(key, vector)
+        return vector
+
+    async def aembed(self, text, **kwargs):
+        return await asyncio.to_thread(self.embed, text, **kwargs)
+
+    def prefetch(self, texts):
+        """Embed every uncached text up front in as few requests as possible."""
+        batch = {
+            text: Future()
+            for text in dict.fromkeys(texts)
+            if self.cache.peek(self.cache.make_key(self.model, text)) is None
+        }
+        self._run_batch(batch)
+        for text, future in batch.items():
+            if future.exception() is None:
+                self.cache.set(self.cache.make_key(self.model, text), future.result())
+        return len(batch)
+
+    def embed_many(self, texts):
+        """Embed a corpus (e.g. report summaries) through the cache without touching query hit stats."""
+        vectors = {text: self.cache.peek(self.cache.make_key(self.model, text)) for text in dict.fromkeys(texts)}
+        batch = {text: Future() for text, vector in vectors.items() if vector is None}
+        self._run_batch(batch)
+        for text, future in batch.items():
+            vectors[text] = future.result()
+            self.cache.set(self.cache.make_key(self.model, text), vectors[text])
+        return [vectors[text] for text in texts]
+
+    def embed_documents(self, texts):
+        """Embed texts in batched requests without caching them, for corpora persisted elsewhere."""
+        batch = {text: Future() for text in dict.fromkeys(texts)}
+        self._run_batch(batch)
+        return [batch[text].result() for text in texts]
+
+    def _submit(self, text):
+        with self._lock:
+            future = self._pending.get(text)
+            if future is not None:
+                # The same text is already in flight; share its result
+                return future
+            future = Future()
+            self._pending[text] = future
+            leader = len(self._pending) == 1
+        if leader:
+            # Give concurrent callers a moment to join this request
+            time.sleep(self.batch_window)
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            self._run_batch(batch, query_path=True)
+        return future
+
+    def _run_batch(self, batch, query_path=False):
+        texts = list(batch)
+        for start in range(0, len(texts), self.max_batch_size):
+            chunk = texts[start:start + self.max_batch_size]
+            try:
+                vectors = self._embed_many(chunk, query_path)
+            except Exception as e:
+                for text in chunk:
+                    batch[text].set_exception(e)
+                continue
+            for text, vector in zip(chunk, vectors):
+                batch[text].set_result(vector)
+
+    def _count_tokens(self, text):
+        token_encoder = getattr(self.embedder, "token_encoder", None)
+        return len(token_encoder.encode(text)) if token_encoder is not None else 0
+
+    def _limit(self, tokens):
+        return self.rate_limiter.limit(tokens) if self.rate_limiter is not None else nullcontext()
+
+    def _embed_many(self, texts, query_path=False):
+        token_counts = [self._count_tokens(text) for text in texts]
+        with span("embedding_call", tokens=sum(token_counts), texts=len(texts)):
+            return self._request_embeddings(texts, token_counts, query_path)
+
+    def _request_embeddings(self, texts, token_counts, query_path=False):
+        client = getattr(self.embedder, "sync_client", None)
+        max_tokens = getattr(self.embedder, "max_tokens", None)
+        if client is None or (max_tokens and max(token_counts) > max_tokens):
+            # Oversized texts need the embedder's own chunk-and-average path
+            vectors = []
+            for text, tokens in zip(texts, token_counts):
+                with self._limit(tokens):
+                    vectors.append(self.embedder.embed(text))
+            self.cache.record_api_calls(len(texts), query_path)
+            return vectors
+        retryer = Retrying(
+            stop=stop_after_attempt(getattr(self.embedder, "max_retries", 1)),
+            wait=wait_exponential_jitter(max=10),
+            reraise=True,
+            retry=retry_if_exception_type(getattr(self.embedder, "retry_error_types", ())),
+        )
+        for attempt in retryer:
+            with attempt, self._limit(sum(token_counts)):
+                response = client.embeddings.create(input=texts, model=self.model)
+        self.cache.record_api_calls(1, query_path)
+        vectors = []
+        for item in sorted(response.data, key=lambda d: d.index):
+            # Match OpenAIEmbedding.embed, which returns unit-normalized vectors
+            vector = np.asarray(item.embedding, dtype=np.float64)
+            vectors.append((vector / np.linalg.norm(vector)).tolist())
+        return vectors
+
+
+@st.cache_resource
+def get_embedding_cache():
+    cache = EmbeddingCache()
+    get_metrics_registry().register_gauges("embedding_cache", cache.stats)
+    return cache
@@ -0,0 +1,39 @@
+from contextvars import ContextVar
+
+from graphrag.query.structured_search.global_search.search import GlobalSearch
+
+from .query_context import get_query_context
+from ..telemetry import span
+
+# GlobalSearch.build_context is not given the query, so asearch publishes it here
+_current_query = ContextVar("global_search_query", default=None)
+
+
+def get_current_query():
+    return _current_query.get()
+
+
+class ProgressGlobalSearch(GlobalSearch):
+    async def asearch(self, query, conversation_history=None, **kwargs):
+        token = _current_query.set(query)
+        try:
+            return await super().asearch(query, conversation_history=conversation_history, **kwargs)
+        finally:
+            _current_query.reset(token)
+
+    async def _map_response_single_batch(self, context_data, query, **llm_kwargs):
+        with span("global_map") as current:
+            result = await super()._map_response_single_batch(context_data=context_data, query=query, **llm_kwargs)
+            if current is not None:
+                current.add_tokens(result.prompt_tokens)
+        query_context = get_query_context()
+        if query_context is not None:
+            query_context.finish_map_batch()
+        return result
+
+    async def _reduce_response(self, map_responses, query, **llm_kwargs):
+        with span("global_reduce") as current:
+            result = await super()._reduce_response(map_responses=map_responses, query=query, **llm_kwargs)
+            if current is not None:
+                current.add_tokens(result.prompt_tokens)
+        return result
@@ -0,0 +1,154 @@
+import time
+
+from graphrag.query.context_builder.entity_extraction import EntityVectorStoreKey
+from graphrag.query.structured_search.local_search.mixed_context import LocalSearchMixedContext
+from graphrag.vector_stores.base import BaseVectorStore, VectorStoreDocument, VectorStoreSearchResult
+
+from .query_context import get_query_context
+from ..telemetry import span
+
+
+class SelectedEntityStore(BaseVectorStore):
+    """Answers entity mapping with entities that were already selected, in their order."""
+
+    def __init__(self, entity_ids):
+        super().__init__(collection_name="selected_entities")
+        self.entity_ids = entity_ids
+
+    def connect(self, **kwargs):
+        pass
+
+    def load_documents(self, documents, overwrite=True):
+        pass
+
+    def filter_by_id(self, include_ids):
+        pass
+
+    def similarity_search_by_vector(self, query_embedding, k=10, **kwargs):
+        return [
+            VectorStoreSearchResult(document=VectorStoreDocument(id=entity_id, text=None, vector=None), score=1.0)
+            for entity_id in self.entity_ids
+        ]
+
+    def similarity_search_by_text(self, text, text_embedder, k=10, **kwargs):
+        return self.similarity_search_by_vector(None, k)
+
+
+class TracedLocalSearchMixedContext(LocalSearchMixedContext):
+    def build_context(self, query, conversation_history=None, **kwargs):
+        with span("local_context"):
+            query_context = get_query_context()
+            conversation = query_context.conversation if query_context is not None else None
+            if conversation is None or kwargs.get("include_entity_names") or self.embedding_vectorstore_key != EntityVectorStoreKey.ID:
+                return super().build_context(query, conversation_history=conversation_history, **kwargs)
+            return self._build_conversation_context(query, conversation, conversation_history, query_context, **kwargs)
+
+    def _build_conversation_context(self, query, conversation, conversation_history, query_context, top_k_mapped_entities=10,
+                                    conversation_history_max_turns=5, **kwargs):
+        """Context for one turn of a conversation, reusing what earlier turns retrieved.
+
+        Only the new question is mapped to entities; graphrag would embed it together with the
+        earlier questions on every turn. Entities of earlier turns follow the newly mapped ones, and
+        the sections are built over just the relationships, text units and reports of the selected
+        entities, with the relationships of carried entities taken from the conversation.
+        """
+        started = time.perf_counter()
+        mapped = conversation.mapped.get(query)
+        embedded_tokens = 0
+        if mapped is None:
+            mapped = self._map_entities(query, top_k_mapped_entities)
+            conversation.remember_mapping(query, mapped)
+            embedded_tokens = len(self.token_encoder.encode(query))
+        carried = [entity_id for entity_id in conversation.entity_ids if entity_id not in mapped]
+        selected = [self.entities[entity_id] for entity_id in mapped + carried if entity_id in self.entities]
+        relationship_ids = self._relationship_ids(selected, conversation.relationship_ids)
+
+        units = {unit_id: self.text_units[unit_id] for entity in selected for unit_id in entity.text_unit_ids or [] if unit_id in self.text_units}
+        reports = {
+            community_id: self.community_reports[community_id]
+            for entity in selected for community_id in entity.community_ids or [] if community_id in self.community_reports
+        }
+        subset = LocalSearchMixedContext(
+            entities=selected,
+            entity_text_embeddings=SelectedEntityStore([entity.id for entity in selected]),
+            text_embedder=self.text_embedder,
+            text_units=list(units.values()),
+            community_reports=list(reports.values()),
+            relationships=self._in_original_order(relationship_ids),
+            covariates=self.covariates,
+            token_encoder=self.token_encoder,
+        )
+        history_text, history_records = self._conversation_section(conversation_history, conversation_history_max_turns, **kwargs)
+        if history_text:
+            kwargs["max_tokens"] = kwargs.get("max_tokens", 8000) - len(self.token_encoder.encode(history_text))
+        context_text, context_records = subset.build_context(query, top_k_mapped_entities=len(selected), **kwargs)
+        if history_text:
+            context_text = "\n\n".join(section for section in (history_text, context_text) if section)
+            context_records = {**history_records, **context_records}
+        build_seconds = time.perf_counter() - started
+
+        text_unit_ids = _record_ids(context_records, "sources")
+        report_ids = _record_ids(context_records, kwargs.get("community_context_name", "Reports").lower())
+        # graphrag maps the question with the earlier user questions appended, embedding all of them again
+        earlier_questions = "\n".join(conversation_history.get_user_turns(conversation_history_max_turns)) if conversation_history else ""
+        mapping_text = f"{query}\n{earlier_questions}" if earlier_questions else query
+        query_context.stats.update({
+            "entities_selected": len(selected),
+            "entities_reused": len(set(conversation.entity_ids) & {entity.id for entity in selected}),
+            "text_units_reused": len(text_unit_ids & conversation.text_unit_ids),
+            "reports_reused": len(report_ids & conversation.report_ids),
+            "context_build_seconds": build_seconds,
+            "first_context_build_seconds": conversation.first_build_seconds,
+            "embedding_tokens_saved": len(self.token_encoder.encode(mapping_text)) - embedded_tokens,
+        })
+        conversation.carry([entity.id for entity in selected], relationship_ids, text_unit_ids, report_ids, build_seconds)
+        return context_text, context_records
+
+    def _in_original_order(self, relationship_ids):
+        # graphrag breaks ties in relationship ranking by the order of the full relationship list
+        if getattr(self, "_relationship_positions", None) is None:
+            self._relationship_positions = {rel_id: position for position, rel_id in enumerate(self.relationships)}
+        unique_ids = {rel_id for ids in relationship_ids.values() for rel_id in ids}
+        return [self.relationships[rel_id] for rel_id in sorted(unique_ids, key=self._relationship_positions.__getitem__)]
+
+    def _conversation_section(self, conversation_history, max_turns, conversation_history_user_turns_only=True,
+                              column_delimiter="|", max_tokens=8000, **kwargs):
+        # graphrag builds this section the same way but counts its tokens with cl100k, not this builder's encoder
+        if not conversation_history:
+            return "", {}
+        text, records = conversation_history.build_context(
+            token_encoder=self.token_encoder,
+            include_user_turns_only=conversation_history_user_turns_only,
+            max_qa_turns=max_turns,
+            column_delimiter=column_delimiter,
+            max_tokens=max_tokens,
+            recency_bias=False,
+        )
+        return (text, records) if text.strip() else ("", {})
+
+    def _map_entities(self, query, k):
+        # graphrag's map_query_to_entities oversamples the same way but scans every entity per match
+        results = self.entity_text_embeddings.similarity_search_by_text(
+            text=query, text_embedder=lambda text: self.text_embedder.embed(text), k=k * 2,
+        )
+        return [result.document.id for result in results if result.document.id in self.entities]
+
+    def _relationship_ids(self, entities, known):
+        relationship_ids = {entity.id: known[entity.id] for entity in entities if entity.id in known}
+        missing = {entity.title: entity.id for entity in entities if entity.id not in relationship_ids}
+        if missing:
+            # One pass over the relationships for every entity the conversation has not seen yet
+            found = {entity_id: [] for entity_id in missing.values()}
+            for relationship in self.relationships.values():
+                for title in {relationship.source, relationship.target}:
+                    if title in missing:
+                        found[missing[title]].append(relationship.id)
+            relationship_ids.update(found)
+        return relationship_ids
+
+
+def _record_ids(context_records, name):
+    records = context_records.get(name)
+    if records is None or "id" not in records:
+        return set()
+    return set(records["id"].astype(str))
@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from graphrag.vector_stores.base import BaseVectorStore, VectorStoreDocument, VectorStoreSearchResult
+
+from ..config.config import ENTITY_INDEX_DIRNAME, ENTITY_VECTOR_DTYPE
+from ..data.snapshot import snapshot_lock
+from ..utils.utils import get_artifacts_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Rows scored per block when the matrix is float16, bounding the float32 working copy
+FLOAT16_BLOCK_ROWS = 65_536
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class NumpyVectorStore(BaseVectorStore):
+    """Exact cosine top-k over a contiguous, row-normalized matrix held in memory or memory-mapped."""
+
+    def __init__(self, collection_name="entity_description_embeddings", dtype=ENTITY_VECTOR_DTYPE, **kwargs):
+        super().__init__(collection_name=collection_name, **kwargs)
+        self.dtype = np.dtype(dtype)
+        self.db_uri = None
+        self.ids = np.array([], dtype=str)
+        self.vectors = np.zeros((0, 0), dtype=self.dtype)
+
+    def connect(self, **kwargs):
+        self.db_uri = kwargs.get("db_uri")
+        vectors_path = os.path.join(self.db_uri, f"{self.collection_name}.vectors.npy")
+        if os.path.exists(vectors_path):
+            self.vectors = np.load(vectors_path, mmap_mode="r")
+            self.ids = np.load(os.path.join(self.db_uri, f"{self.collection_name}.ids.npy"), mmap_mode="r")
+            self.dtype = self.vectors.dtype
+
+    def load_documents(self, documents, overwrite=True):
+        documents = [document for document in documents if document.vector is not None]
+        ids = [str(document.id) for document in documents]
+        vectors = np.asarray([document.vector for document in documents], dtype=np.float32)
+        if not overwrite and len(self.ids):
+            ids = list(self.ids) + ids
+            vectors = np.concatenate([np.asarray(self.vectors, dtype=np.float32), vectors])
+        self.set_vectors(ids, vectors)
+
+    def set_vectors(self, ids, vectors):
+        self.ids = np.asarray(ids, dtype=str)
+        self.vectors = np.ascontiguousarray(_normalize(np.asarray(vectors, dtype=np.float32)).astype(self.dtype))
+        if self.db_uri:
+            self.persist(self.db_uri)
+
+    def persist(self, db_uri, metadata=None):
+        # A directory of its own, so a concurrent writer never deletes or publishes this one half-written
+        tmp_dir = tempfile.mkdtemp(prefix=f"{os.path.basename(db_uri)}.tmp", dir=os.path.dirname(db_uri) or None)
+        try:
+            np.save(os.path.join(tmp_dir, f"{self.collection_name}.vectors.npy"), self.vectors)
+            np.save(os.path.join(tmp_dir, f"{self.collection_name}.ids.npy"), self.ids)
+            with open(os.path.join(tmp_dir, "metadata.json"), "w", encoding="utf-8") as f:
+                json.dump({"dtype": self.dtype.name, "count": len(self.ids), **(metadata or {})}, f)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        shutil.rmtree(db_uri, ignore_errors=True)
+        os.replace(tmp_dir, db_uri)
+        self.connect(db_uri=db_uri)
+
+    def filter_by_id(self, include_ids):
+        if not include_ids:
+            self.query_filter = None
+        else:
+            self.query_filter = np.isin(self.ids, np.asarray([str(i) for i in include_ids]))
+        return self.query_filter
+
+    def _scores(self, queries):
+        if self.dtype == np.float32:
+            scores = queries @ self.vectors.T
+        else:
+            scores = np.empty((len(queries), len(self.ids)), dtype=np.float32)
+            for start in range(0, len(self.ids), FLOAT16_BLOCK_ROWS):
+                block = np.asarray(self.vectors[start:start + FLOAT16_BLOCK_ROWS], dtype=np.float32)
+                scores[:, start:start + len(block)] = queries @ block.T
+        if self.query_filter is not None:
+            scores[:, ~self.query_filter] = -np.inf
+        return scores
+
+    def search_batch(self, query_embeddings, k=10):
+        """Return (indices, scores) of the top-k rows for every query, best first."""
+        queries = _normalize(np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32)))
+        k = min(k, len(self.ids))
+        if k == 0:
+            return np.zeros((len(queries), 0), dtype=np.int64), np.zeros((len(queries), 0), dtype=np.float32)
+        scores = self._scores(queries)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+    def _to_results(self, indices, scores):
+        return [
+            VectorStoreSearchResult(
+                document=VectorStoreDocument(id=str(self.ids[i]), text=None, vector=None),
+                score=float(score),
+            )
+            for i, score in zip(indices, scores)
+            if np.isfinite(score)
+        ]
+
+    def similarity_search_by_vector(self, query_embedding, k=10, **kwargs):
+        indices, scores = self.search_batch([query_embedding], k)
+        return self._to_results(indices[0], scores[0])
+
+    def similarity_search_batch(self, query_embeddings, k=10):
+        indices, scores = self.search_batch(query_embeddings, k)
+        return [self._to_results(row_indices, row_scores) for row_indices, row_scores in zip(indices, scores)]
+
+    def similarity_search_by_text(self, text, text_embedder, k=10, **kwargs):
+        query_embedding = text_embedder(text)
+        if query_embedding is not None and len(query_embedding):
+            return self.similarity_search_by_vector(query_embedding, k)
+        return []
+
+
+def _index_is_current(index_dir, fingerprint, dtype):
+    metadata_path = os.path.join(index_dir, "metadata.json")
+    if not os.path.exists(metadata_path):
+        return False
+    with open(metadata_path, "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    return metadata.get("fingerprint") == fingerprint and metadata.get("dtype") == np.dtype(dtype).name
+
+
+def build_entity_vector_store(artifacts_dir, dtype=ENTITY_VECTOR_DTYPE):
+    """Load the entity index persisted next to the artifacts, rebuilding it when the artifacts changed."""
+    index_dir = os.path.join(artifacts_dir, ENTITY_INDEX_DIRNAME)
+    fingerprint = get_artifacts_fingerprint(artifacts_dir)
+    store = NumpyVectorStore(dtype=dtype)
+    if not _index_is_current(index_dir, fingerprint, dtype):
+        # Of several app processes building the same index, the first writes it and the others load it
+        with snapshot_lock(artifacts_dir):
+            if not _index_is_current(index_dir, fingerprint, dtype):
+                logger.info(f"Building NumPy entity index for {artifacts_dir}")
+                entities = pd.read_parquet(f"{artifacts_dir}/create_final_entities.parquet", columns=["id", "description_embedding"])
+                entities = entities[entities["description_embedding"].notna()]
+                vectors = np.stack(entities["description_embedding"].to_numpy()).astype(np.float32) if len(entities) else np.zeros((0, 0), dtype=np.float32)
+                store.set_vectors(entities["id"].astype(str).to_numpy(), vectors)
+                store.persist(index_dir, metadata={"fingerprint": fingerprint})
+                return store
+    store.connect(db_uri=index_dir)
+    return store
@@ -0,0 +1,100 @@
+import logging
+
+from .query_context import QueryContext, activate_query_context
+from ..cache import get_response_cache
+from ..telemetry import span
+from ..utils.utils import get_artifacts_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+SEARCH_QUERY_SUFFIX = " Please format your answer in markdown."
+
+
+def format_search_query(query):
+    return f"{query}{SEARCH_QUERY_SUFFIX}"
+
+
+def response_cache_key(query, search_engine, mode, config, conversation=None):
+    """Key and artifacts fingerprint under which the answer to `query` is cached."""
+    conversation_history = conversation.history(query) if conversation is not None else None
+    # Vanilla search answers from input files rather than graph artifacts
+    cache_fingerprint = getattr(search_engine, "cache_fingerprint", None)
+    artifacts_fingerprint = cache_fingerprint() if cache_fingerprint else get_artifacts_fingerprint(config["artifacts_dir"])
+    cache_config = dict(config)
+    cache_config["llm_model"] = getattr(getattr(search_engine, "llm", None), "model", None)
+    if mode == "global" and config.get("tiered_global"):
+        # The only engine that reads the budget; a budget change leaves other cached answers valid
+        cache_config["tiered_token_budget"] = config.get("token_budget")
+    if conversation_history:
+        # A follow-up's answer depends on the turns before it
+        cache_config["conversation"] = conversation.digest(query)
+    return get_response_cache().make_key(query, mode, cache_config, artifacts_fingerprint), artifacts_fingerprint
+
+
+def is_cached(query, search_engine, mode, config, conversation=None):
+    cache_key, _ = response_cache_key(query, search_engine, mode, config, conversation)
+    return cache_key in get_response_cache()
+
+
+async def execute_query(query, search_engine, mode, config, query_context=None):
+    response_cache = get_response_cache()
+    conversation = query_context.conversation if query_context is not None else None
+    conversation_history = conversation.history(query) if conversation is not None else None
+    cache_key, artifacts_fingerprint = response_cache_key(query, search_engine, mode, config, conversation)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"Query served from response cache. Stats: {response_cache.stats()}")
+        if conversation is not None:
+            conversation.add_turn(query, cached["Response"])
+        return {**cached, "Cached": True}
+
+    query_context = query_context or QueryContext(mode=mode, token_budget=config.get("token_budget"))
+    with activate_query_context(query_context):
+        with span("query") as current:
+            response = await search_engine.asearch(format_search_query(query), conversation_history=conversation_history)
+            if current is not None:
+                current.add_tokens(response.prompt_tokens)
+    if conversation is not None:
+        query_context.stats["conversation_turn"] = len(conversation_history.to_qa_turns()) + 1 if conversation_history else 1
+        conversation.add_turn(query, response.response)
+
+    ttft = query_context.time_to_first_token
+    ttft = None if ttft is None else round(ttft, 2)
+    latency = round(query_context.latency, 2)
+    logger.info(f"Query processed. Tokens: {response.prompt_tokens}, LLM Calls: {response.llm_calls}")
+    logger.info(f"Query {query_context.query_id} time to first token: {ttft}s, total latency: {latency}s")
+    result = {
+        "Response": response.response,
+        "Tokens": response.prompt_tokens,
+        "LLM Calls": response.llm_calls,
+        "Time to First Token": ttft,
+        "Latency": latency,
+    }
+    if "map_calls_saved" in query_context.stats:
+        result["Reports Used"] = f"{query_context.stats['reports_used']}/{query_context.stats['reports_total']}"
+        result["Map Calls Saved"] = query_context.stats["map_calls_saved"]
+        result["Map Tokens Saved"] = query_context.stats["map_tokens_saved"]
+    if "tier_llm_calls" in query_context.stats:
+        result["Map Calls per Level"] = ", ".join(f"L{level}: {calls}" for level, calls in query_context.stats["tier_llm_calls"].items())
+        result["Flat Map Calls"] = query_context.stats["flat_map_calls"]
+        result["Tier Stop"] = query_context.stats["tier_stop"]
+    if "embedding_lookups" in query_context.stats:
+        result["Embedding Cache Hits"] = query_context.stats.get("embedding_cache_hits", 0)
+        result["Embedding Lookups"] = query_context.stats["embedding_lookups"]
+    if "chunks_retrieved" in query_context.stats:
+        result["Chunks Retrieved"] = query_context.stats["chunks_retrieved"]
+    if "conversation_turn" in query_context.stats:
+        result["Conversation Turn"] = query_context.stats["conversation_turn"]
+    if "context_build_seconds" in query_context.stats:
+        stats = query_context.stats
+        result["Context Build"] = round(stats["context_build_seconds"], 3)
+        # Follow-ups are compared with the conversation's first turn, which had nothing to reuse
+        if stats["first_context_build_seconds"] is not None:
+            result["Context Build Saved"] = round(max(stats["first_context_build_seconds"] - stats["context_build_seconds"], 0.0), 3)
+        result["Context Reused"] = (f"{stats['entities_reused']}/{stats['entities_selected']} entities, "
+                                    f"{stats['text_units_reused']} text units, {stats['reports_reused']} reports")
+        result["Embedding Tokens Saved"] = stats["embedding_tokens_saved"]
+    response_cache.set(cache_key, result, artifacts_fingerprint)
+    # The trace belongs to this run only, so it stays out of the response cache
+    return {**result, "Trace": query_context.spans}
@@ -0,0 +1,74 @@
+import contextvars
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_current_query_context = contextvars.ContextVar("ray_query_context", default=None)
+
+
+class QueryContext:
+    """Per-query state shared between process_query and engines that are reused across sessions."""
+
+    def __init__(self, mode=None, query_id=None, on_token=None, on_map_progress=None, session_id=None, token_budget=None, conversation=None):
+        self.query_id = query_id or uuid.uuid4().hex[:12]
+        self.session_id = session_id
+        self.mode = mode
+        # Prompt-token cap for engines that decide how much work to do as they go
+        self.token_budget = token_budget or None
+        # The session's Conversation when follow-ups should see earlier turns; None for one-off queries
+        self.conversation = conversation
+        self.on_token = on_token
+        self.on_map_progress = on_map_progress
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self.finished_at = None
+        self.map_total = 0
+        self.map_done = 0
+        self.stats = {}
+        self.spans = []
+
+    def push_token(self, token):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        if self.on_token:
+            self.on_token(token)
+
+    def start_map(self, total):
+        self.map_total += total
+        self._report_map_progress()
+
+    def finish_map_batch(self):
+        self.map_done += 1
+        self._report_map_progress()
+
+    def _report_map_progress(self):
+        if self.on_map_progress:
+            self.on_map_progress(self.map_done, self.map_total)
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    @property
+    def time_to_first_token(self):
+        return None if self.first_token_at is None else self.first_token_at - self.started_at
+
+    @property
+    def latency(self):
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+
+def get_query_context():
+    return _current_query_context.get()
+
+
+@contextmanager
+def activate_query_context(query_context):
+    token = _current_query_context.set(query_context)
+    try:
+        yield query_context
+    finally:
+        query_context.finish()
+        _current_query_context.reset(token)
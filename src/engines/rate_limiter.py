@@ -0,0 +1,302 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+
+import openai
+import streamlit as st
+from graphrag.query.llm.oai.chat_openai import ChatOpenAI as GraphRAGChatOpenAI
+
+from .query_context import get_query_context
+from ..telemetry import span, get_metrics_registry
+from ..config import (
+    CONCURRENT_COROUTINES,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_TARGET_LATENCY_SECONDS,
+    EMBEDDING_REQUESTS_PER_MINUTE,
+    EMBEDDING_TOKENS_PER_MINUTE,
+    EMBEDDING_TARGET_LATENCY_SECONDS,
+    RATE_LIMIT_BACKOFF_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def is_rate_limit_error(error):
+    return isinstance(error, openai.RateLimitError) or getattr(error, "status_code", None) == 429
+
+
+def retry_after_seconds(error):
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.level = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def delay(self, amount, now):
+        """Seconds until `amount` can be taken; oversized requests only wait for a full bucket."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.refill_per_second
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+
+class _Waiter:
+    def __init__(self, session, tokens, notify):
+        self.session = session
+        self.tokens = tokens
+        self.notify = notify
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+
+
+class RateLimiter:
+    """Process-wide limiter: request and token buckets, AIMD concurrency, round-robin across sessions.
+
+    Works for threads (sync callers) and event loops (async callers) at once, since each Streamlit
+    session runs its own loop in its own thread.
+    """
+
+    def __init__(self, name, requests_per_minute, tokens_per_minute, max_concurrency, target_latency, min_concurrency=1):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency_limit = max_concurrency
+        self.target_latency = target_latency
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.granted = 0
+        self.throttle_events = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._successes = 0
+        self._queues = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _session():
+        query_context = get_query_context()
+        return getattr(query_context, "session_id", None) or "default"
+
+    def _enqueue(self, tokens, notify):
+        waiter = _Waiter(self._session(), tokens, notify)
+        with self._lock:
+            self._queues.setdefault(waiter.session, deque()).append(waiter)
+        return waiter
+
+    def _dispatch(self):
+        """Grant waiting requests; returns how long until the next grant could happen, if blocked on time."""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        while self._queues and self.in_flight < self.concurrency_limit:
+            session, queue = next(iter(self._queues.items()))
+            waiter = queue[0]
+            delay = max(self.requests.delay(1, now), self.tokens.delay(waiter.tokens, now))
+            if delay > 0:
+                return delay
+            self.requests.take(1)
+            self.tokens.take(waiter.tokens)
+            queue.popleft()
+            # Round robin: the session just served moves to the back of the line
+            del self._queues[session]
+            if queue:
+                self._queues[session] = queue
+            self.in_flight += 1
+            self.granted += 1
+            wait = now - waiter.enqueued_at
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            waiter.granted = True
+            waiter.notify()
+        return None
+
+    def _withdraw(self, waiter):
+        with self._lock:
+            if waiter.granted:
+                self.in_flight -= 1
+                self._dispatch()
+                return
+            queue = self._queues.get(waiter.session)
+            if queue and waiter in queue:
+                queue.remove(waiter)
+                if not queue:
+                    del self._queues[waiter.session]
+
+    def acquire(self, tokens=0):
+        event = threading.Event()
+        waiter = self._enqueue(tokens, event.set)
+        while True:
+            with self._lock:
+                delay = self._dispatch()
+            if waiter.granted:
+                return
+            # Releases wake us directly; the timeout covers bucket refills and pauses
+            event.wait(timeout=min(delay or 1.0, 1.0))
+
+    async def aacquire(self, tokens=0):
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def notify():
+            try:
+                loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+            except RuntimeError:
+                pass  # The caller's loop has already closed
+
+        waiter = self._enqueue(tokens, notify)
+        try:
+            while True:
+                with self._lock:
+                    delay = self._dispatch()
+                if waiter.granted:
+                    return
+                try:
+                    await asyncio.wait_for(asyncio.shield(granted), timeout=min(delay or 1.0, 1.0))
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._withdraw(waiter)
+            raise
+
+    def release(self, latency=None, error=None):
+        with self._lock:
+            self.in_flight -= 1
+            if error is not None and is_rate_limit_error(error):
+                self.throttle_events += 1
+                self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit // 2)
+                backoff = retry_after_seconds(error) or RATE_LIMIT_BACKOFF_SECONDS
+                self.paused_until = max(self.paused_until, time.monotonic() + backoff)
+                self._successes = 0
+                logger.warning(f"{self.name} rate limited, concurrency now {self.concurrency_limit}, pausing {backoff}s")
+            elif error is None and latency is not None:
+                if latency > 2 * self.target_latency:
+                    self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit - 1)
+                    self._successes = 0
+                elif latency <= self.target_latency:
+                    # Additive increase: one more slot per window of healthy requests
+                    self._successes += 1
+                    if self._successes >= self.concurrency_limit:
+                        self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1)
+                        self._successes = 0
+            self._dispatch()
+
+    @contextmanager
+    def limit(self, tokens=0):
+        self.acquire(tokens)
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            # Includes GeneratorExit from an abandoned stream, which must still free the slot
+            self.release(error=e)
+            raise
+        else:
+            self.release(latency=time.monotonic() - started)
+
+    @asynccontextmanager
+    async def alimit(self, tokens=0):
+        await self.aacquire(tokens)
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            self.release(error=e)
+            raise
+        else:
+            self.release(latency=time.monotonic() - started)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": sum(len(queue) for queue in self._queues.values()),
+                "in_flight": self.in_flight,
+                "concurrency_limit": self.concurrency_limit,
+                "granted": self.granted,
+                "throttle_events": self.throttle_events,
+                "avg_wait": self.total_wait / self.granted if self.granted else 0.0,
+                "max_wait": self.max_wait,
+            }
+
+
+def disable_client_retries(model):
+    # Let 429s surface to graphrag's retry loop, where every attempt passes through the limiter
+    model.set_clients(
+        sync_client=model.sync_client.with_options(max_retries=0),
+        async_client=model.async_client.with_options(max_retries=0),
+    )
+
+
+class RateLimitedChatOpenAI(GraphRAGChatOpenAI):
+    """graphrag ChatOpenAI whose individual request attempts go through a shared RateLimiter."""
+
+    def __init__(self, *args, rate_limiter, token_encoder=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rate_limiter = rate_limiter
+        self.token_encoder = token_encoder
+        disable_client_retries(self)
+
+    def estimate_tokens(self, messages, kwargs):
+        completion_tokens = kwargs.get("max_tokens") or 0
+        if self.token_encoder is None:
+            return completion_tokens
+        if isinstance(messages, str):
+            messages = [{"content": messages}]
+        prompt_tokens = sum(len(self.token_encoder.encode(message.get("content") or "")) for message in messages)
+        return prompt_tokens + completion_tokens
+
+    def _generate(self, messages, streaming=True, callbacks=None, **kwargs):
+        tokens = self.estimate_tokens(messages, kwargs)
+        with span("llm_call", tokens=tokens), self.rate_limiter.limit(tokens):
+            return super()._generate(messages=messages, streaming=streaming, callbacks=callbacks, **kwargs)
+
+    def _stream_generate(self, messages, callbacks=None, **kwargs):
+        tokens = self.estimate_tokens(messages, kwargs)
+        with span("llm_call", tokens=tokens), self.rate_limiter.limit(tokens):
+            yield from super()._stream_generate(messages=messages, callbacks=callbacks, **kwargs)
+
+    async def _agenerate(self, messages, streaming=True, callbacks=None, **kwargs):
+        tokens = self.estimate_tokens(messages, kwargs)
+        with span("llm_call", tokens=tokens):
+            async with self.rate_limiter.alimit(tokens):
+                return await super()._agenerate(messages=messages, streaming=streaming, callbacks=callbacks, **kwargs)
+
+    async def _astream_generate(self, messages, callbacks=None, **kwargs):
+        tokens = self.estimate_tokens(messages, kwargs)
+        with span("llm_call", tokens=tokens):
+            async with self.rate_limiter.alimit(tokens):
+                async for delta in super()._astream_generate(messages=messages, callbacks=callbacks, **kwargs):
+                    yield delta
+
+
+@st.cache_resource
+def get_llm_rate_limiter():
+    limiter = RateLimiter("LLM", LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, CONCURRENT_COROUTINES, LLM_TARGET_LATENCY_SECONDS)
+    get_metrics_registry().register_gauges("llm_limiter", limiter.stats)
+    return limiter
+
+
+@st.cache_resource
+def get_embedding_rate_limiter():
+    limiter = RateLimiter("Embedding", EMBEDDING_REQUESTS_PER_MINUTE, EMBEDDING_TOKENS_PER_MINUTE, CONCURRENT_COROUTINES, EMBEDDING_TARGET_LATENCY_SECONDS)
+    get_metrics_registry().register_gauges("embedding_limiter", limiter.stats)
+    return limiter
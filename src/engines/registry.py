@@ -0,0 +1,124 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+from ..config.config import ENGINE_POOL_SIZE
+from ..telemetry import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+ENGINE_CONFIG_KEYS = (
+    "artifacts_dir",
+    "community_level",
+    "allow_general_knowledge",
+    "use_community_summary",
+    "include_community_rank",
+    "report_filter",
+    "report_top_n",
+    "report_min_score",
+    "tiered_global",
+)
+
+
+def engine_key(config):
+    # The API key is baked into the LLM client, so engines are never shared across keys
+    api_key_hash = hashlib.sha256((config.get("api_key") or "").encode("utf-8")).hexdigest()[:16]
+    return tuple(config.get(name) for name in ENGINE_CONFIG_KEYS) + (api_key_hash,)
+
+
+def build_search_engines(config):
+    # Imported on first build, so starting the app does not wait for graphrag, openai and tiktoken
+    from .engine_setup import setup_engines
+    from .search_engines import setup_search_engines
+
+    llm, token_encoder, env_vars, reports, entities, relationships, covariates, text_units = setup_engines(config)
+    return setup_search_engines(llm, token_encoder, reports, entities, relationships, covariates, text_units, env_vars, config)
+
+
+class EngineRegistry:
+    def __init__(self, max_size=ENGINE_POOL_SIZE):
+        self.max_size = max_size
+        self.builds = 0
+        self.reuses = 0
+        self.evictions = 0
+        self._engines = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self._prewarming = set()
+
+    def get(self, config):
+        key = engine_key(config)
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        # Sessions asking for the same engines wait for one build instead of racing
+        with build_lock:
+            with self._lock:
+                if key in self._engines:
+                    self._engines.move_to_end(key)
+                    self.reuses += 1
+                    return self._engines[key]
+            logger.info(f"Building search engines for {dict(zip(ENGINE_CONFIG_KEYS, key))}")
+            engines = build_search_engines(config)
+            with self._lock:
+                self.builds += 1
+                self._engines[key] = engines
+                while len(self._engines) > self.max_size:
+                    evicted, _ = self._engines.popitem(last=False)
+                    self._build_locks.pop(evicted, None)
+                    self.evictions += 1
+                    logger.info(f"Evicted search engines for {dict(zip(ENGINE_CONFIG_KEYS, evicted))}")
+            return engines
+
+    def prewarm(self, config):
+        """Build engines for `config` in the background unless they are pooled or already being built."""
+        if not config.get("artifacts_dir"):
+            return False
+        key = engine_key(config)
+        with self._lock:
+            if key in self._engines or key in self._prewarming:
+                return False
+            self._prewarming.add(key)
+        threading.Thread(target=self._prewarm, args=(key, config), name="engine-prewarm", daemon=True).start()
+        return True
+
+    def _prewarm(self, key, config):
+        try:
+            # A query arriving meanwhile waits on the same build lock instead of starting a second build
+            self.get(config)
+        except Exception as e:
+            logger.warning(f"Could not pre-build search engines, building on first query instead: {str(e)}")
+        finally:
+            with self._lock:
+                self._prewarming.discard(key)
+
+    def retire(self, artifacts_dir):
+        """Drop pooled engines of a replaced index run; queries still holding them are unaffected."""
+        index = ENGINE_CONFIG_KEYS.index("artifacts_dir")
+        with self._lock:
+            for key in [key for key in self._engines if key[index] == artifacts_dir]:
+                del self._engines[key]
+                self._build_locks.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._engines.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "engines": len(self._engines),
+                "builds": self.builds,
+                "reuses": self.reuses,
+                "evictions": self.evictions,
+                "prewarming": len(self._prewarming),
+            }
+
+
+@st.cache_resource
+def get_engine_registry():
+    registry = EngineRegistry()
+    get_metrics_registry().register_gauges("engine_pool", registry.stats)
+    return registry
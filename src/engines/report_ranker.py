@@ -0,0 +1,146 @@
+import logging
+import math
+import re
+import threading
+
+import numpy as np
+from graphrag.query.structured_search.global_search.community_context import GlobalCommunityContext
+
+from .global_search import get_current_query
+from .query_context import get_query_context
+from .query import SEARCH_QUERY_SUFFIX
+from ..telemetry import span
+from ..config import REPORT_FILTER_LEXICAL_WEIGHT
+
+logger = logging.getLogger(__name__)
+
+TERM_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return set(TERM_PATTERN.findall((text or "").lower()))
+
+
+class ReportRanker:
+    """Scores community reports against a query by summary-embedding similarity and lexical overlap.
+
+    Report vectors and the term index are built once by `prepare`, when the engines are built, or
+    on first use if that failed; each query then costs one embedding lookup and a matrix-vector product.
+    """
+
+    def __init__(self, reports, text_embedder, lexical_weight=REPORT_FILTER_LEXICAL_WEIGHT):
+        self.reports = reports
+        self.text_embedder = text_embedder
+        self.lexical_weight = lexical_weight
+        self._vectors = None
+        self._postings = None
+        self._idf = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def report_text(report):
+        return f"{report.title}\n{report.summary or report.full_content}"
+
+    def prepare(self):
+        with self._lock:
+            if self._vectors is not None:
+                return
+            texts = [self.report_text(report) for report in self.reports]
+            logger.info(f"Embedding {len(texts)} community report summaries for pre-filtering")
+            vectors = np.asarray(self.text_embedder.embed_many(texts), dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            postings = {}
+            for index, text in enumerate(texts):
+                for term in tokenize(text):
+                    postings.setdefault(term, []).append(index)
+            self._postings = {term: np.asarray(ids, dtype=np.int64) for term, ids in postings.items()}
+            self._idf = {term: math.log(1 + len(texts) / len(ids)) for term, ids in postings.items()}
+            self._vectors = vectors / norms
+
+    def score(self, query):
+        if self._vectors is None:
+            self.prepare()
+        query_vector = np.asarray(self.text_embedder.embed(query), dtype=np.float32)
+        query_vector /= np.linalg.norm(query_vector) or 1.0
+        semantic = self._vectors @ query_vector
+
+        lexical = np.zeros(len(self.reports), dtype=np.float32)
+        terms = [term for term in tokenize(query) if term in self._postings]
+        for term in terms:
+            lexical[self._postings[term]] += self._idf[term]
+        total_idf = sum(self._idf[term] for term in terms)
+        if total_idf:
+            lexical /= total_idf
+        return (1 - self.lexical_weight) * semantic + self.lexical_weight * lexical
+
+    def select(self, query, top_n=None, min_score=None):
+        if not self.reports:
+            return []
+        scores = self.score(query)
+        order = np.argsort(-scores, kind="stable")
+        if min_score is not None:
+            # Always keep the best report so the map phase has something to work with
+            order = order[:max(int((scores[order] >= min_score).sum()), 1)]
+        if top_n:
+            order = order[:top_n]
+        return [self.reports[index] for index in order]
+
+
+class RankedGlobalCommunityContext(GlobalCommunityContext):
+    """GlobalCommunityContext that only batches the reports a ReportRanker deems relevant to the query."""
+
+    def __init__(self, community_reports, entities=None, token_encoder=None, ranker=None, random_state=86):
+        super().__init__(community_reports=community_reports, entities=entities, token_encoder=token_encoder, random_state=random_state)
+        self.ranker = ranker
+        self._token_counts = {}
+        self._token_lock = threading.Lock()
+
+    def build_context(self, conversation_history=None, **kwargs):
+        with span("global_context"):
+            return self._build_ranked_context(conversation_history=conversation_history, **kwargs)
+
+    def _build_ranked_context(self, conversation_history=None, report_top_n=None, report_min_score=None, **kwargs):
+        query = get_current_query()
+        if query:
+            query = query.removesuffix(SEARCH_QUERY_SUFFIX)
+        if self.ranker is None or not query or (not report_top_n and report_min_score is None):
+            return super().build_context(conversation_history=conversation_history, **kwargs)
+        try:
+            selected = self.ranker.select(query, top_n=report_top_n, min_score=report_min_score)
+        except Exception as e:
+            logger.warning(f"Report pre-filtering failed, using all reports: {str(e)}")
+            return super().build_context(conversation_history=conversation_history, **kwargs)
+        self._record_savings(selected, kwargs.get("use_community_summary", True), kwargs.get("max_tokens", 8000))
+        subset = GlobalCommunityContext(
+            community_reports=selected,
+            entities=self.entities,
+            token_encoder=self.token_encoder,
+            random_state=self.random_state,
+        )
+        return subset.build_context(conversation_history=conversation_history, **kwargs)
+
+    def _report_token_counts(self, use_community_summary):
+        with self._token_lock:
+            if use_community_summary not in self._token_counts:
+                self._token_counts[use_community_summary] = {
+                    report.id: len(self.token_encoder.encode(report.summary if use_community_summary else report.full_content))
+                    for report in self.community_reports
+                } if self.token_encoder else {}
+            return self._token_counts[use_community_summary]
+
+    def _record_savings(self, selected, use_community_summary, max_tokens):
+        query_context = get_query_context()
+        if query_context is None:
+            return
+        token_counts = self._report_token_counts(use_community_summary)
+        total_tokens = sum(token_counts.values())
+        kept_tokens = sum(token_counts.get(report.id, 0) for report in selected)
+
+        def map_batches(tokens):
+            return math.ceil(tokens / max_tokens) if tokens else 0
+
+        query_context.stats["reports_used"] = len(selected)
+        query_context.stats["reports_total"] = len(self.community_reports)
+        query_context.stats["map_calls_saved"] = max(map_batches(total_tokens) - map_batches(kept_tokens), 0)
+        query_context.stats["map_tokens_saved"] = total_tokens - kept_tokens
@@ -0,0 +1,228 @@
+import logging
+import math
+import re
+import threading
+
+import numpy as np
+
+from .query import format_search_query
+from .vanilla_search import VANILLA_SYSTEM_PROMPT
+from ..config import (
+    CHUNK_SIZE,
+    VANILLA_TOP_K,
+    ROUTER_GLOBAL_THRESHOLD,
+    ROUTER_SEMANTIC_WEIGHT,
+    ROUTER_MAX_ENTITY_NGRAM,
+)
+
+logger = logging.getLogger(__name__)
+
+TERM_PATTERN = re.compile(r"[a-z0-9]+")
+# Cheapest first; a budget downgrade walks this list backwards from the chosen mode
+ROUTE_ORDER = ("vanilla", "local", "global")
+
+# Words that ask about the corpus as a whole rather than about one thing in it
+BROAD_CUES = {
+    "overall", "overview", "main", "major", "key", "themes", "theme", "trends", "trend", "patterns",
+    "summarize", "summarise", "summary", "across", "landscape", "common", "general", "broadly", "compare",
+}
+SPECIFIC_CUES = {"who", "when", "where", "which", "define", "definition", "date", "name", "many", "much"}
+STOPWORDS = {"a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on", "or", "the", "to", "was", "what", "with"}
+
+BROAD_EXAMPLES = (
+    "What are the main themes in these documents?",
+    "Summarize the key findings across all sources.",
+    "What trends and patterns appear overall?",
+)
+SPECIFIC_EXAMPLES = (
+    "Who is the chief executive of the company?",
+    "When was the agreement signed?",
+    "What did the report say about the budget for this project?",
+)
+
+
+def tokenize(text):
+    return TERM_PATTERN.findall((text or "").lower())
+
+
+class QueryRouter:
+    """Picks the cheapest engine likely to answer a query, without an LLM call.
+
+    Breadth comes from cue words and, optionally, similarity to example broad and specific
+    questions; specificity from entity titles of the loaded graph found in the query. Costs
+    are prompt-token and LLM-call estimates computed with the engines' own token encoder.
+    """
+
+    def __init__(self, global_search_engine, local_search_engine, vanilla_search_engine, text_embedder=None):
+        self.engines = {"global": global_search_engine, "local": local_search_engine, "vanilla": vanilla_search_engine}
+        # The context builders' encoder answers report rows from stored counts
+        self.token_encoder = local_search_engine.context_builder.token_encoder
+        self.text_embedder = text_embedder
+        self._entity_titles = None
+        self._report_tokens = None
+        self._tier_tokens = None
+        self._semantic_axis = None
+        self._lock = threading.Lock()
+
+    def _count(self, text):
+        return len(self.token_encoder.encode(text or ""))
+
+    def _prepare(self):
+        with self._lock:
+            if self._entity_titles is not None:
+                return
+            titles = {}
+            for entity in self.engines["local"].context_builder.entities.values():
+                title = " ".join(tokenize(entity.title))
+                if title and title not in STOPWORDS and len(title) > 1:
+                    titles[title] = entity.title
+            global_builder = self.engines["global"].context_builder
+            use_summary = self.engines["global"].context_builder_params.get("use_community_summary", False)
+            # Roughly the row the community context writes per report: id, title, content, rank
+            def report_tokens(reports):
+                return np.asarray([
+                    self._count(f"{report.short_id}|{report.title}|{report.summary if use_summary else report.full_content}|{report.rank}")
+                    for report in reports
+                ], dtype=np.int64)
+
+            self._report_tokens = report_tokens(global_builder.community_reports)
+            hierarchy = getattr(self.engines["global"], "hierarchy", None)
+            if hierarchy is not None:
+                max_level = self.engines["global"].max_level
+                # Tiered search maps at least the top tier and at most every tier down to max_level
+                self._tier_tokens = (
+                    int(report_tokens(hierarchy.roots(max_level)).sum()),
+                    int(report_tokens([report for report in hierarchy.reports.values() if hierarchy.levels[report.id] <= max_level]).sum()),
+                )
+            self._entity_titles = titles
+
+    def _semantic_breadth(self, query):
+        # Positive when the query is nearer the broad examples than the specific ones
+        if self._semantic_axis is None:
+            vectors = np.asarray(self.text_embedder.embed_many(list(BROAD_EXAMPLES + SPECIFIC_EXAMPLES)), dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+            broad = vectors[:len(BROAD_EXAMPLES)].mean(axis=0)
+            specific = vectors[len(BROAD_EXAMPLES):].mean(axis=0)
+            self._semantic_axis = (broad, specific)
+        broad, specific = self._semantic_axis
+        query_vector = np.asarray(self.text_embedder.embed(query), dtype=np.float32)
+        query_vector /= np.linalg.norm(query_vector) or 1.0
+        return float(query_vector @ broad - query_vector @ specific)
+
+    def features(self, query, use_embeddings=False):
+        self._prepare()
+        terms = tokenize(query)
+        matches = set()
+        for size in range(min(ROUTER_MAX_ENTITY_NGRAM, len(terms)), 0, -1):
+            for start in range(len(terms) - size + 1):
+                title = self._entity_titles.get(" ".join(terms[start:start + size]))
+                if title:
+                    matches.add(title)
+        features = {
+            "terms": len(terms),
+            "broad_cues": sum(1 for term in terms if term in BROAD_CUES),
+            "specific_cues": sum(1 for term in terms if term in SPECIFIC_CUES),
+            "entity_matches": sorted(matches),
+        }
+        if use_embeddings and self.text_embedder is not None:
+            features["semantic_breadth"] = round(self._semantic_breadth(query), 4)
+        return features
+
+    def classify(self, features):
+        breadth = features["broad_cues"] - 0.5 * features["specific_cues"] + ROUTER_SEMANTIC_WEIGHT * features.get("semantic_breadth", 0.0)
+        if breadth >= ROUTER_GLOBAL_THRESHOLD and len(features["entity_matches"]) <= 1:
+            return "global", f"broad question (breadth {breadth:.2f})"
+        if features["entity_matches"]:
+            return "local", f"mentions {', '.join(features['entity_matches'][:3])}"
+        return "vanilla", "no graph entities mentioned"
+
+    def estimate(self, mode, query, budget=None):
+        """Upper-bound prompt tokens and LLM calls for running the query in one mode."""
+        self._prepare()
+        engine = self.engines[mode]
+        query_tokens = self._count(format_search_query(query))
+        if mode == "vanilla":
+            prompt_tokens = self._count(VANILLA_SYSTEM_PROMPT) + VANILLA_TOP_K * CHUNK_SIZE + query_tokens
+            return {"mode": mode, "prompt_tokens": prompt_tokens, "llm_calls": 1}
+        if mode == "local":
+            prompt_tokens = self._count(engine.system_prompt) + engine.context_builder_params.get("max_tokens", 0) + query_tokens
+            return {"mode": mode, "prompt_tokens": prompt_tokens, "llm_calls": 1}
+        params = engine.context_builder_params
+        batch_tokens = max(params.get("max_tokens", 1), 1)
+
+        def global_cost(report_total):
+            batches = max(1, math.ceil(report_total / batch_tokens))
+            map_tokens = report_total + batches * (self._count(engine.map_system_prompt) + query_tokens)
+            reduce_tokens = self._count(engine.reduce_system_prompt) + query_tokens + min(
+                batches * engine.map_llm_params.get("max_tokens", 0), engine.max_data_tokens
+            )
+            return {"mode": mode, "prompt_tokens": map_tokens + reduce_tokens, "llm_calls": batches + 1}
+
+        if self._tier_tokens is not None:
+            top_tier, all_tiers = self._tier_tokens
+            estimate = global_cost(all_tiers)
+            if budget and estimate["prompt_tokens"] > budget:
+                # Tiered search stops drilling down once the budget is spent, but always maps the top tier
+                estimate = global_cost(min(all_tiers, budget))
+                estimate["prompt_tokens"] = max(min(estimate["prompt_tokens"], budget), global_cost(top_tier)["prompt_tokens"])
+            return estimate
+        report_tokens = self._report_tokens
+        if params.get("report_top_n"):
+            report_tokens = np.sort(report_tokens)[::-1][:params["report_top_n"]]
+        return global_cost(int(report_tokens.sum()))
+
+    def route(self, query, mode="auto", budget=None, use_embeddings=False, is_cached=None):
+        """Decide which engine runs the query; `budget` caps the estimated prompt tokens.
+
+        `is_cached(mode)` tells whether that mode's answer is already in the response cache; a cached
+        answer costs no tokens, so it is never refused or routed away from for being over budget.
+        """
+        estimates = {name: self.estimate(name, query, budget) for name in ROUTE_ORDER}
+        features = self.features(query, use_embeddings) if mode == "auto" else {}
+        if mode == "auto":
+            chosen, reason = self.classify(features)
+        else:
+            chosen, reason = mode, "selected by user"
+        cached = {}
+
+        def fits(name):
+            if not budget or estimates[name]["prompt_tokens"] <= budget:
+                return True
+            if is_cached is not None and name not in cached:
+                cached[name] = is_cached(name)
+            return cached.get(name, False)
+
+        if budget and mode == "auto" and not fits(chosen):
+            fitting = [name for name in ROUTE_ORDER[:ROUTE_ORDER.index(chosen)] if fits(name)]
+            if fitting:
+                reason = f"{reason}; {chosen} over budget, using {fitting[-1]}"
+                chosen = fitting[-1]
+        decision = {
+            "requested_mode": mode,
+            "mode": chosen,
+            "reason": reason,
+            "estimate": estimates[chosen],
+            "estimates": estimates,
+            "features": features,
+            "budget": budget or None,
+            "within_budget": fits(chosen),
+            "cached": cached.get(chosen, False),
+        }
+        logger.info(f"Routed query ({mode}) to {chosen}: {reason}; estimated {estimates[chosen]['prompt_tokens']} tokens, "
+                    f"{estimates[chosen]['llm_calls']} LLM calls; features {features}")
+        return decision
+
+    @staticmethod
+    def record_outcome(decision, result):
+        """Log realized cost next to the estimate so thresholds can be tuned from ray.log and the history."""
+        estimate = decision["estimate"]
+        logger.info(f"Route outcome ({decision['requested_mode']} -> {decision['mode']}): estimated {estimate['prompt_tokens']} tokens / "
+                    f"{estimate['llm_calls']} calls, realized {result.get('Tokens')} tokens / {result.get('LLM Calls')} calls"
+                    f"{' (cached)' if result.get('Cached') else ''}")
+        return {
+            **result,
+            "Requested Mode": decision["requested_mode"],
+            "Route Reason": decision["reason"],
+            "Estimated Tokens": estimate["prompt_tokens"],
+            "Estimated LLM Calls": estimate["llm_calls"],
+        }
@@ -1,23 +1,58 @@
-from graphrag.query.structured_search.global_search.community_context import GlobalCommunityContext
-from graphrag.query.structured_search.global_search.search import GlobalSearch
-from graphrag.query.structured_search.local_search.mixed_context import LocalSearchMixedContext
 from graphrag.query.structured_search.local_search.search import LocalSearch
 from graphrag.vector_stores.lancedb import LanceDBVectorStore
 from graphrag.query.context_builder.entity_extraction import EntityVectorStoreKey
 from graphrag.query.input.loaders.dfs import store_entity_semantic_embeddings
 from graphrag.query.llm.oai.embedding import OpenAIEmbedding
 from graphrag.query.llm.oai.typing import OpenaiApiType
-from ..config import MAX_TOKENS_GLOBAL, MAX_TOKENS_LOCAL, TEMPERATURE, RESPONSE_TYPE, CONCURRENT_COROUTINES
+from .global_search import ProgressGlobalSearch
+from .tiered_search import CommunityHierarchy, TieredGlobalSearch
+from .local_search import TracedLocalSearchMixedContext
+from .vanilla_search import VanillaSearch
+from .router import QueryRouter
+from .token_counts import PrecountedTokenEncoder
+from .streaming import QueryContextCallback
+from .numpy_vector_store import build_entity_vector_store
+from .embedding_cache import CachedTextEmbedding, get_embedding_cache
+from .report_ranker import ReportRanker, RankedGlobalCommunityContext
+from .rate_limiter import disable_client_retries, get_embedding_rate_limiter
+from ..config import MAX_TOKENS_GLOBAL, MAX_TOKENS_LOCAL, TEMPERATURE, RESPONSE_TYPE, CONCURRENT_COROUTINES, ENTITY_VECTOR_STORE, LLM_MAX_RETRIES
+from ..data.data_loader import load_token_counts, load_community_hierarchy
+from ..data.snapshot import encoder_name
+from ..telemetry import span
+from ..utils.utils import get_artifacts_fingerprint
+import hashlib
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
-def setup_global_search_engine(llm, token_encoder, reports, entities, context_builder_params, allow_general_knowledge):
+def setup_text_embedder(env_vars):
+    text_embedder = OpenAIEmbedding(
+        api_key=env_vars["api_key"],
+        api_base=None,
+        api_type=OpenaiApiType.OpenAI,
+        model=env_vars["embedding_model"],
+        deployment_name=env_vars["embedding_model"],
+        max_retries=LLM_MAX_RETRIES,
+    )
+    disable_client_retries(text_embedder)
+    return CachedTextEmbedding(text_embedder, env_vars["embedding_model"], get_embedding_cache(), get_embedding_rate_limiter())
+
+def setup_context_token_encoder(token_encoder, reports, entities, relationships, covariates, text_units, env_vars, config):
+    prepared = (reports, entities, relationships, covariates, text_units)
+    counts = load_token_counts(env_vars["artifacts_dir"], config["community_level"], encoder_name(token_encoder), prepared, token_encoder)
+    return PrecountedTokenEncoder(token_encoder, counts)
+
+def setup_global_search_engine(llm, token_encoder, reports, entities, context_builder_params, allow_general_knowledge, report_ranker=None, context_token_encoder=None, hierarchy=None, max_level=None):
     map_llm_params = {"max_tokens": 1000, "temperature": TEMPERATURE, "response_format": {"type": "json_object"}}
     reduce_llm_params = {"max_tokens": 2000, "temperature": TEMPERATURE}
-    return GlobalSearch(
+    # Tiered search walks the community hierarchy down to max_level instead of mapping one level
+    search_class, tier_params = ProgressGlobalSearch, {}
+    if hierarchy is not None:
+        search_class, tier_params = TieredGlobalSearch, {"hierarchy": CommunityHierarchy(*hierarchy), "max_level": max_level}
+    return search_class(
         llm=llm,
-        context_builder=GlobalCommunityContext(community_reports=reports, entities=entities, token_encoder=token_encoder),
+        context_builder=RankedGlobalCommunityContext(community_reports=reports, entities=entities, token_encoder=context_token_encoder or token_encoder, ranker=report_ranker),
         token_encoder=token_encoder,
         max_data_tokens=MAX_TOKENS_GLOBAL,
         map_llm_params=map_llm_params,
@@ -26,28 +61,45 @@ def setup_global_search_engine(llm, token_encoder, reports, entities, context_bu
         json_mode=True,
         context_builder_params=context_builder_params,
         concurrent_coroutines=CONCURRENT_COROUTINES,
-        response_type=RESPONSE_TYPE
+        response_type=RESPONSE_TYPE,
+        callbacks=[QueryContextCallback()],
+        **tier_params,
     )
 
-def setup_local_search_engine(llm, token_encoder, reports, entities, relationships, covariates, text_units, env_vars, local_context_params):
-    lancedb_uri = f"{env_vars['artifacts_dir']}/lancedb"
+def entity_embeddings_signature(artifacts_dir, entities):
+    digest = hashlib.sha1((get_artifacts_fingerprint(artifacts_dir) or "").encode("utf-8"))
+    for entity_id in sorted(entity.id for entity in entities):
+        digest.update(entity_id.encode("utf-8"))
+    return digest.hexdigest()
+
+def load_entity_embeddings_if_changed(entities, description_embedding_store, lancedb_uri, artifacts_dir):
+    marker_path = os.path.join(lancedb_uri, ".ray_entity_embeddings")
+    table_path = os.path.join(lancedb_uri, f"{description_embedding_store.collection_name}.lance")
+    signature = entity_embeddings_signature(artifacts_dir, entities)
+    if os.path.exists(marker_path) and os.path.exists(table_path):
+        with open(marker_path, "r", encoding="utf-8") as f:
+            if f.read().strip() == signature:
+                logger.info("Entity embeddings in LanceDB are current, skipping reload")
+                return
+    logger.info(f"Loading {len(entities)} entity embeddings into LanceDB")
+    store_entity_semantic_embeddings(entities=entities, vectorstore=description_embedding_store)
+    os.makedirs(lancedb_uri, exist_ok=True)
+    with open(marker_path, "w", encoding="utf-8") as f:
+        f.write(signature)
+
+def setup_entity_vector_store(entities, artifacts_dir):
+    if ENTITY_VECTOR_STORE == "numpy":
+        return build_entity_vector_store(artifacts_dir)
+    lancedb_uri = f"{artifacts_dir}/lancedb"
     description_embedding_store = LanceDBVectorStore(collection_name="entity_description_embeddings")
     description_embedding_store.connect(db_uri=lancedb_uri)
+    load_entity_embeddings_if_changed(entities, description_embedding_store, lancedb_uri, artifacts_dir)
+    return description_embedding_store
+
+def setup_local_search_engine(llm, token_encoder, reports, entities, relationships, covariates, text_units, env_vars, local_context_params, text_embedder, context_token_encoder=None):
+    description_embedding_store = setup_entity_vector_store(entities, env_vars["artifacts_dir"])
     
-    text_embedder = OpenAIEmbedding(
-        api_key=env_vars["api_key"],
-        api_base=None,
-        api_type=OpenaiApiType.OpenAI,
-        model=env_vars["embedding_model"],
-        deployment_name=env_vars["embedding_model"],
-        max_retries=20,
-    )
-    
-    entity_description_embeddings = store_entity_semantic_embeddings(
-        entities=entities, vectorstore=description_embedding_store
-    )
-    
-    context_builder = LocalSearchMixedContext(
+    context_builder = TracedLocalSearchMixedContext(
         community_reports=reports,
         text_units=text_units,
         entities=entities,
@@ -56,7 +108,7 @@ def setup_local_search_engine(llm, token_encoder, reports, entities, relationshi
         entity_text_embeddings=description_embedding_store,
         embedding_vectorstore_key=EntityVectorStoreKey.ID,
         text_embedder=text_embedder,
-        token_encoder=token_encoder,
+        token_encoder=context_token_encoder or token_encoder,
     )
     
     llm_params = {
@@ -71,9 +123,14 @@ def setup_local_search_engine(llm, token_encoder, reports, entities, relationshi
         llm_params=llm_params,
         context_builder_params=local_context_params,
         response_type=RESPONSE_TYPE,
+        callbacks=[QueryContextCallback()],
     )
 
-def setup_search_engines(llm, token_encoder, reports, entities, relationships, covariates, text_units, env_vars, config):
+def setup_search_engines(llm, token_encoder, reports, entities, relationships, covariates, text_units, env_vars, config, text_embedder=None):
+    with span("setup_search_engines"):
+        return _setup_search_engines(llm, token_encoder, reports, entities, relationships, covariates, text_units, env_vars, config, text_embedder)
+
+def _setup_search_engines(llm, token_encoder, reports, entities, relationships, covariates, text_units, env_vars, config, text_embedder=None):
     global_context_builder_params = {
         "use_community_summary": config["use_community_summary"],
         "shuffle_data": True,
@@ -86,6 +143,9 @@ def setup_search_engines(llm, token_encoder, reports, entities, relationships, c
         "max_tokens": MAX_TOKENS_GLOBAL,
         "context_name": "Reports",
     }
+    if config.get("report_filter"):
+        global_context_builder_params["report_top_n"] = config.get("report_top_n")
+        global_context_builder_params["report_min_score"] = config.get("report_min_score")
 
     local_context_params = {
         "text_unit_prop": 0.5,
@@ -102,7 +162,28 @@ def setup_search_engines(llm, token_encoder, reports, entities, relationships, c
         "max_tokens": MAX_TOKENS_GLOBAL,
     }
 
-    global_search_engine = setup_global_search_engine(llm, token_encoder, reports, entities, global_context_builder_params, config["allow_general_knowledge"])
-    local_search_engine = setup_local_search_engine(llm, token_encoder, reports, entities, relationships, covariates, text_units, env_vars, local_context_params)
+    text_embedder = text_embedder or setup_text_embedder(env_vars)
+    report_ranker = ReportRanker(reports, text_embedder) if config.get("report_filter") else None
+    if report_ranker is not None:
+        # Embed the reports now, so the first filtered query does not pay for it and others do not queue behind it
+        try:
+            with span("prepare_report_ranker"):
+                report_ranker.prepare()
+        except Exception as e:
+            logger.warning(f"Report pre-filtering not prepared, retrying on first use: {str(e)}")
+
+    # Context packing counts tokens from the snapshot's stored counts instead of re-encoding every row
+    context_token_encoder = setup_context_token_encoder(token_encoder, reports, entities, relationships, covariates, text_units, env_vars, config)
+
+    hierarchy = load_community_hierarchy(env_vars["artifacts_dir"]) if config.get("tiered_global") else None
+
+    global_search_engine = setup_global_search_engine(
+        llm, token_encoder, reports, entities, global_context_builder_params, config["allow_general_knowledge"],
+        report_ranker, context_token_encoder, hierarchy, config["community_level"],
+    )
+    local_search_engine = setup_local_search_engine(llm, token_encoder, reports, entities, relationships, covariates, text_units, env_vars, local_context_params, text_embedder, context_token_encoder)
+    vanilla_search_engine = VanillaSearch(llm, token_encoder, text_embedder, env_vars["embedding_model"], callbacks=[QueryContextCallback()])
+
+    query_router = QueryRouter(global_search_engine, local_search_engine, vanilla_search_engine, text_embedder)
 
-    return global_search_engine, local_search_engine
\ No newline at end of file
+    return global_search_engine, local_search_engine, vanilla_search_engine, query_router
@@ -0,0 +1,30 @@
+import logging
+
+from graphrag.query.structured_search.global_search.callbacks import GlobalSearchLLMCallback
+
+from .query_context import get_query_context
+
+logger = logging.getLogger(__name__)
+
+
+class QueryContextCallback(GlobalSearchLLMCallback):
+    # Engines are shared, so tokens are routed to whichever query is active in the calling context
+    # rather than collected on the callback itself.
+
+    def on_llm_new_token(self, token):
+        query_context = get_query_context()
+        if query_context is None:
+            return
+        try:
+            query_context.push_token(token)
+        except Exception:
+            # A failing renderer must not surface inside the LLM call and trigger a retry
+            logger.exception("Error while streaming token")
+
+    def on_map_response_start(self, map_response_contexts):
+        query_context = get_query_context()
+        if query_context is not None:
+            query_context.start_map(len(map_response_contexts))
+
+    def on_map_response_end(self, map_response_outputs):
+        pass
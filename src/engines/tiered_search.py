@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import math
+import re
+import time
+
+import pandas as pd
+from graphrag.query.structured_search.global_search.community_context import GlobalCommunityContext
+from graphrag.query.structured_search.global_search.search import GlobalSearchResult
+
+from .global_search import ProgressGlobalSearch, _current_query
+from .query_context import get_query_context
+from ..config import TIERED_POINT_MIN_SCORE, TIERED_TARGET_POINTS, TIERED_DRILL_MIN_SCORE
+from ..telemetry import span
+
+logger = logging.getLogger(__name__)
+
+REPORT_REFERENCE = re.compile(r"Reports \(([^)]*)\)")
+# Pre-filter parameters belong to the flat context builder
+RANKER_PARAMS = ("report_top_n", "report_min_score")
+
+
+class CommunityHierarchy:
+    """Community reports of every level with their parent/child links."""
+
+    def __init__(self, reports, levels, parents):
+        self.reports = {report.id: report for report in reports}
+        self.levels = levels
+        self.parents = parents
+        self.children = {}
+        for community, parent in parents.items():
+            if parent in self.reports and community in self.reports:
+                self.children.setdefault(parent, []).append(self.reports[community])
+
+    def roots(self, max_level):
+        return [
+            report for report in self.reports.values()
+            if self.levels[report.id] <= max_level and self.parents.get(report.id) not in self.reports
+        ]
+
+    def children_of(self, community, max_level):
+        return [report for report in self.children.get(community, []) if self.levels[report.id] <= max_level]
+
+
+def batch_report_ids(context_text, column_delimiter="|"):
+    # Rows start with the report id; the first two lines are the batch title and header
+    return {line.split(column_delimiter, 1)[0] for line in context_text.splitlines()[2:] if column_delimiter in line}
+
+
+def community_scores(map_responses):
+    """Best point score per community, using the reports each point cites or else the whole batch."""
+    scores = {}
+    for response in map_responses:
+        batch_ids = batch_report_ids(response.context_text)
+        for point in response.response if isinstance(response.response, list) else []:
+            cited = {
+                report_id.strip()
+                for match in REPORT_REFERENCE.findall(point.get("answer", ""))
+                for report_id in match.split(",")
+            } & batch_ids
+            for report_id in cited or batch_ids:
+                scores[report_id] = max(scores.get(report_id, 0), point.get("score", 0))
+    return scores
+
+
+class TieredGlobalSearch(ProgressGlobalSearch):
+    """Global search that maps the coarsest communities first and only drills into promising ones.
+
+    After each tier, children of communities with a point scoring at least `drill_min_score` form
+    the next tier. Search stops once `target_points` points score at least `point_min_score`, the
+    query's token budget is spent, or `max_level` is reached; the reduce step then sees the points of
+    every tier.
+    """
+
+    def __init__(self, *args, hierarchy, max_level, point_min_score=TIERED_POINT_MIN_SCORE,
+                 target_points=TIERED_TARGET_POINTS, drill_min_score=TIERED_DRILL_MIN_SCORE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hierarchy = hierarchy
+        self.max_level = max_level
+        self.point_min_score = point_min_score
+        self.target_points = target_points
+        self.drill_min_score = drill_min_score
+
+    async def asearch(self, query, conversation_history=None, **kwargs):
+        token = _current_query.set(query)
+        try:
+            return await self._tiered_search(query, conversation_history)
+        finally:
+            _current_query.reset(token)
+
+    def _tier_context(self, reports, conversation_history):
+        params = {name: value for name, value in self.context_builder_params.items() if name not in RANKER_PARAMS}
+        builder = GlobalCommunityContext(
+            community_reports=reports,
+            entities=self.context_builder.entities,
+            token_encoder=self.context_builder.token_encoder,
+            random_state=self.context_builder.random_state,
+        )
+        return builder.build_context(conversation_history=conversation_history, **params)
+
+    async def _map_tier(self, context_chunks, query):
+        if self.callbacks:
+            for callback in self.callbacks:
+                callback.on_map_response_start(context_chunks)
+        map_responses = await asyncio.gather(*[
+            self._map_response_single_batch(context_data=data, query=query, **self.map_llm_params)
+            for data in context_chunks
+        ])
+        if self.callbacks:
+            for callback in self.callbacks:
+                callback.on_map_response_end(map_responses)
+        return map_responses
+
+    async def _tiered_search(self, query, conversation_history):
+        start_time = time.time()
+        query_context = get_query_context()
+        token_budget = query_context.token_budget if query_context is not None else None
+        tier = self.hierarchy.roots(self.max_level)
+        map_responses, context_chunks, context_records, tiers = [], [], {}, []
+        map_tokens = strong_points = 0
+        stop = "no community reports"
+        while tier:
+            level = min(self.hierarchy.levels[report.id] for report in tier)
+            with span("global_tier", level=level):
+                chunks, records = self._tier_context(tier, conversation_history)
+            chunks = chunks if isinstance(chunks, list) else [chunks]
+            responses = await self._map_tier(chunks, query)
+            map_responses.extend(responses)
+            context_chunks.extend(chunks)
+            for name, records_df in records.items():
+                context_records.setdefault(name, []).append(records_df)
+            tier_tokens = sum(response.prompt_tokens for response in responses)
+            map_tokens += tier_tokens
+            strong_points += sum(
+                1 for response in responses if isinstance(response.response, list)
+                for point in response.response if point.get("score", 0) >= self.point_min_score
+            )
+            tiers.append({"level": level, "reports": len(tier), "llm_calls": len(responses), "prompt_tokens": tier_tokens})
+            if strong_points >= self.target_points:
+                stop = f"{strong_points} points scored {self.point_min_score}+"
+                break
+            if token_budget and map_tokens >= token_budget:
+                stop = f"token budget spent ({map_tokens}/{token_budget})"
+                break
+            scores = community_scores(responses)
+            promising = [report for report in tier if scores.get(report.short_id, 0) >= self.drill_min_score]
+            # Children of the best-scoring communities come first when the budget cannot cover them all
+            promising.sort(key=lambda report: scores[report.short_id], reverse=True)
+            tier = [child for report in promising for child in self.hierarchy.children_of(report.id, self.max_level)]
+            stop = "finest level reached" if promising else "no community worth expanding"
+            if tier and token_budget:
+                tier = self._fit_budget(tier, token_budget - map_tokens)
+                if not tier:
+                    stop = f"token budget spent ({map_tokens}/{token_budget})"
+        logger.info(f"Tiered global search stopped after {len(tiers)} tiers ({stop}): {tiers}")
+        self._record_tiers(tiers, stop)
+
+        reduce_response = await self._reduce_response(map_responses=map_responses, query=query, **self.reduce_llm_params)
+        return GlobalSearchResult(
+            response=reduce_response.response,
+            context_data={name: pd.concat(frames, ignore_index=True) for name, frames in context_records.items()},
+            context_text=context_chunks,
+            map_responses=map_responses,
+            reduce_context_data=reduce_response.context_data,
+            reduce_context_text=reduce_response.context_text,
+            completion_time=time.time() - start_time,
+            llm_calls=sum(response.llm_calls for response in map_responses) + reduce_response.llm_calls,
+            prompt_tokens=map_tokens + reduce_response.prompt_tokens,
+        )
+
+    def _fit_budget(self, reports, remaining_tokens):
+        use_summary = self.context_builder_params.get("use_community_summary", True)
+        fitted, tokens = [], 0
+        for report in reports:
+            tokens += len(self.context_builder.token_encoder.encode(report.summary if use_summary else report.full_content))
+            if tokens > remaining_tokens:
+                break
+            fitted.append(report)
+        return fitted
+
+    def flat_map_calls(self):
+        """Map batches a flat global search over the configured level would send."""
+        use_summary = self.context_builder_params.get("use_community_summary", True)
+        tokens = sum(self.context_builder._report_token_counts(use_summary).values())
+        return math.ceil(tokens / self.context_builder_params.get("max_tokens", 8000)) if tokens else 0
+
+    def _record_tiers(self, tiers, stop):
+        query_context = get_query_context()
+        if query_context is None:
+            return
+        query_context.stats["tier_llm_calls"] = {tier["level"]: tier["llm_calls"] for tier in tiers}
+        query_context.stats["tier_reports"] = {tier["level"]: tier["reports"] for tier in tiers}
+        query_context.stats["tier_stop"] = stop
+        query_context.stats["flat_map_calls"] = self.flat_map_calls()
@@ -0,0 +1,59 @@
+from ..config import TOKEN_COUNT_MEMO_SIZE
+
+# Short pieces (ids, titles, numbers, headers) recur across queries and are cheap to keep
+MEMO_MAX_CHARS = 256
+
+
+class PrecountedTokenEncoder:
+    """Token encoder for the context builders that answers from token counts stored with the snapshot.
+
+    graphrag packs context by calling len(encode(row)) for every row it considers, where a row is
+    its fields joined by the column delimiter. Rows are split on the delimiter; fields with a stored
+    count (keyed by hash) cost a dict lookup and the remaining short fields are encoded once and memoized. Each
+    delimiter counts as one token, which can overestimate by about a token per column and so keeps
+    packed context within its budget.
+    """
+
+    def __init__(self, token_encoder, counts, column_delimiter="|", memo_size=TOKEN_COUNT_MEMO_SIZE):
+        self.token_encoder = token_encoder
+        self.counts = counts
+        self.column_delimiter = column_delimiter
+        self.memo_size = memo_size
+        self._memo = {}
+
+    @property
+    def name(self):
+        return getattr(self.token_encoder, "name", None)
+
+    def _count_piece(self, piece):
+        count = self.counts.get(hash(piece))
+        if count is None:
+            count = self._memo.get(piece)
+        if count is not None:
+            return count
+        # A stored field followed by the line break and first column of the next row
+        head, newline, tail = piece.rpartition("\n")
+        head_count = self.counts.get(hash(head)) if newline else None
+        if head_count is not None:
+            return head_count + 1 + (self._count_piece(tail) if tail else 0)
+        count = len(self.token_encoder.encode(piece))
+        if len(piece) <= MEMO_MAX_CHARS and len(self._memo) < self.memo_size:
+            self._memo[piece] = count
+        return count
+
+    def count(self, text):
+        if not text:
+            return 0
+        count = self.counts.get(hash(text))
+        if count is not None:
+            return count
+        pieces = text.split(self.column_delimiter)
+        return sum(self._count_piece(piece) for piece in pieces) + len(pieces) - 1
+
+    def encode(self, text, **kwargs):
+        # Context packing only takes the length; no token ids are produced
+        return range(self.count(text))
+
+    def decode(self, tokens):
+        # Token ids come from the wrapped encoder; encode above only stands in for their count
+        return self.token_encoder.decode(tokens)
@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+import time
+
+import numpy as np
+import streamlit as st
+from graphrag.query.structured_search.base import SearchResult
+
+from .query import SEARCH_QUERY_SUFFIX
+from .query_context import get_query_context
+from ..config import (
+    INPUT_DIR,
+    VECTORSTORE_DIR,
+    COLLECTION_NAME,
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    VANILLA_MANIFEST_PATH,
+    VANILLA_TOP_K,
+    VANILLA_CANDIDATES,
+    MAX_TOKENS_LOCAL,
+    TEMPERATURE,
+)
+from ..indexing.manifest import build_manifest, load_manifest, save_manifest, diff_manifest, has_changes
+from ..telemetry import span
+
+logger = logging.getLogger(__name__)
+
+TERM_PATTERN = re.compile(r"[a-z0-9]+")
+# Reciprocal rank fusion constant; 60 is the value from the original RRF paper
+RRF_K = 60
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+VANILLA_SYSTEM_PROMPT = """You are RAY, a helpful assistant answering questions about the user's documents.
+Answer using only the numbered excerpts below. If they do not contain the answer, say so.
+Cite excerpts you rely on as [n].
+
+{context}
+"""
+
+
+def tokenize(text):
+    return TERM_PATTERN.findall(text.lower())
+
+
+def chunk_tokens(text, token_encoder, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    tokens = token_encoder.encode(text)
+    step = max(chunk_size - chunk_overlap, 1)
+    for start in range(0, max(len(tokens) - chunk_overlap, 1), step):
+        yield token_encoder.decode(tokens[start:start + chunk_size])
+
+
+class BM25Index:
+    def __init__(self, ids, documents):
+        self.ids = ids
+        lengths = []
+        postings = {}
+        for index, document in enumerate(documents):
+            terms = tokenize(document)
+            lengths.append(len(terms))
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(index)
+                postings[term][1].append(count)
+        self.lengths = np.asarray(lengths, dtype=np.float32)
+        self.average_length = float(self.lengths.mean()) if len(lengths) else 0.0
+        self.postings = {
+            term: (np.asarray(rows, dtype=np.int64), np.asarray(counts, dtype=np.float32))
+            for term, (rows, counts) in postings.items()
+        }
+        n = len(documents)
+        self.idf = {term: math.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5)) for term, (rows, _) in self.postings.items()}
+
+    def top_k(self, query, k):
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        if not len(self.ids):
+            return []
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths / (self.average_length or 1.0))
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            rows, counts = self.postings[term]
+            scores[rows] += self.idf[term] * counts * (BM25_K1 + 1) / (counts + norm[rows])
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self.ids[i] for i in top if scores[i] > 0]
+
+
+class VanillaIndex:
+    """Chunks of INPUT_DIR in a persistent Chroma collection, kept in sync incrementally, plus an in-memory BM25 index."""
+
+    def __init__(self, embedding_model, input_dir=INPUT_DIR, persist_dir=VECTORSTORE_DIR, collection_name=COLLECTION_NAME,
+                 manifest_path=VANILLA_MANIFEST_PATH):
+        import chromadb
+
+        self.embedding_model = embedding_model
+        self.input_dir = input_dir
+        self.manifest_path = manifest_path
+        self.client = chromadb.PersistentClient(path=persist_dir)
+        collection = self.client.get_or_create_collection(collection_name, metadata={"hnsw:space": "cosine", "embedding_model": embedding_model})
+        if (collection.metadata or {}).get("embedding_model") != embedding_model:
+            # Vectors from another model are not comparable; start over
+            logger.info(f"Embedding model changed, rebuilding collection {collection_name}")
+            self.client.delete_collection(collection_name)
+            collection = self.client.create_collection(collection_name, metadata={"hnsw:space": "cosine", "embedding_model": embedding_model})
+            save_manifest({}, manifest_path)
+        self.collection = collection
+        self.manifest = load_manifest(manifest_path) if collection.count() else {}
+        self.bm25 = None
+        self.documents = {}
+        self._lock = threading.Lock()
+
+    def _scan(self):
+        return build_manifest(self.input_dir, self.manifest) if os.path.isdir(self.input_dir) else {}
+
+    def fingerprint(self):
+        # From the files as they are now: the stored manifest only moves on sync, i.e. on a cache miss
+        digest = hashlib.sha1(self.embedding_model.encode("utf-8"))
+        for name, entry in sorted(self._scan().items()):
+            digest.update(f"{name}:{entry['sha256']}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def sync(self, text_embedder, token_encoder):
+        """Upsert chunks of added or changed files, drop chunks of removed ones; cheap when nothing changed."""
+        with self._lock:
+            current = self._scan()
+            delta = diff_manifest(self.manifest, current)
+            if has_changes(delta):
+                with span("vanilla_sync", files=len(delta["added"]) + len(delta["changed"])):
+                    self._apply(delta, current, text_embedder, token_encoder)
+                self.manifest = current
+                save_manifest(current, self.manifest_path)
+                self.bm25 = None
+            if self.bm25 is None:
+                stored = self.collection.get(include=["documents", "metadatas"])
+                self.documents = {
+                    chunk_id: (document, metadata)
+                    for chunk_id, document, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+                }
+                self.bm25 = BM25Index(stored["ids"], stored["documents"])
+
+    def _apply(self, delta, current, text_embedder, token_encoder):
+        for name in delta["removed"] + delta["changed"]:
+            self.collection.delete(where={"source": name})
+        for name in delta["added"] + delta["changed"]:
+            with open(os.path.join(self.input_dir, name), "r", encoding="utf-8", errors="replace") as f:
+                chunks = [chunk for chunk in chunk_tokens(f.read(), token_encoder) if chunk.strip()]
+            if not chunks:
+                continue
+            logger.info(f"Embedding {len(chunks)} chunks of {name} for vanilla search")
+            file_id = hashlib.sha1(f"{name}:{current[name]['sha256']}".encode("utf-8")).hexdigest()[:16]
+            self.collection.upsert(
+                ids=[f"{file_id}:{i}" for i in range(len(chunks))],
+                documents=chunks,
+                embeddings=text_embedder.embed_documents(chunks),
+                metadatas=[{"source": name, "chunk": i} for i in range(len(chunks))],
+            )
+
+    def retrieve(self, query, query_vector, k=VANILLA_TOP_K, candidates=VANILLA_CANDIDATES):
+        """Hybrid top-k: vector and BM25 candidate lists merged by reciprocal rank fusion."""
+        if not self.documents:
+            return []
+        vector_hits = self.collection.query(query_embeddings=[query_vector], n_results=min(candidates, len(self.documents)))["ids"][0]
+        lexical_hits = self.bm25.top_k(query, candidates)
+        scores = {}
+        for ranking in (vector_hits, lexical_hits):
+            for rank, chunk_id in enumerate(ranking):
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+        ranked = sorted(scores, key=scores.get, reverse=True)[:k]
+        return [(chunk_id, *self.documents[chunk_id]) for chunk_id in ranked if chunk_id in self.documents]
+
+
+@st.cache_resource
+def get_vanilla_index(embedding_model):
+    # One client per process: Chroma does not support several clients on one persist directory
+    return VanillaIndex(embedding_model)
+
+
+class VanillaSearch:
+    """Plain RAG: hybrid retrieval over document chunks and a single LLM call, no graph context."""
+
+    def __init__(self, llm, token_encoder, text_embedder, embedding_model, callbacks=None, max_tokens=MAX_TOKENS_LOCAL):
+        self.llm = llm
+        self.token_encoder = token_encoder
+        self.text_embedder = text_embedder
+        self.embedding_model = embedding_model
+        self.callbacks = callbacks
+        self.llm_params = {"max_tokens": max_tokens, "temperature": TEMPERATURE}
+
+    @property
+    def index(self):
+        return get_vanilla_index(self.embedding_model)
+
+    def cache_fingerprint(self):
+        return self.index.fingerprint()
+
+    def build_context(self, query):
+        with span("vanilla_context"):
+            index = self.index
+            index.sync(self.text_embedder, self.token_encoder)
+            hits = index.retrieve(query, self.text_embedder.embed(query))
+            context = "\n\n".join(f"[{n}] ({metadata['source']})\n{document}" for n, (_, document, metadata) in enumerate(hits, start=1))
+            return context, [{"id": chunk_id, "source": metadata["source"], "chunk": metadata["chunk"]} for chunk_id, _, metadata in hits]
+
+    async def asearch(self, query, conversation_history=None, **kwargs):
+        start_time = time.time()
+        # Retrieval sees only the question; the formatting instruction would skew BM25 and the embedding
+        question = query.removesuffix(SEARCH_QUERY_SUFFIX)
+        # Sync and retrieval call the embedder synchronously; keep them off the event loop
+        context_text, context_records = await asyncio.to_thread(self.build_context, question)
+        # Earlier turns go in as chat messages; retrieval still only uses the new question
+        history = [{"role": str(turn.role), "content": turn.content} for turn in conversation_history.turns] if conversation_history else []
+        messages = [
+            {"role": "system", "content": VANILLA_SYSTEM_PROMPT.format(context=context_text)},
+            *history,
+            {"role": "user", "content": query},
+        ]
+        response = await self.llm.agenerate(messages=messages, streaming=True, callbacks=self.callbacks, **self.llm_params)
+        query_context = get_query_context()
+        if query_context is not None:
+            query_context.stats["chunks_retrieved"] = len(context_records)
+        return SearchResult(
+            response=response,
+            context_data={"chunks": context_records},
+            context_text=context_text,
+            completion_time=time.time() - start_time,
+            llm_calls=1,
+            prompt_tokens=sum(len(self.token_encoder.encode(message["content"])) for message in messages),
+        )
@@ -0,0 +1 @@
+from .query_history import QueryHistoryStore, get_query_history
@@ -0,0 +1,247 @@
+import atexit
+import csv
+import hashlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import streamlit as st
+
+from ..config.config import HISTORY_DB_PATH, HISTORY_BATCH_SIZE, HISTORY_FLUSH_INTERVAL_SECONDS, LEGACY_RESULTS_CSV
+
+logger = logging.getLogger(__name__)
+
+HISTORY_COLUMNS = (
+    "timestamp",
+    "query",
+    "query_hash",
+    "mode",
+    "config_hash",
+    "response",
+    "tokens",
+    "llm_calls",
+    "latency",
+    "artifacts_run",
+    "requested_mode",
+    "route_reason",
+    "estimated_tokens",
+    "estimated_llm_calls",
+)
+
+# Columns added after the first release; existing databases get them on open
+ADDED_COLUMNS = (
+    ("requested_mode", "TEXT"),
+    ("route_reason", "TEXT"),
+    ("estimated_tokens", "INTEGER"),
+    ("estimated_llm_calls", "INTEGER"),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS query_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    query TEXT NOT NULL,
+    query_hash TEXT NOT NULL,
+    mode TEXT,
+    config_hash TEXT,
+    response TEXT,
+    tokens INTEGER,
+    llm_calls INTEGER,
+    latency REAL,
+    artifacts_run TEXT,
+    requested_mode TEXT,
+    route_reason TEXT,
+    estimated_tokens INTEGER,
+    estimated_llm_calls INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_query_history_timestamp ON query_history (timestamp);
+CREATE INDEX IF NOT EXISTS idx_query_history_query_hash ON query_history (query_hash);
+CREATE TABLE IF NOT EXISTS history_imports (
+    path TEXT PRIMARY KEY,
+    imported_at TEXT,
+    rows INTEGER
+);
+"""
+
+
+def hash_query(query):
+    return hashlib.sha1(" ".join(query.lower().split()).encode("utf-8")).hexdigest()
+
+
+def hash_config(config):
+    # The API key never goes into the history, not even hashed
+    safe_config = {name: value for name, value in config.items() if name != "api_key"}
+    return hashlib.sha1(json.dumps(safe_config, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def artifacts_run(artifacts_dir):
+    # <output>/<run timestamp>/artifacts -> <run timestamp>
+    return os.path.basename(os.path.dirname(os.path.normpath(artifacts_dir))) if artifacts_dir else None
+
+
+def build_history_row(query, mode, config, result):
+    return {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "query": query,
+        "query_hash": hash_query(query),
+        "mode": mode,
+        "config_hash": hash_config(config),
+        "response": result.get("Response", ""),
+        "tokens": result.get("Tokens", 0),
+        "llm_calls": result.get("LLM Calls", 0),
+        "latency": result.get("Latency"),
+        "artifacts_run": artifacts_run(config.get("artifacts_dir")),
+        "requested_mode": result.get("Requested Mode"),
+        "route_reason": result.get("Route Reason"),
+        "estimated_tokens": result.get("Estimated Tokens"),
+        "estimated_llm_calls": result.get("Estimated LLM Calls"),
+    }
+
+
+class QueryHistoryStore:
+    """SQLite query history; rows are queued and inserted in batches by a background writer thread."""
+
+    def __init__(self, db_path=HISTORY_DB_PATH, batch_size=HISTORY_BATCH_SIZE, flush_interval=HISTORY_FLUSH_INTERVAL_SECONDS):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+            existing = {row[1] for row in db.execute("PRAGMA table_info(query_history)")}
+            for column, column_type in ADDED_COLUMNS:
+                if column not in existing:
+                    db.execute(f"ALTER TABLE query_history ADD COLUMN {column} {column_type}")
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="query-history-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def record(self, query, mode, config, result):
+        """Queue a finished query; never blocks on disk."""
+        self._queue.put(build_history_row(query, mode, config, result))
+
+    def flush(self):
+        """Block until every queued row has been written."""
+        self._queue.join()
+
+    def _write_loop(self):
+        db = self._connect()
+        while True:
+            rows = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(rows) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    rows.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                with db:
+                    self._insert(db, rows)
+            except Exception as e:
+                logger.error(f"Failed to write {len(rows)} query history rows: {str(e)}", exc_info=True)
+            finally:
+                for _ in rows:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _insert(db, rows):
+        db.executemany(
+            f"INSERT INTO query_history ({', '.join(HISTORY_COLUMNS)}) VALUES ({', '.join('?' for _ in HISTORY_COLUMNS)})",
+            [tuple(row.get(column) for column in HISTORY_COLUMNS) for row in rows],
+        )
+
+    def _filters(self, mode=None, search=None):
+        clauses, params = [], []
+        if mode:
+            clauses.append("mode = ?")
+            params.append(mode)
+        if search:
+            clauses.append("query LIKE ?")
+            params.append(f"%{search}%")
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def count(self, mode=None, search=None):
+        where, params = self._filters(mode, search)
+        with self._connect() as db:
+            return db.execute(f"SELECT COUNT(*) FROM query_history{where}", params).fetchone()[0]
+
+    def page(self, page=0, page_size=20, mode=None, search=None):
+        """Newest-first page of history rows as dicts."""
+        where, params = self._filters(mode, search)
+        with self._connect() as db:
+            db.row_factory = sqlite3.Row
+            rows = db.execute(
+                f"SELECT id, {', '.join(HISTORY_COLUMNS)} FROM query_history{where} "
+                "ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+                params + [page_size, page * page_size],
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def find(self, query):
+        """Every past run of a query (case and whitespace insensitive), newest first."""
+        with self._connect() as db:
+            db.row_factory = sqlite3.Row
+            rows = db.execute(
+                f"SELECT id, {', '.join(HISTORY_COLUMNS)} FROM query_history WHERE query_hash = ? ORDER BY timestamp DESC",
+                (hash_query(query),),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def import_csv(self, csv_path):
+        """One-time import of a legacy save_results_to_csv file; returns the number of rows imported."""
+        csv_path = os.path.abspath(csv_path)
+        if not os.path.exists(csv_path):
+            return 0
+        with self._connect() as db:
+            if db.execute("SELECT 1 FROM history_imports WHERE path = ?", (csv_path,)).fetchone():
+                return 0
+        rows = []
+        with open(csv_path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)  # Header
+            for record in reader:
+                if len(record) < 5:
+                    continue
+                timestamp, query, response, tokens, llm_calls = record[:5]
+                rows.append({
+                    "timestamp": timestamp,
+                    "query": query,
+                    "query_hash": hash_query(query),
+                    # The old file only named the mode of its first row in the header
+                    "mode": None,
+                    "response": response,
+                    "tokens": int(tokens) if tokens.isdigit() else None,
+                    "llm_calls": int(llm_calls) if llm_calls.isdigit() else None,
+                })
+        with self._connect() as db:
+            self._insert(db, rows)
+            db.execute(
+                "INSERT INTO history_imports (path, imported_at, rows) VALUES (?, ?, ?)",
+                (csv_path, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), len(rows)),
+            )
+        logger.info(f"Imported {len(rows)} rows from {csv_path} into the query history")
+        return len(rows)
+
+
+@st.cache_resource
+def get_query_history():
+    store = QueryHistoryStore()
+    try:
+        store.import_csv(LEGACY_RESULTS_CSV)
+    except Exception as e:
+        logger.error(f"Failed to import {LEGACY_RESULTS_CSV}: {str(e)}", exc_info=True)
+    return store
@@ -1,10 +1,16 @@
 import os
 import subprocess
+import time
 import streamlit as st
 import logging
 
-from ..utils.utils import get_latest_artifacts_dir
-from ..config.config import BASE_DIR, INPUT_DIR, OUTPUT_DIR
+from ..utils.utils import get_latest_artifacts_dir, get_artifacts_fingerprint, initialize_project
+from ..cache import get_response_cache
+from ..engines.active_index import get_active_index
+from ..config.config import BASE_DIR, INPUT_DIR, PROMPTS_DIR, RAW_INPUT_DIR, OUTPUT_DIR, INDEX_MANIFEST_PATH
+from .manifest import build_manifest, load_manifest, save_manifest, diff_manifest, has_changes
+from .ingestion import SUPPORTED_EXTENSIONS, ingest_inputs, save_upload, source_name
+from .runs import IncompleteRunError, find_new_run, pin_current_run, publish_run
 
 logger = logging.getLogger(__name__)
 
@@ -15,11 +21,67 @@ def check_indexing_status():
         return False
     return True
 
+def run_ingestion():
+    progress = st.progress(0.0)
+    status = st.empty()
+
+    def on_progress(done, total, name, state):
+        progress.progress(done / total)
+        status.caption(f"{name}: {state} ({done}/{total})")
+
+    results = ingest_inputs(on_progress=on_progress)
+    progress.empty()
+    status.empty()
+    for name, error in results["failed"].items():
+        st.error(f"Could not extract text from {name}: {error}")
+    return results
+
+def add_uploaded_file(uploaded_file):
+    # The uploader returns the same file on every rerun; it is saved and ingested once per upload
+    ingested = st.session_state.setdefault("ingested_uploads", {})
+    if uploaded_file.file_id in ingested:
+        return ingested[uploaded_file.file_id]
+    logger.info(f"File uploaded: {uploaded_file.name}")
+    save_upload(uploaded_file)
+    results = run_ingestion()
+    ingested[uploaded_file.file_id] = uploaded_file.name not in results["failed"]
+    return ingested[uploaded_file.file_id]
+
 def perform_indexing():
     logger.info("Starting indexing process")
-    st.info("Updating RAY's knowledge base...")
+    run_ingestion()
+    previous_manifest = load_manifest(INDEX_MANIFEST_PATH)
+    current_manifest = build_manifest(INPUT_DIR, previous_manifest)
+    delta = diff_manifest(previous_manifest, current_manifest)
+    processed = len(delta["added"]) + len(delta["changed"])
+    skipped = len(delta["unchanged"])
+    logger.info(f"Input delta: {processed} added/changed, {len(delta['removed'])} removed, {skipped} unchanged")
+
+    if check_indexing_status() and not has_changes(delta):
+        st.info(f"RAY's knowledge base is already up to date with its {skipped} documents; indexing skipped.")
+        return
+
+    # Any change re-indexes every document; only a run with unchanged inputs is skipped
+    st.info(f"Updating RAY's knowledge base: {processed} documents added or changed, {len(delta['removed'])} removed, {skipped} unchanged...")
+    initialize_project(PROMPTS_DIR, BASE_DIR)
+    pin_current_run(OUTPUT_DIR)
+    started = time.time()
     subprocess.run(["python", "-m", "graphrag.index", "--root", BASE_DIR], check=True)
+    run = find_new_run(OUTPUT_DIR, started)
+    if run is None:
+        st.error("Indexing finished but produced no new index run; RAY keeps serving the current one.")
+        return
+    # Only a verified run is published; sessions swap to it after a background warm-up
+    try:
+        artifacts_dir = publish_run(OUTPUT_DIR, run)
+    except IncompleteRunError as e:
+        logger.error(str(e))
+        st.error(f"{str(e)}. RAY keeps serving the current index.")
+        return
+    save_manifest(current_manifest, INDEX_MANIFEST_PATH)
     logger.info("Indexing completed successfully")
+    get_response_cache().invalidate(get_artifacts_fingerprint(artifacts_dir))
+    get_active_index().refresh()
     st.success("RAY's knowledge base has been successfully updated!")
     st.experimental_rerun()
 
@@ -31,6 +93,9 @@ def manage_input_files():
             selected_file = st.selectbox("Select File from RAY's Knowledge Base", [""] + input_files, key="input_file_select")
             if st.button("Remove File from RAY's Knowledge", key="delete_file_button"):
                 os.remove(os.path.join(INPUT_DIR, selected_file))
+                raw_path = os.path.join(RAW_INPUT_DIR, source_name(selected_file))
+                if os.path.exists(raw_path):
+                    os.remove(raw_path)
                 st.success(f"Removed {selected_file} from RAY's knowledge base")
                 st.warning("File removed. Please update RAY's knowledge base.")
                 if st.button("Update RAY's Knowledge Base", key="reindex_button"):
@@ -39,10 +104,8 @@ def manage_input_files():
             st.info("RAY's knowledge base is empty. Please add files.")
     
     with col2:
-        uploaded_file = st.file_uploader("Add New File to RAY's Knowledge Base", type=["txt"], key="file_uploader")
-        if uploaded_file is not None:
-            with open(os.path.join(INPUT_DIR, uploaded_file.name), "wb") as f:
-                f.write(uploaded_file.getbuffer())
+        uploaded_file = st.file_uploader("Add New File to RAY's Knowledge Base", type=list(SUPPORTED_EXTENSIONS), key="file_uploader")
+        if uploaded_file is not None and add_uploaded_file(uploaded_file):
             st.success(f"Added {uploaded_file.name} to RAY's knowledge base.")
             st.warning("New information added. Please update RAY's knowledge base.")
             if st.button("Update RAY's Knowledge Base", key="reindex_button_new_file"):
@@ -0,0 +1,190 @@
+import csv
+import logging
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from ..config.config import (
+    INPUT_DIR,
+    RAW_INPUT_DIR,
+    RETRIEVER_TYPES,
+    EXTRACTION_CACHE_DIR,
+    INGEST_MANIFEST_PATH,
+    INGEST_WORKERS,
+    UPLOAD_CHUNK_BYTES,
+)
+from .manifest import build_manifest, load_manifest, save_manifest, diff_manifest
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = tuple(pattern.rsplit(".", 1)[-1].lower() for pattern in RETRIEVER_TYPES)
+
+
+def file_extension(name):
+    return name.rsplit(".", 1)[-1].lower() if "." in name else ""
+
+
+def derived_input_name(name):
+    # graphrag only indexes .txt files; report.pdf becomes report.pdf.txt
+    return name if file_extension(name) == "txt" else f"{name}.txt"
+
+
+def source_name(input_name):
+    """Inverse of derived_input_name; the raw file may no longer exist."""
+    if input_name.endswith(".txt") and file_extension(input_name[:-4]) in SUPPORTED_EXTENSIONS:
+        return input_name[:-4]
+    return input_name
+
+
+def save_upload(uploaded_file, raw_dir=RAW_INPUT_DIR, chunk_size=UPLOAD_CHUNK_BYTES):
+    """Copy an upload to disk in chunks rather than materializing a second in-memory buffer."""
+    os.makedirs(raw_dir, exist_ok=True)
+    path = os.path.join(raw_dir, os.path.basename(uploaded_file.name))
+    tmp_path = f"{path}.part"
+    uploaded_file.seek(0)
+    with open(tmp_path, "wb") as f:
+        shutil.copyfileobj(uploaded_file, f, chunk_size)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _iter_pdf(path):
+    from pypdf import PdfReader
+
+    # Pages are parsed on access, so only one page's content is in memory at a time
+    reader = PdfReader(path)
+    for page in reader.pages:
+        yield page.extract_text() or ""
+
+
+def _iter_pptx(path):
+    from pptx import Presentation
+
+    for number, slide in enumerate(Presentation(path).slides, start=1):
+        texts = [shape.text_frame.text for shape in slide.shapes if shape.has_text_frame and shape.text_frame.text]
+        yield f"Slide {number}\n" + "\n".join(texts)
+
+
+def _iter_docx(path):
+    from docx import Document
+
+    for paragraph in Document(path).paragraphs:
+        if paragraph.text:
+            yield paragraph.text
+
+
+def _iter_csv(path):
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield "; ".join(f"{key}: {value}" for key, value in row.items() if value)
+
+
+def _iter_txt(path, chunk_size=UPLOAD_CHUNK_BYTES):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for chunk in iter(lambda: f.read(chunk_size), ""):
+            yield chunk
+
+
+EXTRACTORS = {
+    "pdf": (_iter_pdf, "\n\n"),
+    "pptx": (_iter_pptx, "\n\n"),
+    "docx": (_iter_docx, "\n"),
+    "csv": (_iter_csv, "\n"),
+    "txt": (_iter_txt, ""),
+}
+
+
+def extract_document(source_path, cache_path):
+    """Process-pool worker: stream one document's text into cache_path; returns the number of parts written."""
+    iter_parts, separator = EXTRACTORS[file_extension(source_path)]
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    parts = 0
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        for part in iter_parts(source_path):
+            if parts:
+                out.write(separator)
+            out.write(part)
+            parts += 1
+    os.replace(tmp_path, cache_path)
+    return parts
+
+
+def cached_text_path(sha256, cache_dir=EXTRACTION_CACHE_DIR):
+    return os.path.join(cache_dir, f"{sha256}.txt")
+
+
+def ingest_inputs(raw_dir=RAW_INPUT_DIR, input_dir=INPUT_DIR, cache_dir=EXTRACTION_CACHE_DIR, manifest_path=INGEST_MANIFEST_PATH,
+                  max_workers=INGEST_WORKERS, on_progress=None):
+    """Bring input_dir in line with raw_dir: extract new or changed documents, drop text of removed ones.
+
+    Extracted text is cached by content hash, so a document is only ever parsed once.
+    on_progress(done, total, name, status) is called once per document.
+    """
+    os.makedirs(raw_dir, exist_ok=True)
+    os.makedirs(input_dir, exist_ok=True)
+    os.makedirs(cache_dir, exist_ok=True)
+    previous = load_manifest(manifest_path)
+    current = {
+        name: entry for name, entry in build_manifest(raw_dir, previous).items()
+        if file_extension(name) in SUPPORTED_EXTENSIONS
+    }
+    delta = diff_manifest(previous, current)
+
+    for name in delta["removed"]:
+        target = os.path.join(input_dir, derived_input_name(name))
+        if os.path.exists(target):
+            os.remove(target)
+
+    pending = [
+        name for name in current
+        if name in delta["added"] or name in delta["changed"]
+        or not os.path.exists(os.path.join(input_dir, derived_input_name(name)))
+    ]
+    to_extract = [name for name in pending if not os.path.exists(cached_text_path(current[name]["sha256"], cache_dir))]
+    results = {"extracted": [], "from_cache": [], "failed": {}, "removed": delta["removed"]}
+    done = 0
+
+    def publish(name, status):
+        nonlocal done
+        shutil.copyfile(cached_text_path(current[name]["sha256"], cache_dir), os.path.join(input_dir, derived_input_name(name)))
+        results[status].append(name)
+        done += 1
+        if on_progress:
+            on_progress(done, len(pending), name, status)
+
+    for name in pending:
+        if name not in to_extract:
+            publish(name, "from_cache")
+
+    if to_extract:
+        # One document per task. Spawned rather than forked: the app process runs limiter, exporter and
+        # writer threads whose locks a forked child could inherit mid-acquire
+        spawn = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max(1, min(max_workers, len(to_extract))), mp_context=spawn) as pool:
+            futures = {
+                pool.submit(extract_document, os.path.join(raw_dir, name), cached_text_path(current[name]["sha256"], cache_dir)): name
+                for name in to_extract
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"Failed to extract text from {name}: {str(e)}", exc_info=True)
+                    results["failed"][name] = str(e)
+                    # Leave it out of the manifest so the next run retries it
+                    current.pop(name)
+                    done += 1
+                    if on_progress:
+                        on_progress(done, len(pending), name, "failed")
+                    continue
+                publish(name, "extracted")
+
+    save_manifest(current, manifest_path)
+    logger.info(
+        f"Ingestion: {len(results['extracted'])} extracted, {len(results['from_cache'])} from cache, "
+        f"{len(results['failed'])} failed, {len(results['removed'])} removed"
+    )
+    return results
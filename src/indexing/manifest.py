@@ -0,0 +1,66 @@
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def hash_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_manifest(input_dir, previous=None):
+    previous = previous or {}
+    manifest = {}
+    for entry in os.scandir(input_dir):
+        if not entry.is_file():
+            continue
+        stat = entry.stat()
+        known = previous.get(entry.name)
+        # Skip re-hashing files whose size and mtime are unchanged since the last run
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            manifest[entry.name] = known
+            continue
+        manifest[entry.name] = {
+            "sha256": hash_file(entry.path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+    return manifest
+
+
+def load_manifest(manifest_path):
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, manifest_path):
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def diff_manifest(previous, current):
+    delta = {"added": [], "changed": [], "removed": [], "unchanged": []}
+    for name, entry in current.items():
+        if name not in previous:
+            delta["added"].append(name)
+        elif previous[name]["sha256"] != entry["sha256"]:
+            delta["changed"].append(name)
+        else:
+            delta["unchanged"].append(name)
+    delta["removed"] = [name for name in previous if name not in current]
+    return delta
+
+
+def has_changes(delta):
+    return bool(delta["added"] or delta["changed"] or delta["removed"])
@@ -0,0 +1,165 @@
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: runs other processes still read are only protected while they are CURRENT
+    fcntl = None
+
+from ..utils.utils import PUBLISHED_MARKER, CURRENT_RUN_FILE, read_current_run
+
+logger = logging.getLogger(__name__)
+
+# Shared-locked by every process that may read the run, so another process never deletes it under them
+READERS_LOCK_FILENAME = ".readers.lock"
+
+
+class IncompleteRunError(Exception):
+    pass
+
+
+def list_runs(output_dir):
+    """Run directory names under output_dir, oldest first."""
+    if not os.path.isdir(output_dir):
+        return []
+    runs = [entry for entry in os.scandir(output_dir) if entry.is_dir() and os.path.isdir(os.path.join(entry.path, "artifacts"))]
+    return [entry.name for entry in sorted(runs, key=lambda entry: entry.stat().st_ctime)]
+
+
+def is_published(output_dir, run):
+    return os.path.exists(os.path.join(output_dir, run, "artifacts", PUBLISHED_MARKER))
+
+
+def verify_run(artifacts_dir):
+    """Problems that make a run unsafe to serve; empty when every table and vector store is complete."""
+    # Only publishing verifies runs, so the app starts without pyarrow and the graphrag models
+    import pyarrow.parquet as pq
+
+    from ..data.snapshot import TABLE_NAMES
+
+    problems = []
+    for filename in TABLE_NAMES.values():
+        path = os.path.join(artifacts_dir, f"{filename}.parquet")
+        if not os.path.exists(path):
+            problems.append(f"{filename}.parquet is missing")
+            continue
+        try:
+            # The footer is written last, so a truncated file fails here
+            pq.read_metadata(path)
+        except Exception as e:
+            problems.append(f"{filename}.parquet is unreadable: {str(e)}")
+    lancedb_uri = os.path.join(artifacts_dir, "lancedb")
+    if os.path.isdir(lancedb_uri):
+        try:
+            import lancedb
+
+            db = lancedb.connect(lancedb_uri)
+            for table_name in db.table_names():
+                db.open_table(table_name).count_rows()
+        except Exception as e:
+            problems.append(f"LanceDB store is unreadable: {str(e)}")
+    return problems
+
+
+def _write_atomic(path, payload):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def publish_run(output_dir, run):
+    """Mark a finished run complete and point CURRENT at it; readers never see a partial run."""
+    artifacts_dir = os.path.join(output_dir, run, "artifacts")
+    problems = verify_run(artifacts_dir)
+    if problems:
+        raise IncompleteRunError(f"Index run {run} is incomplete: {'; '.join(problems)}")
+    published_at = datetime.now().isoformat(timespec="seconds")
+    files = {
+        entry.name: entry.stat().st_size
+        for entry in os.scandir(artifacts_dir)
+        if entry.is_file() and entry.name.endswith(".parquet")
+    }
+    _write_atomic(os.path.join(artifacts_dir, PUBLISHED_MARKER), {"run": run, "published_at": published_at, "files": files})
+    _write_atomic(os.path.join(output_dir, CURRENT_RUN_FILE), {"run": run, "published_at": published_at})
+    logger.info(f"Published index run {run}")
+    return artifacts_dir
+
+
+def find_new_run(output_dir, since):
+    """The newest unpublished run created at or after `since` (a time.time() value)."""
+    for run in reversed(list_runs(output_dir)):
+        if is_published(output_dir, run):
+            continue
+        if os.stat(os.path.join(output_dir, run)).st_ctime >= since:
+            return run
+    return None
+
+
+def pin_current_run(output_dir):
+    """Publish the run being served before indexing starts, so a half-written run is never picked up.
+
+    Only matters for indexes built before runs were published; afterwards CURRENT always exists.
+    """
+    if read_current_run(output_dir):
+        return
+    runs = [run for run in list_runs(output_dir) if not verify_run(os.path.join(output_dir, run, "artifacts"))]
+    if runs:
+        publish_run(output_dir, runs[-1])
+
+
+def hold_run(artifacts_dir):
+    """Take a shared lock on a run for as long as this process may read it; release it with `release_run`."""
+    if fcntl is None or not artifacts_dir or not os.path.isdir(artifacts_dir):
+        return None
+    handle = open(os.path.join(artifacts_dir, READERS_LOCK_FILENAME), "a")
+    fcntl.flock(handle, fcntl.LOCK_SH)
+    return handle
+
+
+def release_run(handle):
+    if handle is not None:
+        # Closing the file drops its lock
+        handle.close()
+
+
+def _lock_unread(artifacts_dir):
+    """An exclusive lock on a run no process holds, False if one does, None where locks are unsupported."""
+    if fcntl is None or not os.path.isdir(artifacts_dir):
+        return None
+    handle = open(os.path.join(artifacts_dir, READERS_LOCK_FILENAME), "a")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    return handle
+
+
+def prune_runs(output_dir, keep, in_use=()):
+    """Delete published runs beyond the newest `keep`, except the current run and runs any process still reads."""
+    current = read_current_run(output_dir)
+    in_use = {os.path.normpath(path) for path in in_use}
+    published = [run for run in list_runs(output_dir) if is_published(output_dir, run)]
+    removed = []
+    for run in published[:max(len(published) - keep, 0)]:
+        artifacts_dir = os.path.join(output_dir, run, "artifacts")
+        if run == current or os.path.normpath(artifacts_dir) in in_use:
+            continue
+        handle = _lock_unread(artifacts_dir)
+        if handle is False:
+            logger.info(f"Keeping index run {run}, another process still reads it")
+            continue
+        try:
+            shutil.rmtree(os.path.join(output_dir, run), ignore_errors=True)
+        finally:
+            release_run(handle)
+        removed.append(run)
+    if removed:
+        logger.info(f"Removed retired index runs: {', '.join(removed)}")
+    return removed
@@ -0,0 +1,3 @@
+from .tracing import span, get_metrics_registry, MetricsRegistry
+from .exporter import render_prometheus, write_prometheus_file, start_metrics_exporter
+from .memory import process_memory
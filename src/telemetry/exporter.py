@@ -0,0 +1,180 @@
+import atexit
+import glob
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import streamlit as st
+
+from .memory import process_memory
+from .tracing import DURATION_BUCKETS, get_metrics_registry
+from ..config.config import METRICS_EXPORT_PATH, METRICS_EXPORT_INTERVAL_SECONDS, METRICS_PORT
+
+logger = logging.getLogger(__name__)
+
+
+def render_prometheus(registry=None, pid=None):
+    """Render span histograms and registered gauges in the Prometheus text exposition format.
+
+    Every series carries a `pid` label, so the files of several app workers can be collected together.
+    """
+    registry = registry or get_metrics_registry()
+    pid = pid or os.getpid()
+
+    def _labels(**labels):
+        return "{" + ",".join(f'{name}="{value}"' for name, value in {**labels, "pid": pid}.items()) + "}"
+
+    lines = [
+        "# HELP ray_span_duration_seconds Duration of RAY pipeline stages.",
+        "# TYPE ray_span_duration_seconds histogram",
+    ]
+    snapshot = registry.snapshot()
+    for (name, mode), data in sorted(snapshot.items()):
+        cumulative = 0
+        for bound, count in zip(DURATION_BUCKETS, data["buckets"]):
+            cumulative += count
+            lines.append(f"ray_span_duration_seconds_bucket{_labels(span=name, mode=mode, le=bound)} {cumulative}")
+        lines.append(f"ray_span_duration_seconds_bucket{_labels(span=name, mode=mode, le='+Inf')} {data['count']}")
+        lines.append(f"ray_span_duration_seconds_sum{_labels(span=name, mode=mode)} {data['sum']}")
+        lines.append(f"ray_span_duration_seconds_count{_labels(span=name, mode=mode)} {data['count']}")
+    lines += [
+        "# HELP ray_span_duration_quantile_seconds Recent-window quantiles of stage durations.",
+        "# TYPE ray_span_duration_quantile_seconds gauge",
+    ]
+    for (name, mode), data in sorted(snapshot.items()):
+        for quantile, value in data["quantiles"].items():
+            if value is not None:
+                lines.append(f"ray_span_duration_quantile_seconds{_labels(span=name, mode=mode, quantile=quantile)} {value}")
+    lines += [
+        "# HELP ray_span_tokens_total Tokens attributed to RAY pipeline stages.",
+        "# TYPE ray_span_tokens_total counter",
+    ]
+    for (name, mode), data in sorted(snapshot.items()):
+        lines.append(f"ray_span_tokens_total{_labels(span=name, mode=mode)} {data['tokens']}")
+    for gauge_name, read_stats in sorted(registry.gauges.items()):
+        try:
+            stats = read_stats()
+        except Exception as e:
+            logger.warning(f"Could not read {gauge_name} metrics: {str(e)}")
+            continue
+        for key, value in sorted(stats.items()):
+            if isinstance(value, (int, float)):
+                lines.append(f"# TYPE ray_{gauge_name}_{key} gauge")
+                lines.append(f"ray_{gauge_name}_{key}{_labels()} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def worker_metrics_path(path, pid=None):
+    """`metrics.prom` becomes `metrics.<pid>.prom`: one file per app worker, none overwriting another's."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{pid or os.getpid()}{ext}"
+
+
+def write_prometheus_file(path=METRICS_EXPORT_PATH):
+    """Write this process's metrics for a node_exporter textfile collector, to its own per-pid file.
+
+    Atomic so scrapes never see half a file; the temporary file is per pid too.
+    """
+    path = worker_metrics_path(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+    return path
+
+
+def merge_prometheus(texts):
+    """Join several workers' expositions: one HELP/TYPE header and one group of samples per metric family."""
+    families = {}
+    for text in texts:
+        family = None
+        for line in text.splitlines():
+            if line.startswith("# "):
+                _, kind, name = line.split(" ", 3)[:3]
+                family = families.setdefault(name, {"header": {}, "samples": []})
+                family["header"].setdefault(kind, line)
+            elif line and family is not None:
+                family["samples"].append(line)
+    lines = []
+    for family in families.values():
+        lines += list(family["header"].values()) + family["samples"]
+    return "\n".join(lines) + "\n"
+
+
+def render_all_workers(path):
+    """This worker's live metrics plus the last textfile of every other worker."""
+    root, ext = os.path.splitext(path)
+    own_path = worker_metrics_path(path)
+    texts = [render_prometheus()]
+    for worker_path in sorted(glob.glob(f"{glob.escape(root)}.*{ext}")):
+        if worker_path == own_path:
+            continue
+        try:
+            with open(worker_path, "r", encoding="utf-8") as f:
+                texts.append(f.read())
+        except OSError:
+            # The worker stopped and removed its file meanwhile
+            continue
+    return merge_prometheus(texts)
+
+
+def _remove_metrics_file(path):
+    # A stopped worker's last values would otherwise be collected forever
+    try:
+        os.remove(worker_metrics_path(path))
+    except OSError:
+        pass
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        # The one worker holding the port answers for all of them, from their textfiles
+        path = self.server.metrics_path
+        body = (render_all_workers(path) if path else render_prometheus()).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _export_loop(path, interval):
+    while True:
+        try:
+            write_prometheus_file(path)
+        except Exception as e:
+            logger.warning(f"Failed to write metrics to {path}: {str(e)}")
+        time.sleep(interval)
+
+
+@st.cache_resource
+def start_metrics_exporter(path=METRICS_EXPORT_PATH, interval=METRICS_EXPORT_INTERVAL_SECONDS, port=METRICS_PORT):
+    """Start the textfile exporter and, if a port is configured, a /metrics endpoint; once per process.
+
+    With several app workers, every worker writes its own textfile and the first one to bind the
+    port serves them all there.
+    """
+    # Each app worker reports its own resident memory, labelled by pid like every other series
+    get_metrics_registry().register_gauges("process", process_memory)
+    if path:
+        threading.Thread(target=_export_loop, args=(path, interval), name="metrics-exporter", daemon=True).start()
+        atexit.register(_remove_metrics_file, path)
+    if port:
+        try:
+            server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+        except OSError as e:
+            logger.warning(f"Not serving Prometheus metrics on port {port}, another worker likely does: {str(e)}")
+        else:
+            server.metrics_path = path
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+            logger.info(f"Serving Prometheus metrics on port {port}")
+    return True
@@ -0,0 +1,34 @@
+import os
+import sys
+
+SMAPS_FIELDS = {"Rss": "rss_bytes", "Pss": "pss_bytes", "Shared_Clean": "shared_clean_bytes", "Private_Clean": "private_clean_bytes", "Private_Dirty": "private_dirty_bytes"}
+
+
+def _read_smaps_rollup(path):
+    stats = {}
+    with open(path, "r", encoding="ascii") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in SMAPS_FIELDS:
+                stats[SMAPS_FIELDS[name]] = int(value.split()[0]) * 1024
+    return stats
+
+
+def process_memory(pid="self"):
+    """Resident memory of a process, split into what it shares with other workers and what it holds alone.
+
+    Pages mapped from snapshot files count as shared (clean) memory; the Python objects a worker
+    builds are private. Linux reports both, other Unix platforms only peak resident memory, Windows nothing.
+    """
+    path = f"/proc/{pid}/smaps_rollup"
+    if os.path.exists(path):
+        stats = _read_smaps_rollup(path)
+        stats["private_bytes"] = stats.pop("private_clean_bytes", 0) + stats.pop("private_dirty_bytes", 0)
+        return stats
+    try:
+        import resource
+    except ImportError:  # Windows
+        return {}
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return {"peak_rss_bytes": max_rss if sys.platform == "darwin" else max_rss * 1024}
@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+from ..config.config import TRACING_ENABLED
+
+# Prometheus histogram buckets in seconds, spanning cache lookups to long map fan-outs
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Recent durations kept per series for exact p50/p95/p99
+RESERVOIR_SIZE = 1024
+
+_NO_SPAN = nullcontext()
+
+
+class Histogram:
+    def __init__(self):
+        self.bucket_counts = [0] * len(DURATION_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.tokens = 0
+        self.recent = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, duration, tokens):
+        for index, bound in enumerate(DURATION_BUCKETS):
+            if duration <= bound:
+                self.bucket_counts[index] += 1
+                break
+        self.count += 1
+        self.sum += duration
+        self.tokens += tokens
+        self.recent.append(duration)
+
+    def quantiles(self, qs=(0.5, 0.95, 0.99)):
+        ordered = sorted(self.recent)
+        if not ordered:
+            return {q: None for q in qs}
+        return {q: ordered[min(int(q * len(ordered)), len(ordered) - 1)] for q in qs}
+
+
+class MetricsRegistry:
+    """Process-wide span histograms keyed by (span name, mode), plus gauges read at export time."""
+
+    def __init__(self):
+        self.histograms = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, mode, duration, tokens=0):
+        with self._lock:
+            histogram = self.histograms.get((name, mode))
+            if histogram is None:
+                histogram = self.histograms[(name, mode)] = Histogram()
+            histogram.observe(duration, tokens)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+
+    def register_gauges(self, name, read_stats):
+        """read_stats() returns a dict of numbers, exported as <name>_<key> gauges."""
+        self.gauges[name] = read_stats
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                key: {
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "tokens": histogram.tokens,
+                    "buckets": list(histogram.bucket_counts),
+                    "quantiles": histogram.quantiles(),
+                }
+                for key, histogram in self.histograms.items()
+            }
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry():
+    return _registry
+
+
+class Span:
+    __slots__ = ("name", "attributes", "tokens", "started_at", "duration")
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.tokens = attributes.pop("tokens", 0) or 0
+        self.started_at = time.perf_counter()
+        self.duration = None
+
+    def add_tokens(self, tokens):
+        self.tokens += tokens or 0
+
+
+@contextmanager
+def _record_span(name, attributes):
+    # Imported lazily: the engines package imports telemetry while it initializes
+    from ..engines.query_context import get_query_context
+
+    current = Span(name, attributes)
+    try:
+        yield current
+    finally:
+        current.duration = time.perf_counter() - current.started_at
+        query_context = get_query_context()
+        mode = getattr(query_context, "mode", None) or "none"
+        _registry.observe(name, mode, current.duration, current.tokens)
+        if query_context is not None:
+            query_context.spans.append({
+                "name": name,
+                "query_id": query_context.query_id,
+                "mode": mode,
+                "start": round(current.started_at - query_context.started_at, 4),
+                "duration": round(current.duration, 4),
+                "tokens": current.tokens,
+                **current.attributes,
+            })
+
+
+def span(name, **attributes):
+    """Time a block as a named span; yields the Span (or None when tracing is off) so callers can add tokens."""
+    if not TRACING_ENABLED:
+        return _NO_SPAN
+    return _record_span(name, attributes)
@@ -1,6 +1,11 @@
+import time
 import streamlit as st
 from ..indexing.indexing import manage_input_files
-from ..config.config import ARTIFACTS_DIR, API_KEY
+from ..config.config import API_KEY, DEFAULT_SEARCH_CONFIG, HISTORY_PAGE_SIZE
+from ..cache import get_response_cache
+from ..engines import get_engine_registry, get_active_index
+from ..history import get_query_history
+from ..telemetry import process_memory
 
 def setup_page_config():
     st.set_page_config(
@@ -116,34 +121,168 @@ def setup_sidebar():
     with tabs[0]:  # Input tab
         mode = st.selectbox(
             "Select Search Mode",
-            ["vanilla", "global", "local" ],
-            help="Global: Broad knowledge. Local: Specific context. Vanilla: Basic RAG."
+            ["auto", "vanilla", "global", "local" ],
+            help="Auto: Cheapest mode likely to answer. Global: Broad knowledge. Local: Specific context. Vanilla: Basic RAG."
         )
         st.subheader("Manage RAY's Knowledge")
         manage_input_files()
     
     with tabs[1]:  # Model tab
         config = {}
-        config["openai_model"] = st.selectbox("Select RAY's Language Model", ["gpt-4o", "gpt-4o-mini"], index=1)
+        models = ["gpt-4o", "gpt-4o-mini"]
+        config["openai_model"] = st.selectbox("Select RAY's Language Model", models, index=models.index(DEFAULT_SEARCH_CONFIG["openai_model"]))
         config["api_key"] = st.text_input("OpenAI API Key for RAY", value=API_KEY, type="password")
-        config["temperature"] = st.slider("RAY's Creativity", min_value=0.0, max_value=1.0, value=0.0, step=0.1)
+        config["temperature"] = st.slider("RAY's Creativity", min_value=0.0, max_value=1.0, value=DEFAULT_SEARCH_CONFIG["temperature"], step=0.1)
     
     with tabs[2]:  # Search tab
-        config["allow_general_knowledge"] = st.checkbox("Allow General Knowledge", value=False)
-        config["use_community_summary"] = st.checkbox("Use Community Summary", value=False)
-        config["include_community_rank"] = st.checkbox("Include Community Rank", value=True)
-        config["community_level"] = st.slider("Community Analysis Depth", min_value=0, max_value=5, value=2, step=1)
+        config["allow_general_knowledge"] = st.checkbox("Allow General Knowledge", value=DEFAULT_SEARCH_CONFIG["allow_general_knowledge"])
+        config["use_community_summary"] = st.checkbox("Use Community Summary", value=DEFAULT_SEARCH_CONFIG["use_community_summary"])
+        config["include_community_rank"] = st.checkbox("Include Community Rank", value=DEFAULT_SEARCH_CONFIG["include_community_rank"])
+        config["community_level"] = st.slider("Community Analysis Depth", min_value=0, max_value=5, value=DEFAULT_SEARCH_CONFIG["community_level"], step=1)
+        config["report_filter"] = st.checkbox("Pre-filter Community Reports", value=DEFAULT_SEARCH_CONFIG["report_filter"],
+                                              help="Global search: only send the reports most relevant to the question to the map phase.")
+        config["report_top_n"] = st.number_input("Reports to Keep", min_value=1, max_value=500, value=DEFAULT_SEARCH_CONFIG["report_top_n"], step=5,
+                                                 disabled=not config["report_filter"])
+        config["tiered_global"] = st.checkbox("Tiered Global Search", value=DEFAULT_SEARCH_CONFIG["tiered_global"],
+                                              help="Global search: start from the top-level communities and only drill down to the analysis depth where answers look promising.")
+        config["token_budget"] = st.number_input("Token Budget per Query", min_value=0, value=DEFAULT_SEARCH_CONFIG["token_budget"], step=1000,
+                                                 help="Cap on estimated prompt tokens; 0 means no cap. Auto mode falls back to cheaper modes to stay under it, "
+                                                      "and tiered global search stops drilling down once it is spent.")
+        config["router_embeddings"] = st.checkbox("Embedding-Assisted Routing", value=DEFAULT_SEARCH_CONFIG["router_embeddings"],
+                                                  help="Auto mode: also compare the question with example broad and specific questions (one cached embedding lookup).")
+        config["report_min_score"] = st.slider("Minimum Report Relevance", min_value=0.0, max_value=1.0, value=DEFAULT_SEARCH_CONFIG["report_min_score"], step=0.05,
+                                               disabled=not config["report_filter"])
     
     with tabs[3]:  # Advanced tab
-        config["artifacts_dir"] = st.text_input("Knowledge Base Directory", value=ARTIFACTS_DIR)
+        active_index = get_active_index()
+        # Follows the published run, so the default moves to a new run once it has been swapped in
+        config["artifacts_dir"] = st.text_input("Knowledge Base Directory", value=active_index.current() or "")
+        if active_index.warming():
+            st.caption(f"Warming up new index run {active_index.warming()}; queries use the current one until it is ready.")
+        elif active_index.last_error:
+            st.caption(f"New index run could not be loaded: {active_index.last_error}")
+        cache_stats = get_response_cache().stats()
+        st.caption(f"Response cache: {cache_stats['entries']} entries, {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+        engine_stats = get_engine_registry().stats()
+        st.caption(f"Engine pool: {engine_stats['engines']} cached, {engine_stats['builds']} builds, {engine_stats['reuses']} reuses")
+        memory = process_memory()
+        if "rss_bytes" in memory:
+            st.caption(f"Worker memory: {memory['rss_bytes'] / 2**20:.0f} MB resident, "
+                       f"{memory['shared_clean_bytes'] / 2**20:.0f} MB shared, {memory['private_bytes'] / 2**20:.0f} MB private")
+        if engine_stats["builds"]:
+            display_engine_stats()
     
     return mode, config
 
-def display_result(title, result):
-    with st.expander(f"{title} Search Results", expanded=True):
-        st.markdown(result['Response'])
+def display_engine_stats():
+    # The engine modules pull in graphrag and openai, so they are imported once engines exist rather than on first paint
+    from ..engines import get_embedding_cache
+    from ..engines.rate_limiter import get_llm_rate_limiter, get_embedding_rate_limiter
+
+    embedding_stats = get_embedding_cache().stats()
+    st.caption(f"Embedding cache: {embedding_stats['entries']} entries, {embedding_stats['hit_rate']:.0%} hit rate, {embedding_stats['calls_saved']} calls saved")
+    for name, limiter in (("LLM", get_llm_rate_limiter()), ("Embedding", get_embedding_rate_limiter())):
+        limiter_stats = limiter.stats()
+        st.caption(f"{name} limiter: {limiter_stats['in_flight']}/{limiter_stats['concurrency_limit']} in flight, "
+                   f"{limiter_stats['queue_depth']} queued, avg wait {limiter_stats['avg_wait']:.2f}s, "
+                   f"{limiter_stats['throttle_events']} throttles")
+
+class ResultView:
+    RENDER_INTERVAL_SECONDS = 0.05
+
+    def __init__(self, title):
+        with st.expander(f"{title} Search Results", expanded=True):
+            self.progress = st.empty()
+            self.body = st.empty()
+            self.stats = st.container()
+        self.text = ""
+        self.last_render = 0.0
+
+    def on_token(self, token):
+        self.text += token
+        now = time.perf_counter()
+        if now - self.last_render >= self.RENDER_INTERVAL_SECONDS:
+            self.body.markdown(self.text + "▌")
+            self.last_render = now
+
+    def on_map_progress(self, done, total):
+        if total:
+            self.progress.progress(done / total, text=f"Analyzed {done}/{total} community report batches")
+
+def display_route(decision):
+    estimate = decision["estimate"]
+    prefix = f"Auto-routed to **{decision['mode']}** ({decision['reason']}). " if decision["requested_mode"] == "auto" else ""
+    if decision.get("cached"):
+        st.caption(f"{prefix}Answered from the response cache; it would cost ~{estimate['prompt_tokens']:,} prompt tokens to rerun")
+        return
+    st.caption(f"{prefix}Estimated cost: ~{estimate['prompt_tokens']:,} prompt tokens, {estimate['llm_calls']} LLM calls")
+    if not decision["within_budget"]:
+        st.error(f"Estimated {estimate['prompt_tokens']:,} tokens exceeds the budget of {decision['budget']:,}. "
+                 "Raise the token budget or choose a cheaper mode.")
+
+def display_result(title, result, view=None):
+    view = view or ResultView(title)
+    view.progress.empty()
+    view.body.markdown(result['Response'])
+    with view.stats:
         st.write(f"**Tokens:** {result['Tokens']}")
         st.write(f"**LLM Calls:** {result['LLM Calls']}")
+        if result.get("Estimated Tokens") is not None:
+            st.write(f"**Estimated:** ~{result['Estimated Tokens']} tokens, {result['Estimated LLM Calls']} LLM calls")
+        if result.get("Reports Used"):
+            st.write(f"**Reports Used:** {result['Reports Used']} "
+                     f"(saved ~{result['Map Calls Saved']} map calls, ~{result['Map Tokens Saved']} tokens)")
+        if result.get("Map Calls per Level"):
+            st.write(f"**Map Calls per Level:** {result['Map Calls per Level']} "
+                     f"(flat search: ~{result['Flat Map Calls']}; stopped: {result['Tier Stop']})")
+        if result.get("Chunks Retrieved") is not None:
+            st.write(f"**Chunks Retrieved:** {result['Chunks Retrieved']}")
+        if result.get("Conversation Turn", 1) > 1:
+            st.write(f"**Conversation Turn:** {result['Conversation Turn']}")
+        if result.get("Context Reused") and result.get("Context Build Saved") is not None:
+            st.write(f"**Context Reused:** {result['Context Reused']} (built in {result['Context Build']}s, "
+                     f"{result['Context Build Saved']}s faster than the first turn; {result['Embedding Tokens Saved']} embedding tokens saved)")
+        if result.get("Embedding Lookups"):
+            from ..engines import get_embedding_cache
+
+            embedding_stats = get_embedding_cache().stats()
+            st.write(f"**Embedding Cache:** {result['Embedding Cache Hits']}/{result['Embedding Lookups']} hits "
+                     f"({embedding_stats['hit_rate']:.0%} overall, {embedding_stats['calls_saved']} calls saved)")
+        if result.get("Cached"):
+            st.caption("Served from RAY's response cache.")
+        elif result.get("Time to First Token") is not None:
+            st.caption(f"First token after {result['Time to First Token']}s, completed in {result['Latency']}s")
+        elif result.get("Latency") is not None:
+            st.caption(f"Completed in {result['Latency']}s")
+    if result.get("Trace"):
+        with st.expander("Trace"):
+            st.dataframe(
+                [{
+                    "stage": entry["name"],
+                    "start (s)": entry["start"],
+                    "duration (ms)": round(entry["duration"] * 1000, 1),
+                    "tokens": entry["tokens"],
+                } for entry in sorted(result["Trace"], key=lambda entry: entry["start"])],
+                use_container_width=True,
+            )
+
+def display_query_history():
+    with st.expander("Query History"):
+        history = get_query_history()
+        filter_col, search_col, page_col = st.columns([1, 2, 1])
+        mode = filter_col.selectbox("Mode", ["all", "global", "local", "vanilla"], key="history_mode")
+        search = search_col.text_input("Search queries", key="history_search")
+        mode = None if mode == "all" else mode
+        total = history.count(mode=mode, search=search or None)
+        pages = max((total + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE, 1)
+        page = page_col.number_input("Page", min_value=1, max_value=pages, value=1, key="history_page")
+        rows = history.page(page - 1, HISTORY_PAGE_SIZE, mode=mode, search=search or None)
+        st.caption(f"{total} queries, page {page} of {pages}")
+        if rows:
+            st.dataframe(
+                [{name: row[name] for name in ("timestamp", "mode", "requested_mode", "query", "tokens", "estimated_tokens", "llm_calls", "latency", "artifacts_run")} for row in rows],
+                use_container_width=True,
+            )
 
 def display_chat_interface(conversations, sidebar=False):
     pass  # Function no longer needed
\ No newline at end of file
@@ -1,47 +1,63 @@
 import os
 import csv
 import subprocess
-from datetime import datetime
 import streamlit as st
 import json
-import pandas as pd  # Added missing import for pandas
-from langchain.schema import Document, HumanMessage
+import hashlib
 
-def initialize_directories(INPUT_DIR, PROMPTS_DIR, BASE_DIR):
+def initialize_directories(INPUT_DIR):
     os.makedirs(INPUT_DIR, exist_ok=True)
+
+def initialize_project(PROMPTS_DIR, BASE_DIR):
+    # Only indexing needs graphrag's settings and prompts, so this runs there instead of on every page render
     if not os.path.exists(PROMPTS_DIR) or len(os.listdir(PROMPTS_DIR)) != 4:
         st.info("Initializing RAY's knowledge base...")
         subprocess.run(["python", "-m", "graphrag.index", "--init", "--root", BASE_DIR], check=True)
         st.success("RAY's knowledge base initialized successfully.")
 
+# Written into a run's artifacts directory once the run is verified complete
+PUBLISHED_MARKER = "_RAY_PUBLISHED"
+# Names the run being served; replaced atomically when a new run is published
+CURRENT_RUN_FILE = "CURRENT"
+
+def read_current_run(OUTPUT_DIR):
+    path = os.path.join(OUTPUT_DIR, CURRENT_RUN_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            run = json.load(f).get("run")
+    except (OSError, ValueError):
+        return None
+    return run if run and os.path.exists(os.path.join(OUTPUT_DIR, run, "artifacts", PUBLISHED_MARKER)) else None
+
 def get_latest_artifacts_dir(OUTPUT_DIR):
     if not os.path.exists(OUTPUT_DIR):
         return None
+    current = read_current_run(OUTPUT_DIR)
+    if current:
+        return os.path.join(OUTPUT_DIR, current, "artifacts")
     subdirs = [d for d in os.listdir(OUTPUT_DIR) if os.path.isdir(os.path.join(OUTPUT_DIR, d))]
+    # Indexes built before runs were published have no marker; fall back to the newest run
+    published = [d for d in subdirs if os.path.exists(os.path.join(OUTPUT_DIR, d, "artifacts", PUBLISHED_MARKER))]
+    subdirs = published or subdirs
     if not subdirs:
         return None
     latest_dir = max(subdirs, key=lambda x: os.path.getctime(os.path.join(OUTPUT_DIR, x)))
     artifacts_dir = os.path.join(OUTPUT_DIR, latest_dir, "artifacts")
     return artifacts_dir if os.path.exists(artifacts_dir) else None
 
-def doc_to_message(doc: Document) -> HumanMessage:
+def get_artifacts_fingerprint(artifacts_dir):
+    if not artifacts_dir or not os.path.isdir(artifacts_dir):
+        return None
+    digest = hashlib.sha1(os.path.abspath(artifacts_dir).encode("utf-8"))
+    for entry in sorted(os.scandir(artifacts_dir), key=lambda e: e.name):
+        if entry.is_file() and entry.name.endswith(".parquet"):
+            stat = entry.stat()
+            digest.update(f"{entry.name}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    return digest.hexdigest()
+
+def doc_to_message(doc):
+    # langchain takes most of a second to import, so it is only loaded by callers that need it
+    from langchain.schema import HumanMessage
+
     return HumanMessage(json.dumps(doc.page_content))
 
-def save_results_to_csv(results, query, mode):
-    st.info("Saving results to CSV...")
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    results_df = pd.DataFrame({
-        "Timestamp": [timestamp],
-        "Query": [query],
-        f"{mode.capitalize()} Search Response": [results.get("Response", "")],
-        f"{mode.capitalize()} Search Tokens": [results.get("Tokens", 0)],
-        f"{mode.capitalize()} Search LLM Calls": [results.get("LLM Calls", 0)]
-    })
-
-    file_path = "search_results.csv"
-    if os.path.exists(file_path):
-        results_df.to_csv(file_path, mode='a', header=False, index=False)
-    else:
-        results_df.to_csv(file_path, mode='w', header=True, index=False)
-    
-    st.success("Results have been successfully saved to search_results.csv")
@@ -0,0 +1,88 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from unittest import mock
+
+from src.data.data_loader import RunCache
+from src.engines.active_index import ActiveIndex
+from src.indexing.runs import prune_runs
+from src.utils.utils import CURRENT_RUN_FILE, PUBLISHED_MARKER
+
+
+def publish(output_dir, run):
+    artifacts_dir = os.path.join(output_dir, run, "artifacts")
+    os.makedirs(artifacts_dir)
+    with open(os.path.join(artifacts_dir, PUBLISHED_MARKER), "w", encoding="utf-8") as f:
+        json.dump({"run": run}, f)
+    with open(os.path.join(output_dir, CURRENT_RUN_FILE), "w", encoding="utf-8") as f:
+        json.dump({"run": run}, f)
+    # list_runs orders by ctime
+    time.sleep(0.01)
+    return artifacts_dir
+
+
+class FakeRegistry:
+    def __init__(self):
+        self.retired = []
+
+    def get(self, config):
+        return None
+
+    def retire(self, artifacts_dir):
+        self.retired.append(artifacts_dir)
+
+
+def test_run_cache_evicts_one_run():
+    loads = []
+
+    @RunCache
+    def load(artifacts_dir, community_level, _unhashable=None):
+        loads.append((artifacts_dir, community_level))
+        return object()
+
+    old, new = load("runs/old", 2, _unhashable=[]), load("runs/new", 2, _unhashable=[])
+    assert load("runs/old", 2) is old and len(loads) == 2
+    load.evict("runs/old")
+    assert load("runs/new", 2) is new
+    assert load("runs/old", 2) is not old
+    assert loads == [("runs/old", 2), ("runs/new", 2), ("runs/old", 2)]
+
+
+def test_prune_skips_runs_another_process_holds(tmp_path):
+    output_dir = str(tmp_path)
+    old = publish(output_dir, "run1")
+    publish(output_dir, "run2")
+    holder = subprocess.Popen(
+        [sys.executable, "-c", "import sys, time; from src.indexing.runs import hold_run; handle = hold_run(sys.argv[1]); print('held', flush=True); time.sleep(30)", old],
+        stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        assert holder.stdout.readline().strip() == "held"
+        assert prune_runs(output_dir, keep=1) == []
+        assert os.path.isdir(old)
+    finally:
+        holder.kill()
+        holder.wait()
+    assert prune_runs(output_dir, keep=1) == ["run1"]
+
+
+def test_swap_keeps_the_new_run_loaded_and_releases_the_old(tmp_path):
+    output_dir = str(tmp_path)
+    old = publish(output_dir, "run1")
+    registry = FakeRegistry()
+    active_index = ActiveIndex(output_dir=output_dir, keep_runs=1, registry=registry)
+    assert active_index.current() == old and old in active_index._held
+
+    new = publish(output_dir, "run2")
+    with mock.patch("src.data.data_loader.load_prepared_context") as load_prepared_context:
+        with active_index.reading({"community_level": 2}):
+            active_index._warming = new
+            active_index._warm(new, [])
+            # Still read by the query that started on it
+            assert os.path.isdir(old) and old in active_index._held
+    assert registry.retired == [old]
+    load_prepared_context.evict.assert_called_once_with(old)
+    assert not os.path.exists(os.path.join(output_dir, "run1"))
+    assert set(active_index._held) == {new}
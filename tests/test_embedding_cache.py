@@ -0,0 +1,34 @@
+from src.engines.embedding_cache import CachedTextEmbedding, EmbeddingCache
+
+
+class FakeEmbedder:
+    def embed(self, text):
+        return [float(len(text)), 1.0]
+
+
+def make_embedding():
+    cache = EmbeddingCache(disk_path=None)
+    return cache, CachedTextEmbedding(FakeEmbedder(), "fake-model", cache, batch_window=0)
+
+
+def test_bulk_embeds_do_not_offset_calls_saved():
+    cache, embedding = make_embedding()
+    embedding.embed_many([f"report {i}" for i in range(20)])
+    embedding.prefetch([f"question {i}" for i in range(5)])
+    embedding.embed_documents(["chunk one", "chunk two"])
+    assert cache.stats()["batch_api_calls"] == 27
+    assert cache.stats()["calls_saved"] == 0
+
+    for _ in range(3):
+        embedding.embed("question 0")
+    stats = cache.stats()
+    assert (stats["hits"], stats["query_api_calls"], stats["calls_saved"]) == (3, 0, 3)
+
+
+def test_query_misses_count_against_calls_saved():
+    cache, embedding = make_embedding()
+    embedding.embed("new question")
+    embedding.embed("new question")
+    stats = cache.stats()
+    assert (stats["misses"], stats["hits"], stats["query_api_calls"], stats["calls_saved"]) == (1, 1, 1, 1)
+    assert stats["api_calls"] == 1
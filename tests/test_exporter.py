@@ -0,0 +1,45 @@
+import os
+import socket
+
+from src.telemetry import exporter
+from src.telemetry.tracing import MetricsRegistry
+
+
+def make_registry(value):
+    registry = MetricsRegistry()
+    registry.register_gauges("cache", lambda: {"hits": value})
+    return registry
+
+
+def test_workers_write_separate_files_that_merge(tmp_path):
+    path = str(tmp_path / "metrics.prom")
+    assert exporter.worker_metrics_path(path, pid=42) == str(tmp_path / "metrics.42.prom")
+
+    texts = [exporter.render_prometheus(make_registry(value), pid=pid) for pid, value in ((1, 3), (2, 5))]
+    merged = exporter.merge_prometheus(texts)
+    assert merged.count("# TYPE ray_cache_hits gauge") == 1
+    assert 'ray_cache_hits{pid="1"} 3' in merged and 'ray_cache_hits{pid="2"} 5' in merged
+    lines = merged.splitlines()
+    header = lines.index("# TYPE ray_cache_hits gauge")
+    assert set(lines[header + 1:header + 3]) == {'ray_cache_hits{pid="1"} 3', 'ray_cache_hits{pid="2"} 5'}
+
+
+def test_write_prometheus_file_is_per_pid(tmp_path):
+    path = str(tmp_path / "metrics.prom")
+    written = exporter.write_prometheus_file(path)
+    assert written == exporter.worker_metrics_path(path)
+    assert os.listdir(tmp_path) == [os.path.basename(written)]
+    with open(written, encoding="utf-8") as f:
+        assert f.read() == exporter.render_prometheus()
+
+
+def test_port_in_use_does_not_fail_the_worker():
+    with socket.socket() as taken:
+        taken.bind(("0.0.0.0", 0))
+        taken.listen()
+        port = taken.getsockname()[1]
+        exporter.start_metrics_exporter.clear()
+        try:
+            assert exporter.start_metrics_exporter(path=None, port=port)
+        finally:
+            exporter.start_metrics_exporter.clear()
@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from src.indexing import ingestion
+from src.indexing.ingestion import derived_input_name, extract_document, ingest_inputs
+
+
+def extract(tmp_path, name):
+    cache_path = str(tmp_path / "extracted.txt")
+    parts = extract_document(str(tmp_path / name), cache_path)
+    with open(cache_path, encoding="utf-8") as f:
+        return parts, f.read()
+
+
+def test_extracts_txt(tmp_path):
+    (tmp_path / "notes.txt").write_text("plain text\nsecond line", encoding="utf-8")
+    assert extract(tmp_path, "notes.txt") == (1, "plain text\nsecond line")
+
+
+def test_extracts_csv_rows(tmp_path):
+    (tmp_path / "parts.csv").write_text("part,supplier\nbolt,Acme\nnut,\n", encoding="utf-8")
+    assert extract(tmp_path, "parts.csv") == (2, "part: bolt; supplier: Acme\npart: nut")
+
+
+def test_extracts_docx_paragraphs(tmp_path):
+    docx = pytest.importorskip("docx")
+    document = docx.Document()
+    document.add_paragraph("First paragraph")
+    document.add_paragraph("")
+    document.add_paragraph("Second paragraph")
+    document.save(tmp_path / "report.docx")
+    assert extract(tmp_path, "report.docx") == (2, "First paragraph\nSecond paragraph")
+
+
+def test_extracts_pptx_slides(tmp_path):
+    pptx = pytest.importorskip("pptx")
+    presentation = pptx.Presentation()
+    for title in ("Roadmap", "Risks"):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[5])
+        slide.shapes.title.text = title
+    presentation.save(tmp_path / "deck.pptx")
+    assert extract(tmp_path, "deck.pptx") == (2, "Slide 1\nRoadmap\n\nSlide 2\nRisks")
+
+
+def test_extracts_pdf_pages(tmp_path):
+    pypdf = pytest.importorskip("pypdf")
+    writer = pypdf.PdfWriter()
+    writer.add_blank_page(width=200, height=200)
+    writer.add_blank_page(width=200, height=200)
+    with open(tmp_path / "scan.pdf", "wb") as f:
+        writer.write(f)
+    # Blank pages have no text, but every page is still a part
+    assert extract(tmp_path, "scan.pdf") == (2, "\n\n")
+
+
+def test_unchanged_content_is_served_from_the_extraction_cache(tmp_path, monkeypatch):
+    dirs = {name: str(tmp_path / name) for name in ("raw", "input", "cache")}
+    manifest_path = str(tmp_path / "manifest.json")
+    os.makedirs(dirs["raw"])
+    with open(os.path.join(dirs["raw"], "a.csv"), "w", encoding="utf-8") as f:
+        f.write("part,supplier\nbolt,Acme\n")
+
+    def ingest():
+        return ingest_inputs(raw_dir=dirs["raw"], input_dir=dirs["input"], cache_dir=dirs["cache"], manifest_path=manifest_path, max_workers=1)
+
+    assert ingest()["extracted"] == ["a.csv"]
+
+    # A copy under another name has the same sha256, so it is not parsed again
+    with open(os.path.join(dirs["raw"], "a.csv"), encoding="utf-8") as src, open(os.path.join(dirs["raw"], "b.csv"), "w", encoding="utf-8") as dst:
+        dst.write(src.read())
+    monkeypatch.setattr(ingestion, "ProcessPoolExecutor", None)
+    results = ingest()
+    assert (results["extracted"], results["from_cache"]) == ([], ["b.csv"])
+    with open(os.path.join(dirs["input"], derived_input_name("b.csv")), encoding="utf-8") as f:
+        assert f.read() == "part: bolt; supplier: Acme"
@@ -0,0 +1,39 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src.config.config import ENTITY_INDEX_DIRNAME, SNAPSHOT_DIRNAME
+from src.engines.numpy_vector_store import NumpyVectorStore, build_entity_vector_store
+
+
+def write_entities(artifacts_dir, n=50, dim=8):
+    rng = np.random.default_rng(0)
+    pd.DataFrame({
+        "id": [f"e{i}" for i in range(n)],
+        "description_embedding": list(rng.normal(size=(n, dim)).astype(np.float32)),
+    }).to_parquet(os.path.join(artifacts_dir, "create_final_entities.parquet"))
+
+
+def test_concurrent_builds_write_the_index_once(tmp_path):
+    write_entities(tmp_path)
+    with mock.patch.object(NumpyVectorStore, "persist", autospec=True, side_effect=NumpyVectorStore.persist) as persist:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            stores = list(pool.map(lambda _: build_entity_vector_store(str(tmp_path), dtype="float32"), range(4)))
+    assert persist.call_count == 1
+    assert all(list(store.ids) == [f"e{i}" for i in range(50)] for store in stores)
+    assert sorted(os.listdir(tmp_path)) == sorted([SNAPSHOT_DIRNAME, ENTITY_INDEX_DIRNAME, "create_final_entities.parquet"])
+
+
+def test_persist_replaces_the_index_without_leaving_temp_dirs(tmp_path):
+    db_uri = str(tmp_path / "index")
+    for seed in range(2):
+        store = NumpyVectorStore(dtype="float32")
+        store.set_vectors([f"e{seed}_{i}" for i in range(20)], np.random.default_rng(seed).normal(size=(20, 8)))
+        store.persist(db_uri)
+    loaded = NumpyVectorStore(dtype="float32")
+    loaded.connect(db_uri=db_uri)
+    assert list(loaded.ids) == [f"e1_{i}" for i in range(20)]
+    assert os.listdir(tmp_path) == ["index"]
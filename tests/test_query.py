@@ -0,0 +1,63 @@
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
+
+from src.cache.response_cache import ResponseCache
+from src.engines.query import execute_query, is_cached
+
+
+class FakeEngine:
+    def __init__(self):
+        self.calls = 0
+
+    def cache_fingerprint(self):
+        return "fixed"
+
+    async def asearch(self, query, conversation_history=None, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(response=f"answer {self.calls}", prompt_tokens=10, llm_calls=1)
+
+
+def ask(engine, mode, config):
+    return asyncio.run(execute_query("what changed?", engine, mode, config))
+
+
+def test_token_budget_only_keys_tiered_global_answers():
+    cache = ResponseCache(disk_path=None)
+    with mock.patch("src.engines.query.get_response_cache", return_value=cache):
+        for mode, tiered_global in (("local", False), ("vanilla", False), ("global", False)):
+            engine = FakeEngine()
+            ask(engine, mode, {"tiered_global": tiered_global, "token_budget": 1000})
+            assert ask(engine, mode, {"tiered_global": tiered_global, "token_budget": 2000})["Cached"]
+            assert engine.calls == 1
+
+        engine = FakeEngine()
+        ask(engine, "global", {"tiered_global": True, "token_budget": 1000})
+        assert "Cached" not in ask(engine, "global", {"tiered_global": True, "token_budget": 2000})
+        assert ask(engine, "global", {"tiered_global": True, "token_budget": 1000})["Cached"]
+        assert engine.calls == 2
+
+
+def test_is_cached_probes_without_counting_a_lookup():
+    cache = ResponseCache(disk_path=None)
+    config = {"tiered_global": False, "token_budget": 1000}
+    with mock.patch("src.engines.query.get_response_cache", return_value=cache):
+        engine = FakeEngine()
+        assert not is_cached("what changed?", engine, "local", config)
+        ask(engine, "local", config)
+        assert is_cached("what changed?", engine, "local", config)
+        assert not is_cached("what changed?", engine, "global", config)
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_answers_are_keyed_on_the_engine_model():
+    cache = ResponseCache(disk_path=None)
+    with mock.patch("src.engines.query.get_response_cache", return_value=cache):
+        engine = FakeEngine()
+        engine.llm = SimpleNamespace(model="gpt-4o-mini")
+        ask(engine, "local", {"openai_model": "gpt-4o-mini"})
+        # The sidebar setting does not reach the engine's LLM
+        assert ask(engine, "local", {"openai_model": "gpt-4o"})["Cached"]
+        engine.llm.model = "gpt-4o"
+        assert "Cached" not in ask(engine, "local", {"openai_model": "gpt-4o"})
+        assert engine.calls == 2
@@ -0,0 +1,45 @@
+import threading
+
+from src.engines.rate_limiter import RateLimiter
+
+
+def make_limiter(max_concurrency=2):
+    return RateLimiter("test", requests_per_minute=6000, tokens_per_minute=1_000_000, max_concurrency=max_concurrency, target_latency=10.0)
+
+
+def test_abandoned_stream_releases_slot():
+    limiter = make_limiter()
+
+    def stream():
+        with limiter.limit():
+            yield "first"
+            yield "second"
+
+    streams = [stream() for _ in range(2)]
+    for generator in streams:
+        next(generator)
+    assert limiter.stats()["in_flight"] == 2
+
+    for generator in streams:
+        generator.close()
+    assert limiter.stats()["in_flight"] == 0
+
+    acquired = threading.Event()
+
+    def acquire():
+        with limiter.limit():
+            acquired.set()
+
+    thread = threading.Thread(target=acquire, daemon=True)
+    thread.start()
+    assert acquired.wait(timeout=5)
+
+
+def test_interrupted_call_releases_slot():
+    limiter = make_limiter(max_concurrency=1)
+    try:
+        with limiter.limit():
+            raise KeyboardInterrupt
+    except KeyboardInterrupt:
+        pass
+    assert limiter.stats()["in_flight"] == 0
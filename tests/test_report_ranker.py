@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+from src.engines.report_ranker import ReportRanker
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.batches = 0
+
+    def embed(self, text):
+        return [float("supplier" in text), float("market" in text), 1.0]
+
+    def embed_many(self, texts):
+        self.batches += 1
+        return [self.embed(text) for text in texts]
+
+
+def make_reports():
+    return [
+        SimpleNamespace(title="Suppliers", summary="supplier network and parts", full_content=""),
+        SimpleNamespace(title="Markets", summary="market trends by region", full_content=""),
+    ]
+
+
+def test_prepared_ranker_does_not_embed_reports_per_query():
+    embedder = CountingEmbedder()
+    ranker = ReportRanker(make_reports(), embedder)
+    ranker.prepare()
+    assert embedder.batches == 1
+
+    assert [report.title for report in ranker.select("which supplier?", top_n=1)] == ["Suppliers"]
+    assert [report.title for report in ranker.select("market trends", top_n=1)] == ["Markets"]
+    assert embedder.batches == 1
+
+
+def test_unprepared_ranker_prepares_on_first_query():
+    embedder = CountingEmbedder()
+    ranker = ReportRanker(make_reports(), embedder)
+    assert [report.title for report in ranker.select("which supplier?", top_n=1)] == ["Suppliers"]
+    assert embedder.batches == 1
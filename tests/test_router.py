@@ -0,0 +1,37 @@
+from src.engines.router import QueryRouter
+
+ESTIMATES = {"vanilla": 500, "local": 2000, "global": 9000}
+
+
+class FixedCostRouter(QueryRouter):
+    def __init__(self, chosen):
+        self.chosen = chosen
+
+    def estimate(self, mode, query, budget=None):
+        return {"prompt_tokens": ESTIMATES[mode], "llm_calls": 1}
+
+    def features(self, query, use_embeddings=False):
+        return {}
+
+    def classify(self, features):
+        return self.chosen, "classified"
+
+
+def test_cached_answer_is_within_any_budget():
+    router = FixedCostRouter("global")
+    assert not router.route("q", "global", budget=1000)["within_budget"]
+    decision = router.route("q", "global", budget=1000, is_cached=lambda name: name == "global")
+    assert (decision["mode"], decision["within_budget"], decision["cached"]) == ("global", True, True)
+
+
+def test_auto_routing_keeps_a_cached_mode_over_budget():
+    router = FixedCostRouter("global")
+    assert router.route("q", budget=3000)["mode"] == "local"
+    assert router.route("q", budget=3000, is_cached=lambda name: name == "global")["mode"] == "global"
+
+
+def test_cache_is_only_probed_over_budget():
+    probed = []
+    router = FixedCostRouter("local")
+    decision = router.route("q", "local", budget=3000, is_cached=lambda name: probed.append(name) or True)
+    assert (decision["within_budget"], decision["cached"], probed) == (True, False, [])
@@ -0,0 +1,17 @@
+from benchmarks.fakes import WhitespaceEncoder
+from src.engines.token_counts import PrecountedTokenEncoder
+
+
+def test_counts_match_the_wrapped_encoder():
+    wrapped = WhitespaceEncoder()
+    encoder = PrecountedTokenEncoder(wrapped, {})
+    text = "alpha beta|gamma"
+    assert len(encoder.encode(text)) == len(wrapped.encode("alpha beta")) + 1 + len(wrapped.encode("gamma"))
+
+
+def test_decode_delegates_to_the_wrapped_encoder():
+    wrapped = WhitespaceEncoder()
+    encoder = PrecountedTokenEncoder(wrapped, {})
+    tokens = wrapped.encode("alpha beta gamma")
+    assert encoder.decode(tokens) == wrapped.decode(tokens)
+    assert encoder.decode(tokens[:2]) == wrapped.decode(tokens[:2])
@@ -0,0 +1,73 @@
+import asyncio
+from unittest import mock
+
+from benchmarks.fakes import WhitespaceEncoder
+from src.cache.response_cache import ResponseCache
+from src.engines import vanilla_search
+from src.engines.query import execute_query, format_search_query
+from src.engines.vanilla_search import VanillaIndex, VanillaSearch
+
+
+class FakeLLM:
+    async def agenerate(self, messages, streaming=True, callbacks=None, **kwargs):
+        return "answer"
+
+
+class RecordingLLM(FakeLLM):
+    async def agenerate(self, messages, streaming=True, callbacks=None, **kwargs):
+        self.messages = messages
+        return "answer"
+
+
+class FakeEmbedder:
+    def __init__(self):
+        self.texts = []
+
+    def embed(self, text):
+        self.texts.append(text)
+        return [float(len(text)), 1.0]
+
+    def embed_documents(self, texts):
+        return [self.embed(text) for text in texts]
+
+
+def test_changed_input_file_misses_response_cache(tmp_path):
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    document = input_dir / "notes.txt"
+    document.write_text("the supplier ships parts to the factory", encoding="utf-8")
+    index = VanillaIndex("fake-model", input_dir=str(input_dir), persist_dir=str(tmp_path / "chroma"),
+                         collection_name="test", manifest_path=str(tmp_path / "manifest.json"))
+    engine = VanillaSearch(FakeLLM(), WhitespaceEncoder(), FakeEmbedder(), "fake-model")
+    cache = ResponseCache(disk_path=None)
+
+    def ask():
+        return asyncio.run(execute_query("who ships parts?", engine, "vanilla", {}))
+
+    with mock.patch.object(vanilla_search, "get_vanilla_index", return_value=index), \
+            mock.patch("src.engines.query.get_response_cache", return_value=cache):
+        assert "Cached" not in ask()
+        assert ask()["Cached"]
+
+        document.write_text("the supplier ships parts and tools to the factory", encoding="utf-8")
+        assert "Cached" not in ask()
+        assert ask()["Cached"]
+
+
+def test_retrieval_uses_the_question_without_formatting_suffix(tmp_path):
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    (input_dir / "notes.txt").write_text("the supplier ships parts to the factory", encoding="utf-8")
+    index = VanillaIndex("fake-model", input_dir=str(input_dir), persist_dir=str(tmp_path / "chroma"),
+                         collection_name="test", manifest_path=str(tmp_path / "manifest.json"))
+    embedder = FakeEmbedder()
+    llm = RecordingLLM()
+    engine = VanillaSearch(llm, WhitespaceEncoder(), embedder, "fake-model")
+
+    with mock.patch.object(vanilla_search, "get_vanilla_index", return_value=index), \
+            mock.patch.object(index, "retrieve", wraps=index.retrieve) as retrieve:
+        asyncio.run(engine.asearch(format_search_query("who ships parts?")))
+
+    assert retrieve.call_args.args[0] == "who ships parts?"
+    assert embedder.texts[-1] == "who ships parts?"
+    assert llm.messages[-1] == {"role": "user", "content": format_search_query("who ships parts?")}